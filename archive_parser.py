@@ -0,0 +1,218 @@
+"""
+The purpose of this file is to turn archived STEO excel workbooks (steo_archived/*.xlsx)
+into the same long format that series_to_dataframe produces, so we can backfill
+old forecast vintages without touching the API
+"""
+
+# we will need to access files from our system
+import os
+import re
+import glob
+import datetime
+
+# parsing many workbooks at the same time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# openpyxl's read only mode streams rows instead of loading the whole workbook
+import openpyxl
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+
+# where the archived workbooks live
+ARCHIVE_FOLDER = "steo_archived"
+
+# the columns every parsed sheet comes back with, same as series_to_dataframe
+OUTPUT_COLUMNS = [
+    "period",
+    "seriesId",
+    "seriesDescription",
+    "value",
+    "unit",
+    "forecast_period",
+]
+
+# the month names used in the header row of every table
+MONTHS = {
+    name: i + 1
+    for i, name in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    )
+}
+
+# a unit at the end of a label, like (million barrels per day), but not footnotes like (a)
+UNIT_PATTERN = r"\(([^()]{4,})\)\s*$"
+
+# table titles can keep going after the unit, like (billion kilowatthours), continues on ...
+TITLE_UNIT_PATTERN = r"\(([^()]{4,})\)"
+
+# series ids are upper case letters, numbers and underscores
+SERIES_ID_PATTERN = r"^[A-Z0-9_]+$"
+
+
+# FIGURING OUT WHICH FORECAST VINTAGE A WORKBOOK IS
+def workbook_vintage(workbook):
+    """
+    Purpose is to read the forecast month (e.g. December 2023) off the Dates sheet,
+    falling back to the title line of the first table
+    """
+    candidates = []
+    if "Dates" in workbook.sheetnames:
+        for row in workbook["Dates"].iter_rows(min_row=1, max_row=1, values_only=True):
+            candidates.extend(row)
+
+    for name in workbook.sheetnames:
+        if name.endswith("tab"):
+            for row in workbook[name].iter_rows(min_row=2, max_row=2, values_only=True):
+                candidates.extend(row)
+            break
+
+    for value in candidates:
+        match = re.search(r"([A-Z][a-z]+ \d{4})\s*$", str(value or ""))
+        if match:
+            return datetime.datetime.strptime(match.group(1), "%B %Y")
+
+    raise ValueError("could not find the forecast month in this workbook")
+
+
+# FIGURING OUT A WORKBOOK'S VINTAGE WITHOUT PARSING ITS TABLES
+def read_vintage(path):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        return workbook_vintage(workbook)
+    finally:
+        workbook.close()
+
+
+# TURNING ONE TABLE SHEET INTO A LONG DATAFRAME
+def parse_sheet(rows, forecast_period):
+    """
+    Purpose is to take the rows of one table sheet (as tuples) and return the long format.
+    Column A holds series ids, column B the labels, row 3 the (merged) years and
+    row 4 the months; everything is reshaped at once instead of cell by cell
+    """
+    grid = pd.DataFrame(rows)
+    if grid.shape[1] < 3:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+
+    # the header row is the one with month names in it, the years sit right above it
+    is_month = grid.iloc[:, 2:].isin(list(MONTHS)).any(axis=1)
+    if not is_month.any():
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    header_row = int(is_month.idxmax())
+
+    months = grid.iloc[header_row, 2:].map(MONTHS)
+    years = pd.to_numeric(grid.iloc[header_row - 1, 2:], errors="coerce").ffill()
+    month_cols = months.notna() & years.notna()
+
+    periods = pd.to_datetime(
+        {
+            "year": years[month_cols].astype(int),
+            "month": months[month_cols].astype(int),
+            "day": 1,
+        }
+    )
+
+    # everything under the header, column A ids and column B labels
+    body = grid.iloc[header_row + 1 :]
+    ids = body.iloc[:, 0].astype("string").str.strip()
+    labels = body.iloc[:, 1].astype("string").str.strip()
+
+    # units can come from the row label itself, the table title, or a section header above,
+    # in that order since section headers also use parentheses for things like (ERCOT)
+    title = str(grid.iloc[0, 1] or "")
+    title_unit = re.search(TITLE_UNIT_PATTERN, title)
+    title_unit = title_unit.group(1) if title_unit else None
+
+    is_header = ids.isna() & labels.notna()
+    section_label = labels.where(is_header).ffill()
+    section_unit = labels.where(is_header).str.extract(UNIT_PATTERN)[0].ffill()
+    is_series = ids.fillna("").str.match(SERIES_ID_PATTERN) & ids.notna()
+
+    # rows like ('NGPRPUS', '(billion cubic feet per day)') take their description from the header above
+    only_unit = labels.str.match(r"^\(.*\)$").fillna(False)
+    descriptions = labels.where(~only_unit, section_label)
+    label_unit = labels.where(only_unit).str.extract(UNIT_PATTERN)[0]
+
+    units = label_unit.fillna(title_unit).fillna(section_unit)
+
+    values = body.loc[is_series, month_cols[month_cols].index]
+    values = values.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+    # reshaping the (series x months) block into one row per series and month
+    n_series, n_periods = values.shape
+    long_df = pd.DataFrame(
+        {
+            "period": np.tile(periods.to_numpy(), n_series),
+            "seriesId": np.repeat(ids[is_series].to_numpy(dtype=object), n_periods),
+            "seriesDescription": np.repeat(
+                descriptions[is_series].to_numpy(dtype=object), n_periods
+            ),
+            "value": values.ravel(),
+            "unit": np.repeat(units[is_series].to_numpy(dtype=object), n_periods),
+        }
+    )
+    long_df = long_df.dropna(subset=["value"])
+    long_df["forecast_period"] = pd.Timestamp(forecast_period)
+
+    return long_df[OUTPUT_COLUMNS]
+
+
+# TURNING EVERY TABLE SHEET OF A WORKBOOK INTO ONE LONG DATAFRAME
+def parse_workbook(path, sheets=None):
+    """
+    Purpose is to parse an archived STEO workbook, every sheet ending in 'tab'
+    unless a list of sheet names is given. Sheets are streamed one at a time
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        forecast_period = workbook_vintage(workbook)
+        sheets = sheets or [name for name in workbook.sheetnames if name.endswith("tab")]
+
+        dfs = []
+        for name in sheets:
+            rows = workbook[name].iter_rows(values_only=True)
+            dfs.append(parse_sheet(rows, forecast_period))
+
+    finally:
+        workbook.close()
+
+    archive_df = pd.concat(dfs, ignore_index=True)
+
+    # a series can show up in more than one table, we only need it once
+    archive_df = archive_df.drop_duplicates(subset=["seriesId", "period"])
+
+    # same order series_to_dataframe gives us: each series with its newest periods first
+    archive_df = archive_df.sort_values(
+        ["seriesId", "period"], ascending=[True, False], kind="stable"
+    )
+
+    return archive_df.reset_index(drop=True)
+
+
+# PARSING MANY ARCHIVED WORKBOOKS IN PARALLEL
+def parse_archives(paths=None, max_workers=None, sheets=None):
+    """
+    Purpose is to parse a list of workbooks (every xlsx in steo_archived by default)
+    across a pool of processes. Yields (path, dataframe) as each one finishes, so
+    the order is whichever workbook is done first, not the order of paths
+    """
+    paths = paths or sorted(glob.glob(os.path.join(ARCHIVE_FOLDER, "*.xlsx")))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(parse_workbook, path, sheets): path for path in paths}
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+if __name__ == "__main__":
+    for path, df in parse_archives():
+        print(
+            f"{path}: {len(df)} rows, {df['seriesId'].nunique()} series, "
+            f"forecast period {df['forecast_period'].iloc[0]:%Y-%m}"
+        )
@@ -0,0 +1,344 @@
+"""
+The purpose of this file is to score every STEO forecast vintage against what actually
+happened. The actuals of a series are the history in its newest vintage, every older
+vintage's forecast of the same (seriesId, period) is compared with them, and the errors
+are summarized by forecast horizon (months between the release and the target period)
+as MAE, MAPE and bias. Everything is done with merges and one grouped pass, and the
+scored rows are cached per topic so a new release only rescores what it changed
+"""
+
+# we will need to access files from our system
+import json
+import os
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+# the forecasts and actuals both come from the master data in the store
+import master_store
+
+
+# where the scored forecasts of each topic are cached unless told otherwise
+BACKTESTS_PATH = "master_output/backtests"
+
+# the columns every scored forecast row has
+ERROR_COLUMNS = [
+    "seriesId",
+    "period",
+    "forecast_period",
+    "horizon",
+    "forecast",
+    "actual",
+    "error",
+    "abs_pct_error",
+]
+
+# the columns we read from the store
+STORE_COLUMNS = ["seriesId", "period", "forecast_period", "value"]
+
+
+# MONTHS BETWEEN A FORECAST'S RELEASE AND THE PERIOD IT IS FOR
+def horizon_months(period, forecast_period):
+    return (period.dt.year - forecast_period.dt.year) * 12 + (
+        period.dt.month - forecast_period.dt.month
+    )
+
+
+# THE LATEST ACTUALS OF EVERY SERIES
+def compute_actuals(df):
+    """
+    Purpose is to take long master data and return (seriesId, period, actual,
+    actual_vintage): for every series, the periods before its newest vintage, as
+    that vintage reports them
+    """
+    df = normalize(df)
+
+    newest = df.groupby("seriesId", observed=True)["forecast_period"].transform("max")
+    actuals = df.loc[
+        (df["forecast_period"] == newest) & (df["period"] < newest),
+        ["seriesId", "period", "value", "forecast_period"],
+    ]
+
+    return actuals.rename(
+        columns={"value": "actual", "forecast_period": "actual_vintage"}
+    ).reset_index(drop=True)
+
+
+# SCORING FORECASTS AGAINST THE ACTUALS IN ONE MERGE
+def score_forecasts(df, actuals):
+    """
+    Purpose is to return one row per forecast (a period on or after its vintage)
+    that has an actual, with its horizon, error (forecast - actual) and absolute
+    percent error. Forecasts of periods that have not happened yet are left out
+    """
+    df = normalize(df)
+    forecasts = df[df["period"] >= df["forecast_period"]]
+
+    scored = forecasts.merge(
+        actuals[["seriesId", "period", "actual"]], on=["seriesId", "period"], how="inner"
+    )
+    scored = scored.rename(columns={"value": "forecast"})
+
+    scored["horizon"] = horizon_months(scored["period"], scored["forecast_period"]).astype(
+        "int16"
+    )
+    scored["error"] = scored["forecast"] - scored["actual"]
+
+    # the percent error is left empty when the actual is zero
+    scored["abs_pct_error"] = (
+        scored["error"].abs() / scored["actual"].abs().replace(0, np.nan) * 100
+    )
+
+    return scored[ERROR_COLUMNS]
+
+
+# ERROR METRICS BY HORIZON (OR ANYTHING ELSE) IN ONE GROUPED PASS
+def summarize(errors, by=("seriesId", "horizon")):
+    """
+    Purpose is to return n, MAE, MAPE (percent) and bias (mean of forecast - actual,
+    positive means the forecasts ran high) for every group in by
+    """
+    errors = errors.assign(abs_error=errors["error"].abs())
+
+    return (
+        errors.groupby(list(by), observed=True)
+        .agg(
+            n=("error", "size"),
+            mae=("abs_error", "mean"),
+            mape=("abs_pct_error", "mean"),
+            bias=("error", "mean"),
+        )
+        .reset_index()
+    )
+
+
+# SCORING A TOPIC, ONLY REDOING WHAT A NEW RELEASE CHANGED
+def materialize_backtest(
+    topic, store_path=master_store.STORE_PATH, backtests_path=BACKTESTS_PATH, full=False
+):
+    """
+    Purpose is to bring a topic's cached scored forecasts up to date and return them.
+    The first run (or full=True) scores everything. After that only the newest vintage
+    is read to get the actuals, and only the forecasts of (seriesId, period) whose
+    actual changed are read and rescored, from just the vintages close enough to
+    those periods to have forecast them. Vintages we have not seen are scored too.
+    The cached rows are still read and written back whole, which is most of what an
+    incremental run costs, so it saves the most on long histories and many vintages
+    """
+    errors_path, actuals_path, state_path = cache_paths(topic, backtests_path)
+    vintages = master_store.list_vintages(topic, store_path=store_path)
+
+    if full or not all(os.path.exists(p) for p in [errors_path, actuals_path, state_path]):
+        df = master_store.read_topic(topic, columns=STORE_COLUMNS, store_path=store_path)
+        actuals = compute_actuals(df)
+        errors = score_forecasts(df, actuals)
+
+    else:
+        cached_errors = pd.read_parquet(errors_path)
+        cached_actuals = normalize(pd.read_parquet(actuals_path))
+        with open(state_path) as f:
+            seen = {pd.Timestamp(v) for v in json.load(f)["vintages"]}
+
+        # series in the newest vintage get their actuals from it, the rest keep theirs
+        newest = master_store.read_topic(
+            topic,
+            columns=STORE_COLUMNS,
+            forecast_periods=vintages[-1:],
+            store_path=store_path,
+        )
+        fresh = compute_actuals(newest)
+        actuals = pd.concat(
+            [cached_actuals[~cached_actuals["seriesId"].isin(fresh["seriesId"].unique())], fresh],
+            ignore_index=True,
+        )
+
+        changed = changed_keys(cached_actuals, actuals)
+
+        # the newest vintage's forecasts are all still in the future, there is nothing
+        # to score them against until a later release
+        new_vintages = [v for v in vintages[:-1] if v not in seen]
+        if changed.empty and not new_vintages:
+            return cached_errors
+
+        parts = [anti_join(normalize(cached_errors), changed)]
+
+        # the forecasts of the periods whose actual is new or different, from the
+        # vintages that reach that far ahead (the store is split by vintage, so the rest
+        # is not read). An actual that is gone only takes its scored forecasts with it
+        rescore = changed.merge(actuals[["seriesId", "period"]], on=["seriesId", "period"])
+        if not rescore.empty:
+            newest_horizon = horizon_months(newest["period"], newest["forecast_period"]).max()
+            max_horizon = np.nanmax([cached_errors["horizon"].max(), newest_horizon])
+            forecasters = forecasting_vintages(vintages, rescore["period"], int(max_horizon))
+
+            # a filter that keeps everything only slows the scan down, so it is left off
+            series = rescore["seriesId"].unique()
+            if set(series) >= set(actuals["seriesId"].unique()):
+                series = None
+            if len(forecasters) == len(vintages):
+                forecasters = None
+
+            df = master_store.read_topic(
+                topic,
+                columns=STORE_COLUMNS,
+                series=series,
+                start=rescore["period"].min(),
+                end=rescore["period"].max(),
+                forecast_periods=forecasters,
+                store_path=store_path,
+            )
+            df = normalize(df).merge(rescore, on=["seriesId", "period"])
+            parts.append(score_forecasts(df, actuals))
+
+        # and the rest of the forecasts of vintages we have not scored yet
+        if new_vintages:
+            df = master_store.read_topic(
+                topic,
+                columns=STORE_COLUMNS,
+                forecast_periods=new_vintages,
+                store_path=store_path,
+            )
+            parts.append(score_forecasts(anti_join(normalize(df), changed), actuals))
+
+        errors = pd.concat(parts, ignore_index=True)
+
+    errors = errors.sort_values(["seriesId", "forecast_period", "period"], kind="stable")
+    errors = errors.reset_index(drop=True)
+
+    save_backtest(topic, errors, actuals, vintages, backtests_path)
+
+    return errors
+
+
+# THE VINTAGES THAT FORECAST ANY OF THE GIVEN PERIODS
+def forecasting_vintages(vintages, periods, max_horizon):
+    """
+    Purpose is to return the vintages v with one of periods between v and max_horizon
+    months after it, the only ones that can hold forecasts of those periods
+    """
+    months = np.unique(
+        pd.DatetimeIndex(periods).year * 12 + pd.DatetimeIndex(periods).month
+    )
+    vintages = pd.DatetimeIndex(vintages)
+    starts = np.asarray(vintages.year * 12 + vintages.month)
+
+    # the first changed period at or after each vintage, is it within reach
+    first = np.searchsorted(months, starts)
+    reach = first < len(months)
+    reach[reach] = months[first[reach]] - starts[reach] <= max_horizon
+
+    return list(vintages[reach])
+
+
+# THE (SERIESID, PERIOD) KEYS WHOSE ACTUAL IS NEW, GONE OR DIFFERENT
+def changed_keys(old, new):
+    both = old.merge(
+        new, on=["seriesId", "period"], how="outer", suffixes=("_old", "_new"), indicator=True
+    )
+    same = (both["_merge"] == "both") & (
+        (both["actual_old"] == both["actual_new"])
+        | (both["actual_old"].isna() & both["actual_new"].isna())
+    )
+
+    return both.loc[~same, ["seriesId", "period"]].reset_index(drop=True)
+
+
+# DROPPING THE ROWS OF DF WHOSE (SERIESID, PERIOD) IS IN KEYS
+def anti_join(df, keys):
+    if keys.empty:
+        return df
+
+    # only rows of a period in keys can match, so only those go through the merge
+    maybe = df["period"].isin(keys["period"].unique()).to_numpy()
+    marked = df[maybe].merge(keys, on=["seriesId", "period"], how="left", indicator=True)
+    kept = marked[marked["_merge"] == "left_only"].drop(columns="_merge")
+
+    return pd.concat([df[~maybe], kept], ignore_index=True)
+
+
+# THE SAME TYPES NO MATTER WHERE A FRAME WAS READ FROM
+def normalize(df):
+    """
+    Purpose is to make merges line up, the store hands back categorical ids whose
+    categories differ between reads
+    """
+    ids = df["seriesId"]
+    if isinstance(ids.dtype, pd.CategoricalDtype):
+        # turning the few categories into strings and picking them by code is much
+        # cheaper than turning every row into a string
+        categories = ids.cat.categories.astype(str)
+        codes = ids.cat.codes.to_numpy()
+        ids = pd.Series(categories.take(codes, allow_fill=True), index=df.index)
+
+    columns = {"seriesId": ids.astype(str)}
+
+    # the store and the cache already hand back dates, anything else gets parsed
+    for c in ["period", "forecast_period", "actual_vintage"]:
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            columns[c] = pd.to_datetime(df[c])
+
+    return df.assign(**columns)
+
+
+# WHERE A TOPIC'S CACHED BACKTEST LIVES
+def cache_paths(topic, backtests_path=BACKTESTS_PATH):
+    return (
+        os.path.join(backtests_path, f"{topic}.parquet"),
+        os.path.join(backtests_path, f"{topic}.actuals.parquet"),
+        os.path.join(backtests_path, f"{topic}.json"),
+    )
+
+
+# SAVING THE SCORED FORECASTS, THE ACTUALS THEY USED AND THE VINTAGES WE HAVE SEEN
+def save_backtest(topic, errors, actuals, vintages, backtests_path=BACKTESTS_PATH):
+    errors_path, actuals_path, state_path = cache_paths(topic, backtests_path)
+    os.makedirs(backtests_path, exist_ok=True)
+
+    # same compact types the store uses
+    errors = errors.astype({"seriesId": "category"})
+    float_cols = ["forecast", "actual", "error", "abs_pct_error"]
+    errors[float_cols] = errors[float_cols].astype("float32")
+
+    errors.to_parquet(errors_path, index=False)
+    actuals.astype({"seriesId": "category"}).to_parquet(actuals_path, index=False)
+
+    with open(state_path, "w") as f:
+        json.dump({"vintages": [v.date().isoformat() for v in vintages]}, f, indent=2)
+
+
+# READING A TOPIC'S CACHED BACKTEST
+def read_backtest(topic, backtests_path=BACKTESTS_PATH):
+    return pd.read_parquet(cache_paths(topic, backtests_path)[0])
+
+
+# ERROR METRICS BY HORIZON ACROSS EVERY TOPIC
+def backtest_all(
+    topics=None, store_path=master_store.STORE_PATH, backtests_path=BACKTESTS_PATH, full=False
+):
+    """
+    Purpose is to refresh every topic's backtest and return the metrics of every
+    (topic, seriesId, horizon)
+    """
+    topics = topics or master_store.list_topics(store_path)
+
+    errors = pd.concat(
+        [
+            materialize_backtest(
+                topic, store_path=store_path, backtests_path=backtests_path, full=full
+            ).assign(topic=topic)
+            for topic in topics
+        ],
+        ignore_index=True,
+    )
+
+    return summarize(errors, by=("topic", "seriesId", "horizon"))
+
+
+if __name__ == "__main__":
+    # refreshing the backtests of every topic in the store
+    summary = backtest_all()
+
+    # units differ between series, so the percent errors are what we can compare
+    print(f"{summary['seriesId'].nunique()} series scored, median MAPE by horizon:")
+    print(summary.groupby("horizon")["mape"].median().head(24).to_string())
@@ -0,0 +1,118 @@
+"""
+The purpose of this file is to time backtest.py on a made up store far bigger than
+ours (a thousand series with ten years of history, four years of monthly vintages, so
+more vintages than any forecast reaches ahead), scoring it from scratch
+and then incrementally after a new release and after an old vintage is backfilled,
+and to check the incremental results match a full rescore
+
+run from the repo root: python benchmarks/bench_backtest.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import master_store
+
+
+N_SERIES = 1000
+N_TOPICS = 4
+HISTORY_MONTHS = 120
+HORIZON_MONTHS = 24
+VINTAGES = pd.date_range("2021-01-01", periods=49, freq="MS")
+
+
+# ONE VINTAGE OF A MADE UP TOPIC
+def synthetic_vintage(topic, vintage, rng):
+    """
+    every series follows the same true path in every vintage, a vintage's history is
+    that path except for its last few months (which later releases revise), and its
+    forecasts drift further from it the further out they go
+    """
+    series = [f"{topic.upper()}{i:05d}" for i in range(N_SERIES // N_TOPICS)]
+    periods = pd.date_range(
+        vintage - pd.DateOffset(months=HISTORY_MONTHS),
+        vintage + pd.DateOffset(months=HORIZON_MONTHS - 1),
+        freq="MS",
+    )
+
+    # months since 2000 drive the true path, so it lines up between vintages
+    months = (periods.year - 2000) * 12 + periods.month
+    truth = 100 + np.add.outer(np.arange(len(series)) % 50, months * 0.5)
+
+    # months before the release are history, the last 3 of them still get revised
+    ahead = np.asarray((periods.year - vintage.year) * 12 + (periods.month - vintage.month))
+    noise = np.where(ahead >= -3, 0.5 + np.clip(ahead, 0, None) * 0.3, 0.0)
+    values = truth + rng.normal(0, 1, truth.shape) * noise
+
+    return pd.DataFrame(
+        {
+            "period": np.tile(periods, len(series)),
+            "seriesId": np.repeat(series, len(periods)),
+            "seriesDescription": "made up series",
+            "value": values.ravel(),
+            "unit": "units",
+            "forecast_period": vintage,
+        }
+    )
+
+
+# WRITING SOME VINTAGES OF EVERY TOPIC INTO THE STORE
+def write_vintages(vintages, store_path, seed):
+    rng = np.random.default_rng(seed)
+    rows = 0
+    for topic_number in range(N_TOPICS):
+        topic = f"topic{topic_number}"
+        df = pd.concat([synthetic_vintage(topic, v, rng) for v in vintages], ignore_index=True)
+        master_store.write_topic(df, topic, store_path=store_path)
+        rows += len(df)
+
+    return rows
+
+
+# TIMING ONE BACKTEST OF EVERY TOPIC
+def timed_backtest(store_path, backtests_path, full=False):
+    started = time.perf_counter()
+    summary = backtest.backtest_all(store_path=store_path, backtests_path=backtests_path, full=full)
+
+    return time.perf_counter() - started, summary
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "store")
+        cache_path = os.path.join(tmp, "backtests")
+        check_path = os.path.join(tmp, "check")
+
+        # every vintage but the first and the last to start with
+        rows = write_vintages(VINTAGES[1:-1], store_path, seed=0)
+        print(f"{N_SERIES:,} series, {len(VINTAGES) - 2} vintages, {rows:,} rows in the store")
+
+        seconds, summary = timed_backtest(store_path, cache_path)
+        print(f"{'full backtest':>32} {seconds:>7.2f}s  {summary['n'].sum():>12,} forecasts scored")
+
+        seconds, _ = timed_backtest(store_path, cache_path)
+        print(f"{'nothing new':>32} {seconds:>7.2f}s")
+
+        runs = [
+            ("a new release comes out", VINTAGES[-1:], 1),
+            ("an old vintage is backfilled", VINTAGES[:1], 2),
+        ]
+        for name, vintages, seed in runs:
+            write_vintages(vintages, store_path, seed=seed)
+
+            seconds, incremental = timed_backtest(store_path, cache_path)
+            full_seconds, full = timed_backtest(store_path, check_path, full=True)
+
+            pd.testing.assert_frame_equal(incremental, full)
+            print(f"{name:>32} {seconds:>7.2f}s  (a full rescore takes {full_seconds:.2f}s)")
+
+        print("incremental results match a full rescore")
@@ -0,0 +1,59 @@
+"""
+The purpose of this file is to compare sequential and concurrent fetching in
+series_to_dataframe against a local stand-in for the EIA API
+
+run from the repo root: python benchmarks/bench_concurrent_fetch.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# letting us import the functions package from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import functions as fns
+from fake_eia_server import start_server
+
+
+# TIMING ONE FULL PULL OF A SERIES LIST
+def time_pull(series_list, base_url, max_workers, save_dir):
+    save_path = os.path.join(save_dir, "bench_data_2024_03.csv")
+
+    started = time.perf_counter()
+    df = fns.series_to_dataframe(
+        series_list=series_list,
+        start_date="2000-01",
+        save_path=save_path,
+        key="fake-key",
+        max_workers=max_workers,
+        max_per_second=200,
+        base_url=base_url,
+    )
+
+    return time.perf_counter() - started, df
+
+
+if __name__ == "__main__":
+    # 50 ms per response is roughly what we see from api.eia.gov
+    server, base_url = start_server(latency=0.05)
+
+    print(f"{'series':>6} {'sequential (s)':>15} {'8 workers (s)':>14} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        for n_series in [1, 2, 4, 8, 16, 32]:
+            series_list = [f"FAKE_{i:03d}" for i in range(n_series)]
+
+            seq_time, seq_df = time_pull(series_list, base_url, 1, save_dir)
+            con_time, con_df = time_pull(series_list, base_url, 8, save_dir)
+
+            # the concurrent pull has to give us back the exact same dataframe
+            assert seq_df.equals(con_df)
+
+            print(
+                f"{n_series:>6} {seq_time:>15.3f} {con_time:>14.3f} "
+                f"{seq_time / con_time:>7.1f}x"
+            )
+
+    server.shutdown()
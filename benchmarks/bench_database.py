@@ -0,0 +1,97 @@
+"""
+The purpose of this file is to compare how long typical dashboard filters take
+against the sqlite database and against the master CSV files
+
+run from the repo root: python benchmarks/bench_database.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+from database import push_to_db
+
+
+# HOW A DASHBOARD GETS ITS DATA FROM A CSV TODAY
+def csv_filter(csv_path, series, start, end, latest, df=None):
+    if df is None:
+        df = pd.read_csv(csv_path)
+        df["period"] = pd.to_datetime(df["period"])
+        df["forecast_period"] = pd.to_datetime(df["forecast_period"], format="mixed")
+
+    if latest:
+        df = df[df["forecast_period"] == df["forecast_period"].max()]
+
+    return df[
+        (df["period"] >= start) & (df["period"] <= end) & df["seriesId"].isin(series)
+    ]
+
+
+# TIMING A QUERY, BEST OF A FEW RUNS
+def best_ms(query, repeats=20):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        query()
+        times.append(time.perf_counter() - started)
+
+    return min(times) * 1000
+
+
+if __name__ == "__main__":
+    topics = {
+        "weather": "master_output/master_weather_data.csv",
+        "ng_elecs": "master_output/master_ng_elecs_data.csv",
+        "wind": "master_output/master_wind_data.csv",
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "steo.sqlite")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            push_to_db.push_store(db_path=db_path, topics=list(topics))
+
+        print(
+            f"{'topic':>9} {'filter':>28} {'csv load+filter':>16} "
+            f"{'csv in memory':>14} {'sqlite':>8}   (ms)"
+        )
+
+        for topic, csv_path in topics.items():
+            loaded = pd.read_csv(csv_path)
+            loaded["period"] = pd.to_datetime(loaded["period"])
+            loaded["forecast_period"] = pd.to_datetime(
+                loaded["forecast_period"], format="mixed"
+            )
+            series_ids = list(loaded["seriesId"].unique())
+
+            filters = {
+                "1 series, all vintages": (series_ids[:1], False),
+                "3 series, latest vintage": (series_ids[:3], True),
+            }
+
+            for name, (series, latest) in filters.items():
+                args = (series, "2023-01-01", "2025-12-01", latest)
+
+                csv_ms = best_ms(lambda: csv_filter(csv_path, *args))
+                memory_ms = best_ms(lambda: csv_filter(csv_path, *args, df=loaded))
+                db_ms = best_ms(
+                    lambda: push_to_db.query_observations(
+                        series=series,
+                        start=args[1],
+                        end=args[2],
+                        latest=latest,
+                        db_path=db_path,
+                    )
+                )
+
+                print(
+                    f"{topic:>9} {name:>28} {csv_ms:>16.2f} {memory_ms:>14.2f} {db_ms:>8.2f}"
+                )
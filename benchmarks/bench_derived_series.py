@@ -0,0 +1,103 @@
+"""
+The purpose of this file is to time derived_series.py on far more formulas, series and
+vintages than we define, against the notebook way of doing it (a pivot and some column
+arithmetic per vintage per formula), and to check both give the same numbers
+
+run from the repo root: python benchmarks/bench_derived_series.py
+"""
+
+import os
+import sys
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+
+import derived_series
+
+
+N_SERIES = 600
+N_FORMULAS = 100
+N_PERIODS = 72
+VINTAGES = pd.date_range("2024-01-01", periods=12, freq="MS")
+
+
+# LONG DATA FOR EVERY MADE UP SERIES IN EVERY VINTAGE
+def synthetic_data(seed=0):
+    rng = np.random.default_rng(seed)
+    series = [f"S{i:04d}_US" for i in range(N_SERIES)]
+    periods = pd.date_range("2020-01-01", periods=N_PERIODS, freq="MS")
+
+    n = len(VINTAGES) * len(series) * len(periods)
+    return pd.DataFrame(
+        {
+            "period": np.tile(periods, len(VINTAGES) * len(series)),
+            "seriesId": np.tile(np.repeat(series, len(periods)), len(VINTAGES)),
+            "seriesDescription": "made up series",
+            "value": rng.uniform(1, 100, n),
+            "unit": "units",
+            "forecast_period": np.repeat(VINTAGES, len(series) * len(periods)),
+        }
+    )
+
+
+# TOTALS OF A FEW SERIES, AND SHARES OF THOSE TOTALS THAT SHARE THE SAME SUM
+def synthetic_definitions(seed=0):
+    rng = np.random.default_rng(seed)
+    definitions = {}
+    for i in range(N_FORMULAS // 2):
+        picked = [f"S{j:04d}_US" for j in rng.choice(N_SERIES, 4, replace=False)]
+        total = " + ".join(picked)
+        definitions[f"TOTAL{i:03d}"] = {"formula": total}
+        definitions[f"SHARE{i:03d}"] = {"formula": f"{picked[0]} / ({total}) * 100"}
+
+    return definitions
+
+
+# THE NOTEBOOK WAY, ONE VINTAGE AND ONE FORMULA AT A TIME
+def per_vintage(df, definitions):
+    frames = []
+    for vintage in VINTAGES:
+        wide = df[df["forecast_period"] == vintage].pivot_table(
+            index="period", columns="seriesId", values="value", aggfunc="last"
+        )
+        for series_id, definition in definitions.items():
+            values = wide.eval(definition["formula"])
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "period": wide.index,
+                        "seriesId": series_id,
+                        "value": values.to_numpy(),
+                        "forecast_period": vintage,
+                    }
+                )
+            )
+
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    df = synthetic_data()
+    definitions = synthetic_definitions()
+    print(f"{N_FORMULAS} formulas over {N_SERIES} series, {len(VINTAGES)} vintages, {len(df):,} rows")
+
+    started = time.perf_counter()
+    ours = derived_series.evaluate(df, definitions)
+    ours_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    theirs = per_vintage(df, definitions)
+    theirs_seconds = time.perf_counter() - started
+
+    print(f"{'every vintage at once':>28} {ours_seconds:>7.2f}s")
+    print(f"{'a vintage at a time':>28} {theirs_seconds:>7.2f}s")
+
+    key = ["seriesId", "forecast_period", "period"]
+    ours = ours.sort_values(key).reset_index(drop=True)
+    theirs = theirs.sort_values(key).reset_index(drop=True)
+    assert np.allclose(ours["value"].to_numpy(float), theirs["value"].to_numpy(float))
+    print("both give the same numbers")
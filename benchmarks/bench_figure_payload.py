@@ -0,0 +1,74 @@
+"""
+The purpose of this file is to show how the figure json sent to the browser grows
+with the number of forecast vintages, with and without reducing the data first
+
+run from the repo root: python benchmarks/bench_figure_payload.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+
+import functions as fns
+import figure_reduction
+
+
+# MAKING UP EXTRA MONTHLY VINTAGES FROM ONE REAL VINTAGE
+def fake_vintages(df, n_vintages, seed=0):
+    rng = np.random.default_rng(seed)
+    base = df[df["forecast_period"] == df["forecast_period"].max()]
+
+    dfs = []
+    for i in range(n_vintages):
+        vintage = base.copy()
+        vintage["forecast_period"] = pd.Timestamp("2024-01-01") + pd.DateOffset(months=i)
+        vintage["value"] = vintage["value"] * (1 + rng.normal(0, 0.02, len(vintage)))
+        dfs.append(vintage)
+
+    return pd.concat(dfs)
+
+
+# BUILDING A FIGURE QUIETLY AND MEASURING IT
+def payload_kb(df, series, **reduction):
+    with contextlib.redirect_stdout(io.StringIO()):
+        fig = fns.gimme_plot(
+            dataframe=df,
+            y_ax="value",
+            hue_by="forecast_period",
+            topic_choice=series,
+            color_by=None,
+            plot_type="line",
+            **reduction,
+        )
+
+    return figure_reduction.figure_payload_bytes(fig) / 1024
+
+
+if __name__ == "__main__":
+    df = pd.read_csv("master_output/master_wind_data.csv")
+    df["period"] = pd.to_datetime(df["period"])
+    df["forecast_period"] = pd.to_datetime(df["forecast_period"], format="mixed")
+
+    series = list(df["seriesId"].unique()[:4])
+
+    print(
+        f"{'vintages':>8} {'raw (KB)':>9} {'lttb 120 (KB)':>14} "
+        f"{'first/latest+4 (KB)':>20} {'both (KB)':>10}"
+    )
+
+    for n_vintages in [1, 3, 6, 12, 24, 36]:
+        many = fake_vintages(df, n_vintages)
+
+        print(
+            f"{n_vintages:>8} {payload_kb(many, series):>9.0f} "
+            f"{payload_kb(many, series, max_points=120):>14.0f} "
+            f"{payload_kb(many, series, n_vintages=4):>20.0f} "
+            f"{payload_kb(many, series, max_points=120, n_vintages=4):>10.0f}"
+        )
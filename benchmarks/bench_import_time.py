@@ -0,0 +1,109 @@
+"""
+The purpose of this file is to guard how long `import functions` takes, and to make
+sure the heavy packages (pandas, requests, plotting) are only imported when a
+function that needs them is actually used
+
+each scenario runs in a fresh interpreter under `python -X importtime`, and the
+script exits non-zero when a heavy package shows up where it should not, or when
+a scenario is slower than its budget
+
+run from the repo root: python benchmarks/bench_import_time.py
+"""
+
+import os
+import subprocess
+import sys
+
+# the repo root, so the fresh interpreters can find our modules
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+HEAVY = ["pandas", "numpy", "requests", "plotly", "matplotlib", "seaborn", "pyarrow"]
+
+# (name, code to run, heavy packages it is allowed to import, budget in ms)
+SCENARIOS = [
+    ("import functions", "import functions as fns", [], 50),
+    (
+        "create_params_obj",
+        "import functions as fns; fns.create_params_obj(['A', 'B'], '2020-01')",
+        [],
+        50,
+    ),
+    (
+        "touch fetch functions",
+        "import functions as fns; fns.grab_steo_data; fns.series_to_dataframe",
+        [],
+        50,
+    ),
+    (
+        "touch plot functions",
+        "import functions as fns; fns.gimme_plot; fns.gimme_lineplot",
+        [],
+        50,
+    ),
+    (
+        "make_session",
+        "import functions as fns; fns.make_session()",
+        ["requests"],
+        1000,
+    ),
+    (
+        "recent_forecast",
+        "import functions as fns, pandas as pd; "
+        "fns.recent_forecast(pd.DataFrame({'forecast_period': ['2024-01-01']}))",
+        ["pandas", "numpy", "pyarrow"],
+        1000,
+    ),
+]
+
+
+# RUNNING ONE SCENARIO AND READING BACK ITS -X importtime REPORT
+def import_times(code):
+    """
+    Purpose is to run code in a new interpreter and return the cumulative import
+    time (microseconds) of every top level package it imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # lines look like: "import time:   self [us] | cumulative | imported package"
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+        package = name.strip().split(".")[0]
+        times[package] = max(times.get(package, 0), int(cumulative))
+
+    return times
+
+
+if __name__ == "__main__":
+    failures = []
+
+    print(f"{'scenario':>22} {'functions (ms)':>15}   heavy packages imported")
+
+    for name, code, allowed, budget_ms in SCENARIOS:
+        # best of a few runs, the first one also pays for cold disk caches
+        runs = [import_times(code) for _ in range(3)]
+        functions_ms = min(run.get("functions", 0) for run in runs) / 1000
+
+        imported = sorted(package for package in HEAVY if package in runs[-1])
+        print(f"{name:>22} {functions_ms:>15.1f}   {', '.join(imported) or '-'}")
+
+        unexpected = [package for package in imported if package not in allowed]
+        if unexpected:
+            failures.append(f"{name}: imported {', '.join(unexpected)}")
+
+        if functions_ms > budget_ms:
+            failures.append(f"{name}: {functions_ms:.1f} ms is over {budget_ms} ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,119 @@
+"""
+The purpose of this file is to compare loading the master CSV files the way the
+dashboards do today against loading the same data from the parquet store
+
+memory is the peak RSS while loading, above where the process started, with every
+load in its own process (pandas keeps strings in arrow memory, which tracemalloc
+and memory_usage can not fully see, and parsing needs more than the frame it returns)
+
+run from the repo root: python benchmarks/bench_master_store.py
+"""
+
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+import master_store
+from bench_series_pipeline import PeakRss, current_rss
+
+
+# HOW THE DASHBOARDS LOAD A MASTER FILE TODAY
+def load_csv(csv_path):
+    df = pd.read_csv(csv_path)
+    df["period"] = pd.to_datetime(df["period"])
+
+    return df
+
+
+# TIMING A LOADER, BEST OF A FEW RUNS
+def best_time(loader, repeats=5):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        df = loader()
+        times.append(time.perf_counter() - started)
+
+    return min(times), df
+
+
+# LOADING ONE TOPIC ONE WAY IN THIS PROCESS, PRINTING ITS PEAK MEMORY
+def run_child(how, csv_path, store_path):
+    topic = master_store.topic_from_name(csv_path)
+    loaders = {
+        "csv": lambda: load_csv(csv_path),
+        "store": lambda: master_store.read_topic(topic, store_path=store_path),
+    }
+
+    # a tiny load first so whatever the readers set up the first time is in the baseline
+    warm_ups = {
+        "csv": lambda: pd.to_datetime(pd.read_csv(csv_path, nrows=5)["period"]),
+        "store": lambda: master_store.read_topic(topic, series=[""], store_path=store_path),
+    }
+    warm_ups[how]()
+
+    baseline = current_rss()
+    watcher = PeakRss()
+    df = loaders[how]()
+
+    print(f"{watcher.stop() - baseline} {len(df)}")
+
+
+# PEAK MEMORY OF ONE LOAD, IN A FRESH PROCESS SO LOADS DO NOT SHARE FREED MEMORY
+def peak_mb(how, csv_path, store_path):
+    result = subprocess.run(
+        [sys.executable, __file__, how, csv_path, store_path],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return float(result.stdout.split()[-2])
+
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    run_child(*sys.argv[1:])
+
+elif __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as store_path:
+        master_store.migrate_master_csvs(store_path=store_path)
+
+        print(
+            f"\n{'topic':>11} {'rows':>6} {'csv (ms)':>9} {'store (ms)':>11} "
+            f"{'csv peak MB':>12} {'store peak MB':>14} {'1 series (ms)':>14}"
+        )
+
+        for csv_path in sorted(glob.glob("master_output/master_*.csv")):
+            topic = master_store.topic_from_name(csv_path)
+
+            csv_time, csv_df = best_time(lambda: load_csv(csv_path))
+            store_time, store_df = best_time(
+                lambda: master_store.read_topic(topic, store_path=store_path)
+            )
+
+            # what a dashboard callback asks for: one series, a few columns
+            first_series = store_df["seriesId"].iloc[0]
+            pushdown_time, _ = best_time(
+                lambda: master_store.read_topic(
+                    topic,
+                    columns=["period", "value", "forecast_period"],
+                    series=[first_series],
+                    store_path=store_path,
+                )
+            )
+
+            csv_mb = peak_mb("csv", csv_path, store_path)
+            store_mb = peak_mb("store", csv_path, store_path)
+
+            print(
+                f"{topic:>11} {len(csv_df):>6} {csv_time * 1000:>9.1f} "
+                f"{store_time * 1000:>11.1f} {csv_mb:>12.1f} {store_mb:>14.1f} "
+                f"{pushdown_time * 1000:>14.1f}"
+            )
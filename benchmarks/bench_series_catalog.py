@@ -0,0 +1,94 @@
+"""
+The purpose of this file is to check that keyword search in the series catalog stays
+under a millisecond. It searches the catalog built from our store and a made up one
+the size of the whole STEO facet list, every query typed one letter at a time the way
+the dashboard dropdown asks for it, and once more with a cold prefix cache
+
+run from the repo root: python benchmarks/bench_series_catalog.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import series_catalog
+
+
+QUERIES = ["wind", "elec gen", "natural gas price", "ngepgen", "co2 emissions", "solar cap us"]
+
+# words the made up descriptions are built from
+WORDS = (
+    "electric power sector net generation from wind solar natural gas coal nuclear "
+    "hydro battery storage capacity price retail residential commercial industrial "
+    "transportation consumption production imports exports inventory emissions "
+    "carbon dioxide crude oil gasoline diesel jet fuel propane heating degree days"
+).split()
+UNITS = ["billion kilowatthours", "gigawatts", "dollars per mcf", "million barrels per day"]
+REGIONS = ["US", "CA", "TX", "NE", "NY", "MW", "PJ", "SE", "FL", "NW"]
+
+
+# A MADE UP CATALOG WITH AS MANY SERIES AS THE WHOLE STEO ROUTE
+def synthetic_rows(n_series, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_series):
+        rows.append(
+            {
+                "seriesId": f"S{i:05d}_{rng.choice(REGIONS)}",
+                "topic": f"topic{i % 20}",
+                "description": " ".join(rng.sample(WORDS, 8)),
+                "unit": rng.choice(UNITS),
+                "n_vintages": 24,
+                "first_vintage": "2024-01-01",
+                "last_vintage": "2025-12-01",
+                "first_period": "2010-01-01",
+                "last_period": "2026-12-01",
+            }
+        )
+
+    return rows
+
+
+# EVERY PREFIX OF A QUERY, THE WAY THE DROPDOWN SENDS THEM WHILE SOMEONE TYPES
+def keystrokes(query):
+    return [query[:n] for n in range(1, len(query) + 1)]
+
+
+# THE SLOWEST AND AVERAGE SEARCH OVER EVERY KEYSTROKE OF EVERY QUERY, IN MICROSECONDS
+def time_searches(catalog, cold):
+    timings = []
+    for query in QUERIES:
+        for typed in keystrokes(query):
+            if cold:
+                catalog._prefix_hits.clear()
+
+            started = time.perf_counter()
+            catalog.search(typed)
+            timings.append((time.perf_counter() - started) * 1e6)
+
+    return max(timings), sum(timings) / len(timings)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        store_catalog = series_catalog.build_catalog(
+            facets={}, catalog_path=os.path.join(tmp, "catalog.json")
+        )
+
+    catalogs = {"our store": store_catalog}
+    for n_series in [5_000, 50_000]:
+        started = time.perf_counter()
+        catalogs[f"{n_series:,} made up"] = series_catalog.SeriesCatalog(synthetic_rows(n_series))
+        print(f"indexing {n_series:,} series took {time.perf_counter() - started:.3f}s")
+
+    print(f"{'catalog':>16} {'series':>7} {'cache':>6} {'max us':>8} {'mean us':>8}")
+    for name, catalog in catalogs.items():
+        for cold in [True, False]:
+            worst, mean = time_searches(catalog, cold)
+            cache = "cold" if cold else "warm"
+            print(f"{name:>16} {len(catalog):>7,} {cache:>6} {worst:>8.0f} {mean:>8.0f}")
@@ -0,0 +1,158 @@
+"""
+The purpose of this file is to compare the old series_to_dataframe loop, which ran
+pd.concat([main_df, temp_df]) once per series, against the streaming pipeline
+that writes every page to the csv as it arrives, at 10, 100 and 1000 series
+
+the responses are served from a warmed up ResponseCache so both sides decode the
+exact same bytes and the stand-in server's speed does not matter. Every run is in
+its own process, and memory is how far its RSS climbed above where it started
+(pandas keeps strings in arrow memory, which tracemalloc can not see)
+
+run from the repo root: python benchmarks/bench_series_pipeline.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+import functions as fns
+import response_cache
+from fake_eia_server import start_server
+
+
+# THE OLD SERIES_TO_DATAFRAME LOOP, ONE CONCAT PER SERIES
+def old_pipeline(series_list, save_path, base_url, cache):
+    main_df = pd.DataFrame()
+
+    for series in series_list:
+        params = fns.create_params_obj(series_id=series, start_period="2000-01")
+        temp_df = fns.grab_steo_data(
+            params_object=params, api_key="fake", cache=cache, base_url=base_url
+        )
+        main_df = pd.concat([main_df, temp_df])
+
+    main_df = main_df.reset_index(drop=True)
+    main_df["value"] = main_df["value"].astype(float)
+    main_df["forecast_period"] = save_path[-11:-4]
+    main_df["forecast_period"] = pd.to_datetime(main_df["forecast_period"], format="%Y_%m")
+    main_df.to_csv(save_path, index=False)
+
+    return main_df
+
+
+# THE STREAMING PIPELINE, KEEPING THE FRAME OR ONLY WRITING THE CSV
+def new_pipeline(series_list, save_path, base_url, cache, return_frame):
+    return fns.series_to_dataframe(
+        series_list=series_list,
+        start_date="2000-01",
+        save_path=save_path,
+        key="fake",
+        cache=cache,
+        base_url=base_url,
+        return_frame=return_frame,
+    )
+
+
+PIPELINES = ["old (concat per series)", "streaming, keep frame", "streaming, csv only"]
+
+
+# HOW MUCH MEMORY THIS PROCESS HOLDS RIGHT NOW, IN MB
+def current_rss():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+# WATCHING THE HIGHEST RSS IN A BACKGROUND THREAD
+class PeakRss:
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.peak = current_rss()
+        self.running = True
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def watch(self):
+        while self.running:
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+        return self.peak
+
+
+# RUNNING ONE PIPELINE IN THIS PROCESS, PRINTING ITS TIME AND PEAK MEMORY
+def run_child(pipeline, n_series, save_path, base_url, cache_path):
+    cache = response_cache.ResponseCache(path=cache_path)
+
+    runs = {
+        "old (concat per series)": lambda series_list: old_pipeline(
+            series_list, save_path, base_url, cache
+        ),
+        "streaming, keep frame": lambda series_list: new_pipeline(
+            series_list, save_path, base_url, cache, return_frame=True
+        ),
+        "streaming, csv only": lambda series_list: new_pipeline(
+            series_list, save_path, base_url, cache, return_frame=False
+        ),
+    }
+
+    # one series first so everything the pipeline imports is already in the baseline
+    runs[pipeline](["SERIES0000"])
+
+    baseline = current_rss()
+    watcher = PeakRss()
+
+    started = time.perf_counter()
+    runs[pipeline]([f"SERIES{i:04d}" for i in range(n_series)])
+    seconds = time.perf_counter() - started
+
+    print(f"{seconds} {watcher.stop() - baseline}")
+
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    pipeline, n_series, save_path, base_url, cache_path = sys.argv[1:]
+    run_child(pipeline, int(n_series), save_path, base_url, cache_path)
+
+elif __name__ == "__main__":
+    server, base_url = start_server(latency=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.sqlite")
+        cache = response_cache.ResponseCache(path=cache_path)
+        save_path = os.path.join(tmp, "bench_data_2024_03.csv")
+
+        print(f"{'series':>7} {'rows':>8} {'pipeline':>24} {'seconds':>8} {'peak MB':>8}")
+
+        for n_series in [10, 100, 1000]:
+            series_list = [f"SERIES{i:04d}" for i in range(n_series)]
+
+            # filling the cache so every run below decodes the same saved responses
+            new_pipeline(series_list, save_path, base_url, cache, return_frame=False)
+            rows = len(pd.read_csv(save_path))
+
+            for pipeline in PIPELINES:
+                args = [pipeline, str(n_series), save_path, base_url, cache_path]
+                result = subprocess.run(
+                    [sys.executable, __file__, *args],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                seconds, peak_mb = (float(x) for x in result.stdout.split()[-2:])
+                print(f"{n_series:>7} {rows:>8,} {pipeline:>24} {seconds:>8.2f} {peak_mb:>8.1f}")
+
+    server.shutdown()
@@ -0,0 +1,88 @@
+"""
+The purpose of this file is to compare how grab_steo_data used to decode responses
+(json.loads -> list of dicts -> pd.DataFrame -> pd.to_datetime) against decoding
+them straight into typed columns with stream_decode, on recorded response fixtures
+
+record the fixtures first if benchmarks/fixtures is empty: python benchmarks/record_fixtures.py
+run from the repo root: python benchmarks/bench_stream_decode.py
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+import stream_decode
+from record_fixtures import load_fixture
+
+
+# HOW GRAB_STEO_DATA DECODED PAGES BEFORE
+def decode_json(bodies):
+    entries = []
+    for body in bodies:
+        data = json.loads(body)
+        entries.extend(data["response"]["data"])
+
+    dataframe = pd.DataFrame(data=entries)
+    dataframe["period"] = pd.to_datetime(dataframe["period"])
+
+    # series_to_dataframe did this right after
+    dataframe["value"] = dataframe["value"].astype(float)
+
+    return dataframe
+
+
+# DECODING THE SAME PAGES THE WAY GRAB_STEO_DATA DOES NOW
+def decode_stream(bodies):
+    return stream_decode.decode_pages(bodies)
+
+
+# BEST TIME AND PEAK MEMORY (TRACKED BY TRACEMALLOC) OF A DECODER
+def measure(decoder, bodies, repeats=5):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        df = decoder(bodies)
+        times.append(time.perf_counter() - started)
+
+    # a separate run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    df = decoder(bodies)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times) * 1000, peak / 1e6, df.memory_usage(deep=True).sum() / 1e6
+
+
+if __name__ == "__main__":
+    fixtures = {
+        "ng_elecs": load_fixture("ng_elecs"),
+        "transport": load_fixture("transport"),
+    }
+
+    # a long backfill pulls many pages, the same pages ten times over stand in for one
+    fixtures["ng_elecs x10"] = fixtures["ng_elecs"] * 10
+
+    print(
+        f"{'fixture':>13} {'body MB':>8} {'decoder':>8} {'ms':>8} "
+        f"{'peak MB':>8} {'frame MB':>9}"
+    )
+
+    for name, bodies in fixtures.items():
+        if len(bodies) == 0:
+            sys.exit("no fixtures found, run python benchmarks/record_fixtures.py first")
+
+        body_mb = sum(map(len, bodies)) / 1e6
+
+        for decoder_name, decoder in [("json", decode_json), ("stream", decode_stream)]:
+            ms, peak_mb, frame_mb = measure(decoder, bodies)
+            print(
+                f"{name:>13} {body_mb:>8.2f} {decoder_name:>8} {ms:>8.1f} "
+                f"{peak_mb:>8.2f} {frame_mb:>9.2f}"
+            )
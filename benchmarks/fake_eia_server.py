@@ -0,0 +1,108 @@
+"""
+The purpose of this file is to stand in for the EIA STEO API when we want to
+benchmark our fetching code without an API key or an internet connection
+"""
+
+# packages that let us run a tiny web server in the background
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# BUILDING FAKE MONTHLY OBSERVATIONS FOR A SERIES ID
+def fake_rows(series_id, start="2000-01", end="2025-12"):
+    """
+    Purpose is to make up one row per month for a series, shaped like the
+    rows the real API returns
+    """
+    start_year, start_month = (int(x) for x in start.split("-"))
+    end_year, end_month = (int(x) for x in end.split("-"))
+
+    rows = []
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        rows.append(
+            {
+                "period": f"{year}-{month:02d}",
+                "seriesId": series_id,
+                "seriesDescription": f"Synthetic series {series_id}",
+                "value": str(round(100 + (year - 2000) + month / 12, 5)),
+                "unit": "billion kilowatthours",
+            }
+        )
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+    return rows
+
+
+# ANSWERING REQUESTS THE SAME WAY THE STEO DATA ENDPOINT DOES
+class FakeSteoHandler(BaseHTTPRequestHandler):
+    # how long every response takes, set by start_server
+    latency = 0.05
+
+    # keeping a tally of how many requests we answered
+    request_count = 0
+    count_lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+
+        # pulling out the same query params that grab_steo_data sends
+        series_ids = query.get("facets[seriesId][]", [])
+        start = query.get("start", ["2000-01"])[0]
+        end = query.get("end", ["2025-12"])[0]
+        offset = int(query.get("offset", ["0"])[0])
+        length = min(int(query.get("length", ["5000"])[0]), 5000)
+
+        # every matching row sorted newest first, then by series like the sort[1] params
+        rows = []
+        for series_id in series_ids:
+            rows.extend(fake_rows(series_id, start=start, end=end))
+        rows.sort(key=lambda row: row["seriesId"])
+        rows.sort(key=lambda row: row["period"], reverse=True)
+
+        body = json.dumps(
+            {
+                "response": {
+                    "total": str(len(rows)),
+                    "data": rows[offset : offset + length],
+                }
+            }
+        ).encode()
+
+        # pretending to be a server on the other side of the country
+        time.sleep(self.latency)
+
+        with self.count_lock:
+            FakeSteoHandler.request_count += 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # keeping the benchmark output readable
+        pass
+
+
+# STARTING THE FAKE SERVER ON A FREE LOCAL PORT
+def start_server(latency=0.05):
+    """
+    Purpose is to run the fake API in a background thread.
+    Returns the server and the base url to point our functions at
+    """
+    FakeSteoHandler.latency = latency
+    FakeSteoHandler.request_count = 0
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSteoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}/v2/steo/data/"
+
+    return server, base_url
@@ -0,0 +1,146 @@
+"""
+The purpose of this file is to record STEO API response pages for
+bench_stream_decode.py to decode, saved gzipped in benchmarks/fixtures
+
+with an API key the pages are recorded from the API itself, for every series in a
+master file: python benchmarks/record_fixtures.py --key-file api_key.txt
+without one they are rebuilt from the master csv files, shaped the way the API
+sends them: python benchmarks/record_fixtures.py
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+import functions as fns
+
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# the master files we take series (and, without a key, rows) from
+MASTER_FILES = {
+    "ng_elecs": "master_output/master_ng_elecs_data.csv",
+    "transport": "master_output/master_transport_data.csv",
+}
+
+
+# A SESSION THAT KEEPS A COPY OF EVERY RESPONSE BODY IT GETS
+class RecordingSession:
+    def __init__(self, session):
+        self.session = session
+        self.bodies = []
+
+    def get(self, url, **kwargs):
+        response = self.session.get(url, **kwargs)
+
+        # reading the body up front, iter_content hands the stored copy back afterwards
+        self.bodies.append(response.content)
+
+        return response
+
+
+# RECORDING THE PAGES THE API SENDS FOR EVERY SERIES IN A MASTER FILE
+def record_from_api(csv_path, key):
+    df = pd.read_csv(csv_path)
+
+    session = RecordingSession(fns.make_session())
+    fns.fetch_series_batched(
+        series_list=list(df["seriesId"].unique()),
+        start_date="2000-01",
+        key=key,
+        session=session,
+    )
+
+    # the API echoes our request back, we do not want our key in the fixtures
+    return [body.replace(key.encode(), b"API_KEY") for body in session.bodies]
+
+
+# REBUILDING THE PAGES THE API WOULD SEND FOR A MASTER FILE'S NEWEST VINTAGE
+def rebuild_from_csv(csv_path, page_length=5000):
+    df = pd.read_csv(csv_path)
+    df = df[df["forecast_period"] == df["forecast_period"].max()]
+
+    # the API sends monthly periods as YYYY-MM and values as strings
+    df["period"] = pd.to_datetime(df["period"]).dt.strftime("%Y-%m")
+    df["value"] = df["value"].astype(str)
+
+    rows = df[["period", "seriesId", "seriesDescription", "value", "unit"]].to_dict(
+        "records"
+    )
+
+    bodies = []
+    for offset in range(0, len(rows), page_length):
+        page = {
+            "response": {
+                "total": str(len(rows)),
+                "dateFormat": "YYYY-MM",
+                "frequency": "monthly",
+                "data": rows[offset : offset + page_length],
+                "description": "Short-Term Energy Outlook",
+            },
+            "request": {
+                "command": "/v2/steo/data/",
+                "params": {
+                    "frequency": "monthly",
+                    "data": ["value"],
+                    "offset": offset,
+                    "length": page_length,
+                },
+            },
+            "apiVersion": "2.1.7",
+        }
+        bodies.append(json.dumps(page).encode())
+
+    return bodies
+
+
+# LOADING THE RECORDED PAGES OF A FIXTURE BACK IN
+def load_fixture(name):
+    """
+    Purpose is to return the recorded response bodies of a fixture, in page order
+    """
+    paths = sorted(
+        path for path in os.listdir(FIXTURES_PATH) if path.startswith(f"{name}-")
+    )
+
+    bodies = []
+    for path in paths:
+        with gzip.open(os.path.join(FIXTURES_PATH, path), "rb") as f:
+            bodies.append(f.read())
+
+    return bodies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="record STEO response fixtures")
+    parser.add_argument("--key-file", help="text file holding an EIA API key")
+    parser.add_argument("--key-line", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(FIXTURES_PATH, exist_ok=True)
+
+    for name, csv_path in MASTER_FILES.items():
+        if args.key_file:
+            key = fns.get_api_key(args.key_file, args.key_line).strip()
+            bodies = record_from_api(csv_path, key)
+        else:
+            bodies = rebuild_from_csv(csv_path)
+
+        # clearing an older recording that may have had more pages
+        for path in os.listdir(FIXTURES_PATH):
+            if path.startswith(f"{name}-"):
+                os.remove(os.path.join(FIXTURES_PATH, path))
+
+        for i, body in enumerate(bodies):
+            path = os.path.join(FIXTURES_PATH, f"{name}-{i:03d}.json.gz")
+            with gzip.open(path, "wb") as f:
+                f.write(body)
+
+        print(f"{name}: recorded {len(bodies)} pages, {sum(map(len, bodies)):,} bytes")
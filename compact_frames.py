@@ -0,0 +1,104 @@
+"""
+The purpose of this file is to hold STEO data in a compact form: descriptions and
+units live once per series in a small dimension table, and the long table of
+observations only keeps a categorical seriesId, int32 month numbers and float32 values
+"""
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+
+# TURNING DATES INTO MONTH NUMBERS AND BACK
+def to_month_ordinal(dates):
+    """
+    Purpose is to turn dates into int32 months counted from January of year 0
+    (2024-03 becomes 2024 * 12 + 2), so they are tiny and subtract like months
+    """
+    dates = pd.to_datetime(pd.Series(dates), format="mixed")
+
+    return (dates.dt.year * 12 + dates.dt.month - 1).astype("int32").to_numpy()
+
+
+def from_month_ordinal(ordinals):
+    """
+    Purpose is to go from month numbers back to first-of-the-month timestamps
+    """
+    ordinals = np.asarray(ordinals, dtype="int64")
+
+    return pd.to_datetime(
+        {"year": ordinals // 12, "month": ordinals % 12 + 1, "day": 1}
+    ).to_numpy()
+
+
+# A LONG STEO TABLE SPLIT INTO OBSERVATIONS AND A SERIES DIMENSION
+class CompactFrame:
+    """
+    Purpose is to keep STEO data small. observations has seriesId (categorical),
+    period and forecast_period (int32 month numbers) and value (float32); series is
+    indexed by seriesId and holds seriesDescription and unit once per series
+    """
+
+    def __init__(self, observations, series):
+        self.observations = observations
+        self.series = series
+
+    @classmethod
+    def from_long(cls, df):
+        """
+        builds a CompactFrame from the format series_to_dataframe and the master csvs use
+        """
+        # the dimension table, one row per series, the description and unit coming
+        # from its last row (newer rows win, like everywhere else we dedupe)
+        series = df.drop_duplicates("seriesId", keep="last")[
+            ["seriesId", "seriesDescription", "unit"]
+        ]
+        series = series.astype(str).set_index("seriesId")
+
+        observations = pd.DataFrame(
+            {
+                "seriesId": pd.Categorical(
+                    df["seriesId"].astype(str), categories=series.index
+                ),
+                "period": to_month_ordinal(df["period"]),
+                "forecast_period": to_month_ordinal(df["forecast_period"]),
+                "value": df["value"].astype("float32").to_numpy(),
+            }
+        )
+
+        return cls(observations, series)
+
+    def to_long(self):
+        """
+        returns the period, seriesId, seriesDescription, value, unit, forecast_period
+        format the notebooks and dashboards already work with
+        """
+        obs = self.observations
+        dims = self.series.reindex(obs["seriesId"].astype(str))
+
+        return pd.DataFrame(
+            {
+                "period": from_month_ordinal(obs["period"]),
+                "seriesId": obs["seriesId"].astype(str).to_numpy(),
+                "seriesDescription": dims["seriesDescription"].to_numpy(),
+                "value": obs["value"].astype(float).to_numpy(),
+                "unit": dims["unit"].to_numpy(),
+                "forecast_period": from_month_ordinal(obs["forecast_period"]),
+            }
+        )
+
+    def pivot(self, index=("period", "forecast_period"), columns="seriesId"):
+        """
+        the (period, forecast_period) x seriesId table the notebooks build by hand,
+        done on the compact integer columns. An observation that shows up twice keeps
+        its last value instead of an average of the two
+        """
+        return self.observations.pivot_table(
+            index=list(index), columns=columns, values="value", aggfunc="last", observed=True
+        )
+
+    def memory_bytes(self):
+        return int(
+            self.observations.memory_usage(deep=True).sum()
+            + self.series.memory_usage(deep=True).sum()
+        )
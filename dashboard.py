@@ -0,0 +1,361 @@
+import os
+
+from dash import Dash, dcc, html, Input, Output, State
+
+# importing our functions python script
+import functions as fns
+
+# the columnar store and the revisions computed from it
+import master_store
+import revisions
+import forecast_cube
+import snapshots
+from database import push_to_db
+
+# ids, descriptions and units of every series, searchable without loading any data
+import series_catalog
+
+# sorted, indexed and memoized access to the master data, loaded one topic at a time
+from query_layer import DatasetCache, SeriesQuery
+
+# most points any one line sends to the browser when comparing forecasts
+MAX_POINTS_PER_TRACE = 500
+
+# most memory all loaded topics can use before the least recently viewed one is dropped
+MAX_CACHE_BYTES = 256 * 1024**2
+
+# most series the series dropdown offers while someone is searching
+MAX_SERIES_OPTIONS = 100
+
+# columns every topic has, so the dropdowns do not need any data loaded
+COLUMNS = ["period", "seriesId", "seriesDescription", "value", "unit", "forecast_period"]
+
+# what the revision tables can plot, and what they can be split by (no description or unit)
+REVISION_VALUES = ["mom_change", "vs_first_change", "mom_pct", "vs_first_pct", "value"]
+REVISION_LABELS = ["seriesId", "forecast_period", "prev_forecast_period", "first_forecast_period"]
+
+
+# LOADING A TOPIC THE FIRST TIME SOMEONE LOOKS AT IT
+def load_dataset(key):
+    """
+    keys are (kind, topic), kind is either 'data' or 'revisions'
+    """
+    kind, topic = key
+
+    if kind == "revisions":
+        return revisions.read_revisions(topic)
+
+    # a published snapshot is shared with every other worker through the page cache,
+    # then the database when it has been built, then the memory mapped cube,
+    # and the parquet store otherwise
+    if snapshots.has_snapshot(topic):
+        return snapshots.SharedTopic(topic)
+
+    if os.path.exists(push_to_db.DB_PATH):
+        return SeriesQuery(push_to_db.query_observations(topic=topic))
+
+    cube_path = os.path.join(forecast_cube.CUBES_PATH, topic)
+    if os.path.exists(cube_path):
+        return SeriesQuery(forecast_cube.ForecastCube.load(cube_path))
+
+    return SeriesQuery(master_store.read_topic(topic).drop(columns="topic"))
+
+
+# every topic shares one cache, nothing is read until a topic is picked
+datasets = DatasetCache(load_dataset, max_bytes=MAX_CACHE_BYTES)
+
+# the reload file the scheduler last rewrote when this worker looked, see reload_if_signaled
+seen_reload = {"version": snapshots.reload_version()}
+
+# creating dashapp
+app = Dash(__name__)
+
+# what gunicorn serves, e.g. gunicorn dashboard:server --workers 4
+server = app.server
+
+# App layout with dropdowns and date filter, built on every page load so topics
+# added since the last release show up without restarting the app
+def serve_layout():
+    # listing the topics is just a directory listing, so page loads stay fast
+    topics = master_store.list_topics()
+
+    return html.Div(
+        [
+            # allows users to pick which topic they want to look at
+            dcc.Dropdown(
+                id="select-topic",
+                options=[{"label": topic, "value": topic} for topic in topics],
+                value=topics[0] if topics else None,
+            ),
+            # allows users to select how they want to use the dashboard
+            # either they want to compare historical forecasts or not
+            dcc.Dropdown(
+                id="select-purpose",
+                options=[
+                    {"label": "Comparison", "value": "comparison"},
+                    {"label": "Current Forecast", "value": "no comparison"},
+                    {"label": "Forecast Revisions", "value": "revisions"},
+                ],
+                value="comparison",
+            ),
+            # allows user to select hue of data visualization
+            dcc.Dropdown(
+                id="select-hue",
+                options=[{"label": col, "value": col} for col in COLUMNS],
+                value="forecast_period",
+            ),
+            # allows user to select color based on another columns
+            dcc.Dropdown(
+                id="select-color",
+                options=[
+                    {"label": col, "value": col} for col in COLUMNS if col != "forecast_period"
+                ],
+            ),
+            # allows users to select the y axis (x axis is always default period)
+            dcc.Dropdown(
+                id="select-column",
+                options=[{"label": col, "value": col} for col in COLUMNS if col != "period"],
+                value="value",
+            ),
+            # allows users to now select what kind of plot they would like to use
+            dcc.Dropdown(
+                id="select-plot",
+                options=[
+                    {"label": "Scatter", "value": "scatter"},
+                    {"label": "Line", "value": "line"},
+                    {"label": "Area Plot", "value": "area"},
+                    {"label": "Bar Plot", "value": "bar"},
+                    {"label": "Stacked Area Plot", "value": "stackedarea"},
+                ],
+                value="line",
+            ),
+            # allows users to thin out the vintages shown when comparing forecasts
+            dcc.Dropdown(
+                id="select-vintages",
+                options=[
+                    {"label": "All Vintages", "value": "all"},
+                    {"label": "First and Latest Vintage", "value": 0},
+                    {"label": "First, Latest and 2 In Between", "value": 2},
+                    {"label": "First, Latest and 4 In Between", "value": 4},
+                ],
+                value="all",
+            ),
+            # the series in the selected topic, looked up in the catalog as the user types
+            dcc.Dropdown(
+                id="select-seriesId",
+                multi=True,
+                placeholder="Search series by id, description or unit",
+            ),
+            # allows user to select and filter by date range
+            dcc.DatePickerRange(id="date-range"),
+            # shows the graph
+            dcc.Graph(id="graph"),
+        ]
+    )
+
+
+app.layout = serve_layout
+
+
+# DROPPING EVERYTHING THIS WORKER LOADED BEFORE THE LATEST RELEASE WAS INGESTED
+def reload_if_signaled():
+    version = snapshots.reload_version()
+
+    if version != seen_reload["version"]:
+        seen_reload["version"] = version
+        datasets.clear()
+
+
+# THE COLUMNS THE Y, HUE AND COLOR DROPDOWNS OFFER FOR EACH PURPOSE
+def column_choices(purpose):
+    """
+    returns (y columns, hue columns, color columns, default y) of whatever the
+    purpose plots, the master data or its revisions
+    """
+    if purpose == "revisions":
+        return (
+            REVISION_VALUES,
+            REVISION_LABELS,
+            [c for c in REVISION_LABELS if c != "forecast_period"],
+            "mom_change",
+        )
+
+    return (
+        [c for c in COLUMNS if c != "period"],
+        COLUMNS,
+        [c for c in COLUMNS if c != "forecast_period"],
+        "value",
+    )
+
+
+# Offer the columns of whatever is being plotted whenever the purpose changes
+@app.callback(
+    Output("select-column", "options"),
+    Output("select-column", "value"),
+    Output("select-hue", "options"),
+    Output("select-hue", "value"),
+    Output("select-color", "options"),
+    Output("select-color", "value"),
+    Input("select-purpose", "value"),
+    State("select-hue", "value"),
+    State("select-color", "value"),
+)
+def update_column_options(purpose, hue_column, color_col):
+    y_columns, hue_columns, color_columns, default_y = column_choices(purpose)
+
+    # y goes back to the purpose's default, hue and color are kept when they still exist
+    return (
+        [{"label": col, "value": col} for col in y_columns],
+        default_y,
+        [{"label": col, "value": col} for col in hue_columns],
+        hue_column if hue_column in hue_columns else "forecast_period",
+        [{"label": col, "value": col} for col in color_columns],
+        color_col if color_col in color_columns else None,
+    )
+
+
+# Pick the first series and the dates once a topic is picked, straight from the catalog
+@app.callback(
+    Output("select-seriesId", "value"),
+    Output("date-range", "min_date_allowed"),
+    Output("date-range", "max_date_allowed"),
+    Output("date-range", "start_date"),
+    Output("date-range", "end_date"),
+    Input("select-topic", "value"),
+)
+def update_topic(topic):
+    # a release ingested since the last request can add series and months
+    reload_if_signaled()
+
+    catalog = series_catalog.load_catalog()
+
+    series = catalog.topic_series(topic)
+    first_period, last_period = catalog.topic_range(topic)
+
+    return (
+        [entry["seriesId"] for entry in series[:1]],
+        first_period,
+        last_period,
+        first_period,
+        last_period,
+    )
+
+
+# Offer the topic's series that match what has been typed, keeping the ones already picked
+@app.callback(
+    Output("select-seriesId", "options"),
+    Input("select-topic", "value"),
+    Input("select-seriesId", "search_value"),
+    State("select-seriesId", "value"),
+)
+def update_series_options(topic, search_value, selected):
+    reload_if_signaled()
+
+    catalog = series_catalog.load_catalog()
+
+    matches = catalog.search(search_value or "", topic=topic, limit=MAX_SERIES_OPTIONS)
+
+    # the picked series have to stay in the options or the dropdown drops them
+    picked = [catalog.get(i) for i in selected or [] if i in catalog]
+    shown = {entry["seriesId"] for entry in matches}
+    entries = [entry for entry in picked if entry["seriesId"] not in shown] + matches
+
+    return [series_option(entry) for entry in entries]
+
+
+# A DROPDOWN OPTION FOR ONE CATALOG ENTRY
+def series_option(entry):
+    label = f"{entry['seriesId']} - {entry['description']}"
+    if entry["unit"]:
+        label += f" ({entry['unit']})"
+
+    # the dropdown also filters in the browser, so it gets the same words we search
+    return {"label": label, "value": entry["seriesId"], "search": label}
+
+
+# Update graph based on user selections
+@app.callback(
+    Output("graph", "figure"),
+    Input("select-topic", "value"),
+    Input("select-purpose", "value"),
+    Input("select-hue", "value"),
+    Input("select-color", "value"),
+    Input("select-column", "value"),
+    Input("select-plot", "value"),
+    Input("select-vintages", "value"),
+    Input("select-seriesId", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date"),
+)
+def update_graph(
+    topic,
+    purpose,
+    hue_column,
+    color_col,
+    column,
+    plot_type,
+    vintages,
+    series_ids,
+    start_date,
+    end_date,
+):
+    # the refresh scheduler ingested a new release since the last request
+    reload_if_signaled()
+
+    if purpose == "revisions":
+        # the saved revisions for this topic, loaded the first time they are asked for
+        rev_df = datasets.get(("revisions", topic))
+        filtered_df = rev_df[
+            (rev_df["period"] >= start_date) & (rev_df["period"] <= end_date)
+        ]
+
+        # the dropdowns offer the revision columns, this only guards a stale pick
+        y_column = column if column in REVISION_VALUES else "mom_change"
+        hue_column = hue_column if hue_column in REVISION_LABELS else "forecast_period"
+        color_col = color_col if color_col in REVISION_LABELS else None
+        reduction = {}
+
+    else:
+        # the selected series and dates, memoized by the query layer
+        filtered_df = datasets.get(("data", topic)).select(
+            series_ids, purpose, start_date, end_date
+        )
+        y_column = column
+
+        # downsampling comparisons so many vintages stay fast
+        reduction = {}
+        if purpose == "comparison":
+            reduction = {
+                "max_points": MAX_POINTS_PER_TRACE,
+                "n_vintages": None if vintages == "all" else vintages,
+            }
+
+    # importing function that returns a graph
+    fig = fns.gimme_plot(
+        dataframe=filtered_df,
+        y_ax=y_column,
+        plot_type=plot_type,
+        color_by=color_col,
+        hue_by=hue_column,
+        topic_choice=series_ids or [],
+        **reduction,
+    )
+
+    # updated the dashboard that we have created
+    fig.update_layout(
+        title="",
+        xaxis_title="",
+        yaxis_title="",
+        plot_bgcolor="white",
+        font_family="arial",
+        xaxis=dict(showgrid=False),
+        yaxis=dict(showgrid=False),
+    )
+
+    # returns the figure to the website
+    return fig
+
+
+# run the app
+if __name__ == "__main__":
+    app.run(debug=True)
@@ -1,9 +1,15 @@
 import pandas as pd
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State
 
 # importing our functions python script
 import functions as fns
 
+# sorted, indexed and memoized access to the master data
+from query_layer import SeriesQuery
+
+# precomputed forecast changes between releases
+import revisions
+
 # may want to import null if needed
 # import null
 
@@ -17,6 +23,19 @@ df = pd.read_csv("master_output/master_wind_data.csv")
 # converting our 'period' column to datetime
 df["period"] = pd.to_datetime(df["period"])
 
+# most points any one line sends to the browser when comparing forecasts
+MAX_POINTS_PER_TRACE = 500
+
+# indexing the data once so every callback is a slice instead of a full scan
+query = SeriesQuery(df)
+
+# forecast revisions for the same topic, computed once when the data was ingested
+rev_df = revisions.read_revisions("wind")
+
+# the revisions have their own change columns, and no description or unit to color by
+REVISION_VALUES = list(rev_df.select_dtypes("number").columns)
+REVISION_LABELS = [c for c in rev_df.columns if c not in REVISION_VALUES and c != "period"]
+
 # incase you wanna see the info of the data that we are grabbing
 # print(df.info())
 
@@ -33,6 +52,7 @@ app.layout = html.Div(
             options=[
                 {"label": "Comparison", "value": "comparison"},
                 {"label": "Current Forecast", "value": "no comparison"},
+                {"label": "Forecast Revisions", "value": "revisions"},
             ],
             value="comparison",
         ),
@@ -75,6 +95,17 @@ app.layout = html.Div(
             ],
             value="line",
         ),
+        # allows users to thin out the vintages shown when comparing forecasts
+        dcc.Dropdown(
+            id="select-vintages",
+            options=[
+                {"label": "All Vintages", "value": "all"},
+                {"label": "First and Latest Vintage", "value": 0},
+                {"label": "First, Latest and 2 In Between", "value": 2},
+                {"label": "First, Latest and 4 In Between", "value": 4},
+            ],
+            value="all",
+        ),
         # automatically labels the series description (y axis label)
         dcc.Dropdown(
             id="select-seriesId",
@@ -96,6 +127,54 @@ app.layout = html.Div(
 )
 
 
+# THE COLUMNS THE Y, HUE AND COLOR DROPDOWNS OFFER FOR EACH PURPOSE
+def column_choices(purpose):
+    """
+    returns (y columns, hue columns, color columns, default y) of whatever the
+    purpose plots, the master data or its revisions
+    """
+    if purpose == "revisions":
+        return (
+            REVISION_VALUES,
+            REVISION_LABELS,
+            [c for c in REVISION_LABELS if c != "forecast_period"],
+            "mom_change",
+        )
+
+    return (
+        [c for c in df.columns if c != "period"],
+        [c for c in df.columns if c != "period_forecast"],
+        [c for c in df.columns if c != "forecast_period"],
+        "value",
+    )
+
+
+# Offer the columns of whatever is being plotted whenever the purpose changes
+@app.callback(
+    Output("select-column", "options"),
+    Output("select-column", "value"),
+    Output("select-hue", "options"),
+    Output("select-hue", "value"),
+    Output("select-color", "options"),
+    Output("select-color", "value"),
+    Input("select-purpose", "value"),
+    State("select-hue", "value"),
+    State("select-color", "value"),
+)
+def update_column_options(purpose, hue_column, color_col):
+    y_columns, hue_columns, color_columns, default_y = column_choices(purpose)
+
+    # y goes back to the purpose's default, hue and color are kept when they still exist
+    return (
+        [{"label": col, "value": col} for col in y_columns],
+        default_y,
+        [{"label": col, "value": col} for col in hue_columns],
+        hue_column if hue_column in hue_columns else "forecast_period",
+        [{"label": col, "value": col} for col in color_columns],
+        color_col if color_col in color_columns else None,
+    )
+
+
 # Update graph based on user selections
 @app.callback(
     Output("graph", "figure"),
@@ -104,6 +183,7 @@ app.layout = html.Div(
     Input("select-color", "value"),  # serves as a second color/hue
     Input("select-column", "value"),
     Input("select-plot", "value"),
+    Input("select-vintages", "value"),
     Input("select-seriesId", "value"),
     Input("date-range", "start_date"),
     Input("date-range", "end_date"),
@@ -114,6 +194,7 @@ def update_graph(
     color_col,
     column,
     plot_type,
+    vintages,
     seriesDescription,
     start_date,
     end_date,
@@ -124,18 +205,54 @@ def update_graph(
         is user does not want a comparison, then just allow them to see most recent 
         forecast
         """
-        # we are returning any data that has the most recent period
-        recent_df = fns.recent_forecast(df=df)
+        # most recent forecast for the selected series and dates, memoized by the query layer
+        filtered_df = query.select(
+            seriesDescription, "no comparison", start_date, end_date
+        )
 
-        # filtered recent forecast by date
-        filtered_df = recent_df[
-            (recent_df["period"] >= start_date) & (recent_df["period"] <= end_date)
+        # importing function that returns a graph
+        fig = fns.gimme_plot(
+            dataframe=filtered_df,
+            y_ax=column,
+            plot_type=plot_type,
+            color_by=color_col,
+            hue_by=hue_column,
+            topic_choice=seriesDescription,
+        )
+
+        # updated the dashboard that we have created
+        fig.update_layout(
+            title="",
+            xaxis_title="",
+            yaxis_title="",
+            plot_bgcolor="white",
+            font_family="arial",
+            xaxis=dict(showgrid=False),
+            yaxis=dict(showgrid=False),
+        )
+
+        # returns the figure to the website
+        return fig
+
+    elif purpose == "revisions":
+        """
+        show how each forecast changed from the release before it, using the
+        revisions that were computed when the data was ingested
+        """
+        # filtered revisions by date
+        filtered_df = rev_df[
+            (rev_df["period"] >= start_date) & (rev_df["period"] <= end_date)
         ]
 
+        # the dropdowns offer the revision columns, this only guards a stale pick
+        y_column = column if column in REVISION_VALUES else "mom_change"
+        hue_column = hue_column if hue_column in REVISION_LABELS else "forecast_period"
+        color_col = color_col if color_col in REVISION_LABELS else None
+
         # importing function that returns a graph
         fig = fns.gimme_plot(
             dataframe=filtered_df,
-            y_ax=column,
+            y_ax=y_column,
             plot_type=plot_type,
             color_by=color_col,
             hue_by=hue_column,
@@ -160,10 +277,10 @@ def update_graph(
         """
         run this code if the user descides they want to compare forecasts to track changes
         """
-        # filtered recent forecast by date
-        filtered_df = df[(df["period"] >= start_date) & (df["period"] <= end_date)]
+        # every forecast for the selected series and dates, memoized by the query layer
+        filtered_df = query.select(seriesDescription, "comparison", start_date, end_date)
 
-        # importing function that returns a graph
+        # importing function that returns a graph, downsampled so many vintages stay fast
         fig = fns.gimme_plot(
             dataframe=filtered_df,
             y_ax=column,
@@ -171,6 +288,8 @@ def update_graph(
             color_by=color_col,
             hue_by=hue_column,
             topic_choice=seriesDescription,
+            max_points=MAX_POINTS_PER_TRACE,
+            n_vintages=None if vintages == "all" else vintages,
         )
 
         # updated the dashboard that we have created
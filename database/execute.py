@@ -1,3 +1,236 @@
 """
 This script executes functions from pull_data.py and push_to_db.py
+
+run from the repo root:
+    python database/execute.py backfill --key-file api_key.txt
+    python database/execute.py backfill --metrics-jsonl output/metrics.jsonl --profile cprofile
+    python database/execute.py push
 """
+
+# we will need to access files from our system
+import os
+import json
+import time
+import argparse
+
+# running the backfill work across several processes
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# pull_data puts the repo root on our path, so it has to come first
+import pull_data
+import push_to_db
+import functions as fns
+import master_store
+import archive_parser
+import instrumentation
+import render_visuals
+
+
+# where the backfill remembers what it has already finished
+CHECKPOINT_PATH = "output/backfill_checkpoint.json"
+
+
+# LOADING AND SAVING WHAT THE BACKFILL HAS ALREADY DONE
+def load_checkpoint(path=CHECKPOINT_PATH):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    return {}
+
+
+def save_checkpoint(done, path=CHECKPOINT_PATH):
+    # writing to a temp file first so a crash mid-write never corrupts the checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(done, f, indent=2, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+# LAYING OUT EVERY (TOPIC, VINTAGE) THAT STILL NEEDS TO BE FILLED IN
+def plan_backfill(topics, done, archive_paths, key=None):
+    """
+    Purpose is to turn the topics and sources into jobs. Each archived workbook is
+    one job covering every topic it still owes us, and the API is one job per topic
+    for the vintage it serves today. Returns a list of (kind, source, vintage, topics)
+    """
+    jobs = []
+
+    # two sources for the same vintage would write the same partition, so the first one wins
+    planned = set(done)
+
+    for path in archive_paths:
+        vintage = archive_parser.read_vintage(path)
+        pending = {
+            topic: series
+            for topic, series in topics.items()
+            if f"{topic}|{vintage:%Y-%m}" not in planned
+        }
+        if pending:
+            jobs.append(("archive", path, vintage, pending))
+            planned.update(f"{topic}|{vintage:%Y-%m}" for topic in pending)
+
+    if key is not None:
+        vintage = pull_data.api_vintage()
+        for topic, series in topics.items():
+            if f"{topic}|{vintage:%Y-%m}" not in planned:
+                jobs.append(("api", topic, vintage, {topic: series}))
+
+    return jobs
+
+
+# RUNNING ONE JOB INSIDE A WORKER PROCESS
+def run_job(job, key=None, store_path=master_store.STORE_PATH):
+    kind, source, vintage, topics = job
+
+    if kind == "archive":
+        return pull_data.pull_archive_vintage(source, topics, store_path=store_path)
+
+    topic, series = next(iter(topics.items()))
+    return pull_data.pull_api_vintage(topic, series, vintage, key, store_path=store_path)
+
+
+# FILLING IN THE WHOLE HISTORY ACROSS A POOL OF PROCESSES
+def backfill(
+    key=None,
+    archive_paths=None,
+    max_workers=None,
+    checkpoint_path=CHECKPOINT_PATH,
+    store_path=master_store.STORE_PATH,
+    metrics=None,
+):
+    """
+    Purpose is to fill the store with every (topic, vintage) we can get from the
+    archived workbooks and the API. Finished units are checkpointed as they land,
+    so running this again after a crash picks up where it stopped.
+    metrics (an instrumentation.Metrics) gets jobs, units, rows and failures and
+    how long the jobs and rebuilding the derived data took
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    done = load_checkpoint(checkpoint_path)
+    topics = pull_data.topic_series(store_path)
+
+    if archive_paths is None:
+        archive_paths = sorted(
+            os.path.join(archive_parser.ARCHIVE_FOLDER, f)
+            for f in os.listdir(archive_parser.ARCHIVE_FOLDER)
+            if f.endswith(".xlsx")
+        )
+
+    jobs = plan_backfill(topics, done, archive_paths, key=key)
+    print(f"{len(jobs)} job(s) to run, {len(done)} (topic, vintage) unit(s) already done")
+
+    started = time.perf_counter()
+    units, rows = 0, 0
+    touched = set()
+
+    metrics.count("jobs", len(jobs))
+
+    with metrics.stage("jobs"), ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_job, job, key, store_path): job for job in jobs}
+
+        for future in as_completed(futures):
+            kind, source, vintage, _ = futures[future]
+
+            try:
+                written = future.result()
+            except Exception as e:
+                # leaving it out of the checkpoint so the next run tries it again
+                print(f"error running {kind} job {source}: {e}")
+                metrics.count("failed_jobs")
+                continue
+
+            # checkpointing every (topic, vintage) this job finished
+            for topic, n_rows in written.items():
+                done[f"{topic}|{vintage:%Y-%m}"] = {"source": kind, "rows": n_rows}
+                units += 1
+                rows += n_rows
+                metrics.count("units")
+                metrics.count("rows", n_rows)
+                if n_rows > 0:
+                    touched.add(topic)
+
+            save_checkpoint(done, checkpoint_path)
+
+            elapsed = time.perf_counter() - started
+            # a unit is one (topic, vintage) pair, not a whole vintage
+            print(
+                f"[{units} units, {rows} rows] {kind} {source} ({vintage:%Y-%m}) done "
+                f"- {units / elapsed:.2f} topic-vintages/sec, {rows / elapsed:,.0f} rows/sec"
+            )
+
+    # the revisions, cubes and snapshots only need rebuilding for topics that got new vintages
+    for topic in sorted(touched):
+        with metrics.stage("rebuild_derived"):
+            fns.rebuild_derived(topic, store_path=store_path)
+
+    # so do the popular visuals drawn from the store, unchanged ones are skipped
+    if touched:
+        with metrics.stage("render_visuals"):
+            render_visuals.render_all(store_path=store_path, metrics=metrics)
+
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EIA STEO data pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = commands.add_parser(
+        "backfill", help="fill in every topic and vintage from the archives and the API"
+    )
+    backfill_parser.add_argument("--key-file", help="txt file holding the EIA API key")
+    backfill_parser.add_argument("--key-line", type=int, default=0)
+    backfill_parser.add_argument("--archives", nargs="*", help="workbooks to parse")
+    backfill_parser.add_argument("--workers", type=int, default=None)
+    backfill_parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    backfill_parser.add_argument(
+        "--push", action="store_true", help="push the store into the database afterwards"
+    )
+    backfill_parser.add_argument("--metrics-jsonl", help="append the run's metrics here")
+    backfill_parser.add_argument("--prometheus", help="write the run's metrics here")
+    backfill_parser.add_argument(
+        "--profile",
+        nargs="*",
+        default=[],
+        choices=["cprofile", "tracemalloc"],
+        help="profile the main process (the jobs run in their own processes)",
+    )
+
+    push_parser = commands.add_parser(
+        "push", help="load the master store into the sqlite database"
+    )
+    push_parser.add_argument("--db", default=push_to_db.DB_PATH)
+    push_parser.add_argument("--topics", nargs="*")
+
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        key = None
+        if args.key_file:
+            key = fns.get_api_key(args.key_file, args.key_line).strip()
+
+        # the summary is always printed, the files only when asked for
+        sinks = [instrumentation.LogSink()]
+        if args.metrics_jsonl:
+            sinks.append(instrumentation.JsonLinesSink(args.metrics_jsonl))
+        if args.prometheus:
+            sinks.append(instrumentation.PrometheusSink(args.prometheus))
+
+        with instrumentation.record_run("backfill", sinks=sinks, profile=args.profile) as metrics:
+            backfill(
+                key=key,
+                archive_paths=args.archives,
+                max_workers=args.workers,
+                checkpoint_path=args.checkpoint,
+                metrics=metrics,
+            )
+
+            if args.push:
+                with metrics.stage("push"):
+                    push_to_db.push_store()
+
+    elif args.command == "push":
+        push_to_db.push_store(db_path=args.db, topics=args.topics)
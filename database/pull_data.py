@@ -2,3 +2,86 @@
 This script pulls data for EIA STEO.
 It processes it and outputs a master dataset with various sources
 """
+
+# we will need to access files from our system
+import os
+import sys
+import datetime
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import functions as fns
+import master_store
+import archive_parser
+import release_schedule
+import derived_series
+
+
+# GRABBING THE SERIES IDS THAT MAKE UP EACH TOPIC
+def topic_series(store_path=master_store.STORE_PATH):
+    """
+    Purpose is to return {topic: [seriesIds]} from what the master store already tracks.
+    The derived series are computed from the others, so they are never pulled
+    """
+    series = {}
+    for topic in master_store.list_topics(store_path):
+        if topic == derived_series.DERIVED_TOPIC:
+            continue
+
+        df = master_store.read_topic(topic, columns=["seriesId"], store_path=store_path)
+        series[topic] = sorted(str(s) for s in df["seriesId"].unique())
+
+    return series
+
+
+# FIGURING OUT WHICH VINTAGE THE API IS SERVING RIGHT NOW
+def api_vintage(today=None):
+    """
+    Purpose is to return the forecast month the API currently serves, going by the
+    release schedule, or this month if the schedule has run out
+    """
+    today = today or datetime.date.today()
+    vintage = release_schedule.current_vintage(today)
+
+    if vintage is None or release_schedule.next_release(today) is None:
+        vintage = today.replace(day=1)
+
+    return vintage
+
+
+# PULLING ONE TOPIC'S CURRENT VINTAGE FROM THE API
+def pull_api_vintage(topic, series_list, vintage, key, start_date="2000-01", store_path=master_store.STORE_PATH):
+    """
+    Purpose is to grab a topic's series from the API and write them into the store
+    as the given vintage. Returns {topic: rows written}
+    """
+    df = fns.fetch_series_batched(series_list=series_list, start_date=start_date, key=key)
+
+    df["value"] = df["value"].astype(float)
+    df["forecast_period"] = vintage
+
+    master_store.write_topic(df, topic, store_path=store_path)
+
+    return {topic: len(df)}
+
+
+# PULLING EVERY TOPIC OUT OF ONE ARCHIVED WORKBOOK
+def pull_archive_vintage(path, topics, store_path=master_store.STORE_PATH):
+    """
+    Purpose is to parse an archived workbook once and write the rows that belong to
+    each topic into the store. topics is {topic: [seriesIds]}. Returns {topic: rows written}
+    """
+    archive_df = archive_parser.parse_workbook(path)
+
+    written = {}
+    for topic, series_list in topics.items():
+        topic_df = archive_df[archive_df["seriesId"].isin(series_list)]
+
+        # older workbooks may not carry every series a topic tracks today
+        if len(topic_df) > 0:
+            master_store.write_topic(topic_df, topic, store_path=store_path)
+
+        written[topic] = len(topic_df)
+
+    return written
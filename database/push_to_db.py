@@ -1,3 +1,257 @@
 """
-This script sets up the database and pushes processed data from pull_data.py
+This script sets up the database and pushes processed data from pull_data.py.
+It also holds the queries that the functions package and the dashboards use to read it back
 """
+
+# we will need to access files from our system
+import os
+import sys
+import sqlite3
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# importing packages that will allow us to transform our data
+import pandas as pd
+
+import master_store
+
+
+# where the database lives unless told otherwise
+DB_PATH = "master_output/steo.sqlite"
+
+# one table describing each series in each topic it is part of (a series can be in
+# several), one long table of every forecast value
+SERIES_TABLE = """
+CREATE TABLE IF NOT EXISTS series (
+    seriesId TEXT NOT NULL,
+    description TEXT,
+    unit TEXT,
+    topic TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (seriesId, topic)
+);
+"""
+
+SCHEMA = SERIES_TABLE + """
+CREATE TABLE IF NOT EXISTS observations (
+    seriesId TEXT NOT NULL,
+    period TEXT NOT NULL,
+    forecast_period TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (seriesId, forecast_period, period)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS observations_vintage ON observations (forecast_period, seriesId);
+CREATE INDEX IF NOT EXISTS series_topic ON series (topic);
+"""
+
+
+# OPENING THE DATABASE AND MAKING SURE THE TABLES ARE THERE
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+
+    # write ahead logging lets the dashboards read while we are writing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    migrate_series_table(conn)
+    conn.executescript(SCHEMA)
+
+    return conn
+
+
+# DATABASES BUILT BEFORE SERIES WERE KEYED BY (SERIESID, TOPIC) GET THEIR TABLE REBUILT
+def migrate_series_table(conn):
+    keys = [row[1] for row in conn.execute("PRAGMA table_info(series)") if row[5]]
+    if keys != ["seriesId"]:
+        return
+
+    with conn:
+        conn.execute("ALTER TABLE series RENAME TO series_old")
+        conn.execute("DROP INDEX IF EXISTS series_topic")
+        conn.execute(SERIES_TABLE)
+        conn.execute(
+            """
+            INSERT INTO series (seriesId, description, unit, topic)
+            SELECT seriesId, description, unit, COALESCE(topic, '') FROM series_old
+            """
+        )
+        conn.execute("DROP TABLE series_old")
+
+
+# PUSHING A STEO DATAFRAME INTO THE DATABASE
+def push_frame(conn, df, topic=None, batch_size=50_000, replace=False):
+    """
+    Purpose is to upsert a dataframe shaped like series_to_dataframe's output.
+    Rows go in batch_size at a time, each batch in its own transaction.
+    replace first deletes whatever the database has for every (seriesId, vintage)
+    in df, all in one transaction, so rows the source dropped go too.
+    Returns the number of observations written
+    """
+    df = df.copy()
+
+    # dates are stored as ISO text so they sort and compare correctly in sqlite
+    df["period"] = pd.to_datetime(df["period"], format="mixed").dt.strftime("%Y-%m-%d")
+    df["forecast_period"] = pd.to_datetime(
+        df["forecast_period"], format="mixed"
+    ).dt.strftime("%Y-%m-%d")
+
+    # one row per series for the series table
+    series = df.drop_duplicates("seriesId", keep="last")
+    series_rows = [
+        (str(s), str(d), str(u), topic or "")
+        for s, d, u in zip(series["seriesId"], series["seriesDescription"], series["unit"])
+    ]
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO series (seriesId, description, unit, topic) VALUES (?, ?, ?, ?)
+            ON CONFLICT (seriesId, topic) DO UPDATE SET
+                description = excluded.description,
+                unit = excluded.unit
+            """,
+            series_rows,
+        )
+
+    observations = df[["seriesId", "period", "forecast_period", "value"]]
+    observations = observations.astype({"seriesId": str, "value": float})
+
+    def insert(batch):
+        conn.executemany(
+            """
+            INSERT INTO observations (seriesId, period, forecast_period, value)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (seriesId, forecast_period, period) DO UPDATE SET
+                value = excluded.value
+            """,
+            batch.itertuples(index=False, name=None),
+        )
+
+    batches = [
+        observations.iloc[start : start + batch_size]
+        for start in range(0, len(observations), batch_size)
+    ]
+
+    if replace:
+        # deleting and inserting in one transaction, readers never see the gap in between
+        pairs = observations[["seriesId", "forecast_period"]].drop_duplicates()
+        with conn:
+            conn.executemany(
+                "DELETE FROM observations WHERE seriesId = ? AND forecast_period = ?",
+                pairs.itertuples(index=False, name=None),
+            )
+            for batch in batches:
+                insert(batch)
+
+    else:
+        for batch in batches:
+            with conn:
+                insert(batch)
+
+    return len(observations)
+
+
+# PUSHING EVERYTHING IN THE MASTER STORE INTO THE DATABASE
+def push_store(db_path=DB_PATH, store_path=master_store.STORE_PATH, topics=None):
+    """
+    Purpose is to make the database hold exactly what the store has for every
+    vintage of the given topics (every topic by default)
+    """
+    conn = connect(db_path)
+
+    try:
+        for topic in topics or master_store.list_topics(store_path):
+            df = master_store.read_topic(topic, store_path=store_path)
+            n_rows = push_frame(conn, df, topic=topic, replace=True)
+
+            print(f"pushed {n_rows} observations for topic '{topic}' into {db_path}")
+
+        conn.execute("ANALYZE")
+
+    finally:
+        conn.close()
+
+
+# READING OBSERVATIONS BACK OUT OF THE DATABASE
+def query_observations(
+    series=None,
+    topic=None,
+    start=None,
+    end=None,
+    forecast_periods=None,
+    latest=False,
+    db_path=DB_PATH,
+):
+    """
+    Purpose is to return observations in the same long format series_to_dataframe gives us,
+    only for the series, dates and vintages asked for. latest only keeps the most recent
+    forecast period of each series
+    """
+    clauses, params = [], []
+
+    if series is not None:
+        series = [series] if isinstance(series, str) else list(series)
+        clauses.append(f"o.seriesId IN ({','.join('?' * len(series))})")
+        params.extend(series)
+    # a series can be in several topics, without one we take any of its descriptions
+    series_table = (
+        "(SELECT seriesId, MAX(description) AS description, MAX(unit) AS unit"
+        " FROM series GROUP BY seriesId)"
+    )
+    if topic is not None:
+        series_table = "series"
+        clauses.append("s.topic = ?")
+        params.append(topic)
+    if start is not None:
+        clauses.append("o.period >= ?")
+        params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+    if end is not None:
+        clauses.append("o.period <= ?")
+        params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+    if forecast_periods is not None:
+        vintages = [pd.Timestamp(v).strftime("%Y-%m-%d") for v in forecast_periods]
+        clauses.append(f"o.forecast_period IN ({','.join('?' * len(vintages))})")
+        params.extend(vintages)
+    if latest:
+        # the newest vintage of each series, found through the primary key
+        clauses.append(
+            "o.forecast_period = (SELECT MAX(forecast_period) FROM observations o2"
+            " WHERE o2.seriesId = o.seriesId)"
+        )
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    sql = f"""
+        SELECT o.period, o.seriesId, s.description AS seriesDescription,
+               o.value, s.unit, o.forecast_period
+        FROM observations o
+        JOIN {series_table} s ON s.seriesId = o.seriesId
+        {where}
+        ORDER BY o.seriesId, o.forecast_period, o.period DESC
+    """
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        df = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+    df["period"] = pd.to_datetime(df["period"])
+    df["forecast_period"] = pd.to_datetime(df["forecast_period"])
+
+    return df
+
+
+# LISTING WHAT SERIES THE DATABASE KNOWS ABOUT
+def query_series(topic=None, db_path=DB_PATH):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if topic is None:
+            return pd.read_sql_query("SELECT * FROM series ORDER BY seriesId", conn)
+
+        return pd.read_sql_query(
+            "SELECT * FROM series WHERE topic = ? ORDER BY seriesId", conn, params=[topic]
+        )
+    finally:
+        conn.close()
@@ -0,0 +1,445 @@
+"""
+The purpose of this file is to define series we compute from other series, e.g. a net
+balance (PAPR_WORLD - PATC_WORLD) or a share, as formulas over seriesIds instead of
+pivots and iloc arithmetic in notebooks.
+All formulas are evaluated together, on every vintage at once: the inputs are pivoted
+once, formulas can use each other, and a piece of a formula that shows up in several
+of them is only computed once. The results come back in the same long format as
+series_to_dataframe, so they go straight into gimme_plot or the master store, where
+refresh_derived() only recomputes the formulas and vintages whose inputs changed
+"""
+
+# we will need to access files from our system
+import ast
+import functools
+import graphlib
+import json
+import os
+import shutil
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+# the inputs are read from, and the results written to, the master store
+import master_store
+
+
+# the store topic the derived series are written under
+DERIVED_TOPIC = "derived"
+
+# what every derived series is computed from. unit defaults to the inputs' unit when
+# they all share one, description defaults to the formula
+DERIVED = {
+    "PANB_WORLD": {
+        "formula": "PAPR_WORLD - PATC_WORLD",
+        "description": "World liquid fuels net balance (production minus consumption)",
+    },
+    "BATOTCGW_US": {
+        "formula": "BACHCGW_US + BAEPCGW_US",
+        "description": "U.S. battery storage net summer generating capacity, all sectors",
+    },
+    "SOEPGEN_ISO": {
+        "formula": (
+            "sum(SOEPGEN_MW, SOEPGEN_NE, SOEPGEN_NY, SOEPGEN_PJ, SOEPGEN_SP, SOEPGEN_TX)"
+        ),
+        "description": (
+            "Electric power sector net generation from utility-scale solar, ISO regions"
+        ),
+    },
+    "WNEPGEN_ISO": {
+        "formula": "sum(WNEPGEN_MW, WNEPGEN_NE, WNEPGEN_NY, WNEPGEN_PJ, WNEPGEN_SP, WNEPGEN_TX)",
+        "description": "Electric power sector net generation from wind, ISO regions",
+    },
+    "SOWNGEN_ISO": {
+        "formula": "SOEPGEN_ISO + WNEPGEN_ISO",
+        "description": "Electric power sector net generation from solar and wind, ISO regions",
+    },
+    "SOSHR_ISO": {
+        "formula": "SOEPGEN_ISO / (SOEPGEN_ISO + WNEPGEN_ISO) * 100",
+        "description": "Solar share of solar and wind generation, ISO regions",
+        "unit": "percent",
+    },
+}
+
+# arithmetic formulas can use
+OPERATORS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+    ast.Pow: np.power,
+    ast.USub: np.negative,
+    ast.UAdd: np.positive,
+}
+
+# functions formulas can call, all of them work element by element
+FUNCTIONS = {
+    "abs": np.abs,
+    "sum": lambda *columns: functools.reduce(np.add, columns),
+    "min": lambda *columns: functools.reduce(np.fmin, columns),
+    "max": lambda *columns: functools.reduce(np.fmax, columns),
+}
+
+
+# A PARSED AND CHECKED FORMULA
+class Formula:
+    """
+    Purpose is to hold one derived series' expression tree and the seriesIds it reads
+    """
+
+    def __init__(self, series_id, formula, description=None, unit=None):
+        self.series_id = series_id
+        self.formula = formula
+        self.description = description or formula
+        self.unit = unit
+
+        try:
+            self.tree = ast.parse(formula, mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"{series_id}: can not parse formula '{formula}': {e.msg}")
+
+        self.inputs = set()
+        for node in ast.walk(self.tree):
+            check_node(series_id, node)
+            if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+                self.inputs.add(node.id)
+
+
+# MAKING SURE A FORMULA ONLY USES ARITHMETIC, NUMBERS, SERIESIDS AND OUR FUNCTIONS
+def check_node(series_id, node):
+    allowed = (ast.BinOp, ast.UnaryOp, ast.Name, ast.Load) + tuple(OPERATORS)
+
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return
+    elif isinstance(node, ast.Call):
+        if isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS and not node.keywords:
+            return
+    elif isinstance(node, allowed):
+        return
+
+    raise ValueError(f"{series_id}: {ast.unparse(node)} is not allowed in a formula")
+
+
+# PARSING THE DEFINITIONS AND PUTTING THEM IN AN ORDER WE CAN EVALUATE THEM IN
+def parse_definitions(definitions=DERIVED):
+    """
+    Purpose is to return {seriesId: Formula} ordered so every derived series comes
+    after the derived series it uses. Raises ValueError on a cycle
+    """
+    formulas = {
+        series_id: Formula(series_id, **definition)
+        for series_id, definition in definitions.items()
+    }
+
+    graph = {
+        series_id: formula.inputs & set(formulas) for series_id, formula in formulas.items()
+    }
+    try:
+        order = list(graphlib.TopologicalSorter(graph).static_order())
+    except graphlib.CycleError as e:
+        raise ValueError(f"derived series use each other in a loop: {' -> '.join(e.args[1])}")
+
+    return {series_id: formulas[series_id] for series_id in order}
+
+
+# THE STORED SERIES EACH DERIVED SERIES ENDS UP READING, THROUGH OTHER DERIVED SERIES TOO
+def leaf_inputs(formulas):
+    leaves = {}
+    for series_id, formula in formulas.items():
+        leaves[series_id] = set()
+        for name in formula.inputs:
+            leaves[series_id] |= leaves[name] if name in formulas else {name}
+
+    return leaves
+
+
+# EVALUATING EVERY FORMULA ON EVERY VINTAGE IN ONE PASS
+def evaluate(df, definitions=DERIVED, only=None):
+    """
+    Purpose is to compute the derived series from long data (period, seriesId, value,
+    unit, forecast_period, ...). only limits it to some derived series, plus whatever
+    they use. Derived series whose inputs are not in df are left out.
+    Returns the derived series in the same long format
+    """
+    formulas = parse_definitions(definitions)
+
+    # with every definition gone there is nothing to compute, only old rows to clear out
+    if not formulas:
+        cleared = master_store.list_vintages(DERIVED_TOPIC, store_path)
+        shutil.rmtree(os.path.join(store_path, f"topic={DERIVED_TOPIC}"), ignore_errors=True)
+        if os.path.exists(state_path_for(store_path)):
+            os.remove(state_path_for(store_path))
+        return cleared
+
+    leaves = leaf_inputs(formulas)
+
+    available = set(df["seriesId"].astype(str).unique())
+    wanted = set(formulas) if only is None else set(only)
+    needed = set()
+    for series_id in formulas:
+        if series_id in wanted and leaves[series_id] <= available:
+            needed |= {series_id} | derived_uses(formulas, series_id)
+
+    if not needed:
+        return empty_frame()
+
+    # one wide table of every input we need, a row per (vintage, period), a column per series
+    inputs = set().union(*(leaves[series_id] for series_id in needed))
+    df = df[df["seriesId"].isin(list(inputs))]
+    wide = df.pivot_table(
+        index=["forecast_period", "period"],
+        columns="seriesId",
+        values="value",
+        aggfunc="last",
+        observed=True,
+    )
+    columns = {str(name): wide[name].to_numpy(dtype=float) for name in wide.columns}
+
+    # the same piece of formula (e.g. SOEPGEN_ISO + WNEPGEN_ISO) is only computed once
+    computed = {}
+
+    def compute(node):
+        key = ast.dump(node)
+        if key in computed:
+            return computed[key]
+
+        if isinstance(node, ast.Name):
+            result = columns[node.id]
+        elif isinstance(node, ast.Constant):
+            result = float(node.value)
+        elif isinstance(node, ast.UnaryOp):
+            result = OPERATORS[type(node.op)](compute(node.operand))
+        elif isinstance(node, ast.BinOp):
+            result = OPERATORS[type(node.op)](compute(node.left), compute(node.right))
+        else:
+            result = FUNCTIONS[node.func.id](*[compute(arg) for arg in node.args])
+
+        computed[key] = result
+        return result
+
+    results = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for series_id, formula in formulas.items():
+            if series_id not in needed:
+                continue
+
+            values = np.broadcast_to(compute(formula.tree), len(wide)).astype(float)
+            # dividing by zero gives infinities, those are missing values to us
+            values[~np.isfinite(values)] = np.nan
+            columns[series_id] = values
+
+            if series_id in wanted:
+                results[series_id] = values
+
+    units = df.drop_duplicates("seriesId", keep="last").set_index("seriesId")["unit"]
+
+    return long_frame(results, wide.index, formulas, units, leaves)
+
+
+# THE DERIVED SERIES SERIES_ID USES ALONG THE WAY
+def derived_uses(formulas, series_id):
+    used = set()
+    for name in formulas[series_id].inputs:
+        if name in formulas:
+            used |= {name} | derived_uses(formulas, name)
+
+    return used
+
+
+# THE DERIVED SERIES IN THE USUAL LONG FORMAT, BUILT IN ONE GO
+def long_frame(results, index, formulas, units, leaves):
+    if not results:
+        return empty_frame()
+
+    descriptions, unit_list = [], []
+    for series_id in results:
+        unit = formulas[series_id].unit
+        if unit is None:
+            input_units = {str(units[n]) for n in leaves[series_id] if n in units.index}
+            unit = input_units.pop() if len(input_units) == 1 else ""
+        descriptions.append(formulas[series_id].description)
+        unit_list.append(unit)
+
+    n_series, n_rows = len(results), len(index)
+    frame = pd.DataFrame(
+        {
+            "period": np.tile(index.get_level_values("period"), n_series),
+            "seriesId": np.repeat(list(results), n_rows),
+            "seriesDescription": np.repeat(descriptions, n_rows),
+            "value": np.concatenate(list(results.values())),
+            "unit": np.repeat(unit_list, n_rows),
+            "forecast_period": np.tile(index.get_level_values("forecast_period"), n_series),
+        }
+    )
+
+    return frame[frame["value"].notna()].reset_index(drop=True)
+
+
+def empty_frame():
+    return pd.DataFrame(
+        columns=["period", "seriesId", "seriesDescription", "value", "unit", "forecast_period"]
+    )
+
+
+# THE (SERIESID, VINTAGE) OF EVERY ROW
+def pairs(df):
+    return pd.MultiIndex.from_arrays([df["seriesId"].astype(str), df["forecast_period"]])
+
+
+# A FINGERPRINT OF EVERY (SERIESID, VINTAGE) OF THE INPUTS
+def input_fingerprints(df):
+    """
+    Purpose is to return {"seriesId|YYYY-MM-DD": hash}, a hash of the periods and
+    values of every series in every vintage, so we can tell which ones changed
+    """
+    hashes = pd.util.hash_pandas_object(df[["period", "value"]], index=False)
+    keys = df["seriesId"].astype(str) + "|" + df["forecast_period"].dt.strftime("%Y-%m-%d")
+
+    # summing the row hashes does not care what order the rows come back in
+    sums = hashes.groupby(keys.to_numpy()).sum()
+
+    return {key: str(value) for key, value in sums.items()}
+
+
+# WHERE REFRESH_DERIVED REMEMBERS WHAT IT COMPUTED FROM
+def state_path_for(store_path):
+    # files starting with _ are ignored when the store is read as a dataset
+    return os.path.join(store_path, "_derived_state.json")
+
+
+# BRINGING THE DERIVED SERIES IN THE STORE UP TO DATE
+def refresh_derived(definitions=DERIVED, store_path=master_store.STORE_PATH, full=False):
+    """
+    Purpose is to recompute, and write into the store under DERIVED_TOPIC, only the
+    derived series and vintages whose inputs (or formula) changed since the last run.
+    Only the partitions of the vintages that changed are rewritten.
+    Returns the vintages that were written
+    """
+    formulas = parse_definitions(definitions)
+
+    # with every definition gone there is nothing to compute, only old rows to clear out
+    if not formulas:
+        cleared = master_store.list_vintages(DERIVED_TOPIC, store_path)
+        shutil.rmtree(os.path.join(store_path, f"topic={DERIVED_TOPIC}"), ignore_errors=True)
+        if os.path.exists(state_path_for(store_path)):
+            os.remove(state_path_for(store_path))
+        return cleared
+
+    leaves = leaf_inputs(formulas)
+    inputs = sorted(set().union(*leaves.values())) if leaves else []
+
+    # the derived topic never feeds itself
+    topics = [t for t in master_store.list_topics(store_path) if t != DERIVED_TOPIC]
+    if not topics:
+        return []
+
+    df = master_store.read_topic(
+        topics,
+        columns=["period", "seriesId", "value", "unit", "forecast_period"],
+        series=inputs,
+        store_path=store_path,
+    )
+    if df.empty:
+        return []
+
+    state_path = state_path_for(store_path)
+    state = {"inputs": {}, "formulas": {}}
+    if os.path.exists(state_path) and not full:
+        with open(state_path) as f:
+            state = json.load(f)
+
+    fingerprints = input_fingerprints(df)
+    vintages = sorted(df["forecast_period"].unique())
+
+    # the (seriesId, vintage) inputs that are new, changed or gone
+    changed = {
+        key
+        for key in set(fingerprints) | set(state["inputs"])
+        if fingerprints.get(key) != state["inputs"].get(key)
+    }
+
+    # a derived series is dirty in a vintage when one of its inputs changed there,
+    # and in every vintage when its formula (or one it uses) changed
+    dirty = {}
+    for series_id, formula in formulas.items():
+        uses = {series_id} | derived_uses(formulas, series_id)
+        if any(state["formulas"].get(s) != formulas[s].formula for s in uses):
+            dirty[series_id] = set(vintages)
+            continue
+
+        dirty[series_id] = {
+            v
+            for v in vintages
+            if any(f"{name}|{v:%Y-%m-%d}" in changed for name in leaves[series_id])
+        }
+
+    # series dropped from the definitions have to go from the store too
+    removed = set(state["formulas"]) - set(formulas)
+    touched = set().union(*dirty.values()) if dirty else set()
+    if removed:
+        touched = {pd.Timestamp(v) for v in vintages}
+        touched |= set(master_store.list_vintages(DERIVED_TOPIC, store_path))
+
+    if touched:
+        touched = sorted(touched)
+        fresh = evaluate(
+            df[df["forecast_period"].isin(touched)],
+            definitions,
+            only=[s for s, v in dirty.items() if v],
+        )
+        dirty_pairs = pd.MultiIndex.from_tuples(
+            [(s, v) for s, dirty_vintages in dirty.items() for v in dirty_vintages],
+            names=["seriesId", "forecast_period"],
+        )
+        fresh = fresh[pairs(fresh).isin(dirty_pairs)]
+
+        # the rest of those vintages' derived series are carried over as they are
+        existing = empty_frame()
+        if DERIVED_TOPIC in master_store.list_topics(store_path):
+            existing = master_store.read_topic(
+                DERIVED_TOPIC, forecast_periods=touched, store_path=store_path
+            ).drop(columns="topic")
+            existing["seriesId"] = existing["seriesId"].astype(str)
+            keep = existing["seriesId"].isin(list(formulas)) & ~pairs(existing).isin(dirty_pairs)
+            existing = existing[keep]
+
+        out = pd.concat([existing, fresh], ignore_index=True)
+        if not out.empty:
+            master_store.write_topic(out, DERIVED_TOPIC, store_path=store_path)
+
+        written = sorted(out["forecast_period"].unique()) if not out.empty else []
+
+        # a vintage left with no derived rows (a formula was dropped) keeps none on disk
+        emptied = {pd.Timestamp(v) for v in touched} - {pd.Timestamp(v) for v in written}
+        for vintage in emptied:
+            shutil.rmtree(
+                os.path.join(
+                    store_path, f"topic={DERIVED_TOPIC}", f"forecast_period={vintage.date()}"
+                ),
+                ignore_errors=True,
+            )
+
+        print(f"derived series: rewrote {len(written)} vintage(s), {len(fresh)} new rows")
+    else:
+        touched = []
+
+    with open(state_path, "w") as f:
+        json.dump(
+            {
+                "inputs": fingerprints,
+                "formulas": {s: formula.formula for s, formula in formulas.items()},
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+
+    return touched
+
+
+if __name__ == "__main__":
+    # bringing the derived series in the store up to date
+    written = refresh_derived()
+    print(f"{len(written)} vintage(s) of '{DERIVED_TOPIC}' rewritten")
@@ -0,0 +1,123 @@
+"""
+The purpose of this file is to shrink what we send to the browser before a figure
+gets built, so plots with many forecast vintages stay fast
+"""
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+
+# LARGEST TRIANGLE THREE BUCKETS DOWNSAMPLING
+def lttb(x, y, threshold):
+    """
+    Purpose is to pick threshold points out of (x, y) that keep the visual shape of
+    the line. x has to be sorted. Returns the positions of the points to keep
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # the first and last points are always kept, the rest is split into buckets
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        # the average of the next bucket is the third corner of our triangle
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # keeping the point in this bucket that makes the biggest triangle
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+
+    keep[-1] = n - 1
+
+    return keep
+
+
+# DOWNSAMPLING EVERY TRACE OF A LONG DATAFRAME
+def downsample_traces(
+    df, max_points, x="period", y="value", by=("seriesId", "forecast_period")
+):
+    """
+    Purpose is to run lttb on every trace (one per seriesId and forecast period)
+    so no single line has more than max_points points (give or take a few when a
+    trace has gaps). A missing value splits a trace into runs that are downsampled
+    on their own, with one missing row kept between them so the line still breaks
+    """
+    by = [col for col in by if col in df.columns]
+    if len(df) == 0 or len(by) == 0:
+        return df
+
+    pieces = []
+    for _, trace in df.groupby(by, sort=False, observed=True):
+        trace = trace.sort_values(x)
+        present = trace[y].notna().to_numpy()
+        n_present = int(present.sum())
+        if n_present == 0:
+            continue
+
+        # lttb needs plain numbers, dates become nanoseconds
+        xs = trace[x]
+        if pd.api.types.is_datetime64_any_dtype(xs):
+            xs = xs.astype("int64")
+        xs = xs.to_numpy()
+        ys = trace[y].to_numpy(dtype=float, na_value=np.nan)
+
+        # runs of values and runs of gaps take turns, a new one starts where present flips
+        runs = np.split(np.arange(len(trace)), np.flatnonzero(np.diff(present)) + 1)
+        first = next(i for i, run in enumerate(runs) if present[run[0]])
+        last = max(i for i, run in enumerate(runs) if present[run[0]])
+
+        keep = []
+        for run in runs[first : last + 1]:
+            if not present[run[0]]:
+                # one missing row is enough for plotly to leave a gap
+                keep.append(run[:1])
+                continue
+
+            # each run gets a share of the points in line with its length
+            threshold = max(3, max_points * len(run) // n_present)
+            keep.append(run[lttb(xs[run], ys[run], threshold)])
+
+        pieces.append(trace.iloc[np.concatenate(keep)])
+
+    if len(pieces) == 0:
+        return df.iloc[0:0]
+
+    return pd.concat(pieces)
+
+
+# ONLY KEEPING A HANDFUL OF FORECAST VINTAGES
+def pick_vintages(df, n_between=0, vintage_col="forecast_period"):
+    """
+    Purpose is to keep the first vintage, the latest vintage and n_between vintages
+    evenly spaced between them
+    """
+    vintages = np.sort(df[vintage_col].dropna().unique())
+    if len(vintages) <= n_between + 2:
+        return df
+
+    positions = np.linspace(0, len(vintages) - 1, n_between + 2).round().astype(int)
+
+    return df[df[vintage_col].isin(vintages[np.unique(positions)])]
+
+
+# HOW MANY BYTES A FIGURE SENDS TO THE BROWSER
+def figure_payload_bytes(fig):
+    return len(fig.to_json().encode())
@@ -0,0 +1,286 @@
+"""
+The purpose of this file is to hold a topic's forecasts as one dense NumPy cube,
+indexed by series, forecast vintage and target month, so comparing vintages is
+array slicing instead of re-pivoting long dataframes
+"""
+
+# we will need to access files from our system
+import os
+import glob
+import json
+import time
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+# month numbers and the compact frame the cube is built from
+from compact_frames import CompactFrame, from_month_ordinal, to_month_ordinal
+
+import master_store
+
+
+# where saved cubes live unless told otherwise
+CUBES_PATH = "master_output/cubes"
+
+
+# A (SERIES x VINTAGE x TARGET MONTH) ARRAY OF FORECAST VALUES
+class ForecastCube:
+    """
+    Purpose is to keep every value of a topic in one contiguous float32 array.
+    values[s, v, p] is series s as forecast in vintage v for target month p, NaN when
+    that vintage did not have it. vintages and periods are int32 month numbers
+    """
+
+    def __init__(self, values, series_ids, vintages, periods, series=None):
+        self.values = values
+        self.series_ids = list(series_ids)
+        self.vintages = np.asarray(vintages, dtype="int32")
+        self.periods = np.asarray(periods, dtype="int32")
+
+        # seriesDescription and unit for each series id, when we have them
+        self.series = series
+
+        # looking things up by name is a dict lookup, slicing is then O(1)
+        self.series_index = {s: i for i, s in enumerate(self.series_ids)}
+
+    @classmethod
+    def from_long(cls, df):
+        """
+        builds a cube from the long format (period, seriesId, value, forecast_period)
+        """
+        return cls.from_compact(CompactFrame.from_long(df))
+
+    @classmethod
+    def from_compact(cls, compact):
+        obs = compact.observations
+
+        # every series, vintage and month gets a position along its axis
+        series_codes = obs["seriesId"].cat.codes.to_numpy()
+        vintages, vintage_codes = np.unique(obs["forecast_period"], return_inverse=True)
+
+        # target months are a continuous range so we can index straight by month number
+        first, last = obs["period"].min(), obs["period"].max()
+        periods = np.arange(first, last + 1, dtype="int32")
+
+        values = np.full(
+            (len(compact.series), len(vintages), len(periods)), np.nan, dtype="float32"
+        )
+        values[series_codes, vintage_codes, obs["period"].to_numpy() - first] = obs[
+            "value"
+        ].to_numpy()
+
+        return cls(values, compact.series.index, vintages, periods, series=compact.series)
+
+    # LOOKING THINGS UP ALONG EACH AXIS
+    def vintage_position(self, vintage):
+        return int(self.vintage_positions(to_month_ordinal([vintage]))[0])
+
+    def vintage_positions(self, ordinals):
+        """
+        positions of vintages given as month numbers, KeyError for any we do not have
+        (searchsorted alone would hand back a neighbour's slot)
+        """
+        ordinals = np.asarray(ordinals, dtype="int32")
+        positions = np.searchsorted(self.vintages, ordinals)
+
+        found = positions < len(self.vintages)
+        found[found] = self.vintages[positions[found]] == ordinals[found]
+        if not found.all():
+            missing = pd.to_datetime(from_month_ordinal(ordinals[~found]))
+            raise KeyError(f"vintages not in this cube: {[f'{v:%Y-%m}' for v in missing]}")
+
+        return positions
+
+    def period_position(self, period):
+        position = int(to_month_ordinal([period])[0] - self.periods[0])
+        if not 0 <= position < len(self.periods):
+            raise KeyError(f"{pd.Timestamp(period):%Y-%m} is outside this cube's months")
+
+        return position
+
+    def __getitem__(self, series_id):
+        """
+        cube['PAPR_WORLD'] is that series' (vintage x month) array, a view, not a copy,
+        so cube['PAPR_WORLD'] - cube['PATC_WORLD'] is a net balance for every vintage
+        """
+        return self.values[self.series_index[series_id]]
+
+    def add_series(self, series_id, array, description=None, unit=None):
+        """
+        adds a derived (vintage x month) array, like a net balance, as a new series
+        """
+        self.values = np.concatenate(
+            [self.values, np.asarray(array, dtype="float32")[np.newaxis]], axis=0
+        )
+        self.series_index[series_id] = len(self.series_ids)
+        self.series_ids.append(series_id)
+
+        if self.series is not None:
+            self.series.loc[series_id] = [description or series_id, unit]
+
+    # THE MOST RECENT FORECAST
+    def latest_vintage(self):
+        """
+        returns the (series x month) array of the newest vintage
+        """
+        return self.values[:, -1, :]
+
+    def recent_forecast(self):
+        """
+        same as functions.recent_forecast, but straight off the cube
+        """
+        return self.to_long(vintages=[self.vintages[-1]])
+
+    # HOW EACH FORECAST CHANGED FROM ONE VINTAGE TO THE NEXT
+    def revisions(self):
+        """
+        returns the same four measures as revisions.compute_revisions, as arrays shaped
+        like the cube: mom_change, mom_pct (vs the previous vintage that had a value) and
+        vs_first_change, vs_first_pct (vs the first vintage that had a value)
+        """
+        present = ~np.isnan(self.values)
+        positions = np.arange(len(self.vintages))[np.newaxis, :, np.newaxis]
+
+        # forward filling along the vintage axis so "previous" skips vintages without a value
+        last_seen = np.maximum.accumulate(np.where(present, positions, -1), axis=1)
+        filled = np.take_along_axis(self.values, np.maximum(last_seen, 0), axis=1)
+        filled[last_seen < 0] = np.nan
+
+        prev = np.full_like(self.values, np.nan)
+        prev[:, 1:, :] = filled[:, :-1, :]
+
+        first_idx = np.argmax(present, axis=1)[:, np.newaxis, :]
+        first = np.take_along_axis(self.values, first_idx, axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mom_change = self.values - prev
+            vs_first_change = self.values - first
+            mom_pct = mom_change / np.where(prev == 0, np.nan, np.abs(prev)) * 100
+            vs_first_pct = vs_first_change / np.where(first == 0, np.nan, np.abs(first)) * 100
+
+        return {
+            "mom_change": mom_change,
+            "mom_pct": mom_pct,
+            "vs_first_change": vs_first_change,
+            "vs_first_pct": vs_first_pct,
+        }
+
+    # GOING BACK TO THE LONG FORMAT
+    def to_long(self, series=None, vintages=None, start=None, end=None):
+        """
+        returns the cube (or just some series, vintages (month numbers) and target
+        months between start and end) in the long format the dashboards and
+        gimme_plot use, leaving out the empty cells. Only that block of the array
+        is read, so on a memory mapped cube the rest is never touched
+        """
+        s_pos = np.arange(len(self.series_ids))
+        if series is not None:
+            s_pos = np.array([self.series_index[s] for s in series], dtype="int64")
+
+        v_pos = np.arange(len(self.vintages))
+        if vintages is not None:
+            v_pos = self.vintage_positions(vintages)
+
+        # the target months are a continuous range, so a date range is a plain slice
+        p_start, p_end = 0, len(self.periods)
+        if start is not None:
+            p_start = int(np.searchsorted(self.periods, to_month_ordinal([start])[0]))
+        if end is not None:
+            p_end = int(np.searchsorted(self.periods, to_month_ordinal([end])[0], side="right"))
+        p_pos = np.arange(p_start, max(p_start, p_end))
+
+        block = self.values[np.ix_(s_pos, v_pos, p_pos)]
+        s_idx, v_idx, p_idx = np.nonzero(~np.isnan(block))
+
+        ids = np.array(self.series_ids, dtype=object)[s_pos[s_idx]]
+
+        long_df = pd.DataFrame(
+            {
+                "period": from_month_ordinal(self.periods[p_pos[p_idx]]),
+                "seriesId": ids,
+                "value": block[s_idx, v_idx, p_idx].astype(float),
+                "forecast_period": from_month_ordinal(self.vintages[v_pos[v_idx]]),
+            }
+        )
+
+        if self.series is not None:
+            dims = self.series.reindex(ids)
+            long_df["seriesDescription"] = dims["seriesDescription"].to_numpy()
+            long_df["unit"] = dims["unit"].to_numpy()
+
+        return long_df
+
+    # SAVING AND MEMORY MAPPING THE CUBE
+    def save(self, path, keep=2):
+        """
+        writes the array as a new .npy file and the axis labels as json, so load can
+        memory map the array instead of reading it. The json names the array file
+        and is swapped in last, so a reader that has the old array mapped keeps
+        reading it untouched (the newest keep arrays are left on disk)
+        """
+        os.makedirs(path, exist_ok=True)
+
+        # nanosecond timestamps padded to the same width sort in save order
+        values_file = f"values-{time.time_ns():020d}.npy"
+        tmp_file = os.path.join(path, f"{values_file}.tmp")
+        with open(tmp_file, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.values))
+        os.replace(tmp_file, os.path.join(path, values_file))
+
+        meta = {
+            "values_file": values_file,
+            "series_ids": self.series_ids,
+            "vintages": self.vintages.tolist(),
+            "periods": self.periods.tolist(),
+        }
+        if self.series is not None:
+            meta["series"] = self.series.reset_index().to_dict(orient="list")
+
+        meta_path = os.path.join(path, "meta.json")
+        with open(f"{meta_path}.tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+        # cleaning up old arrays, oldest first, and the unversioned one older cubes used
+        old_files = sorted(glob.glob(os.path.join(path, "values-*.npy")))[:-keep]
+        old_files += glob.glob(os.path.join(path, "values.npy"))
+        for old_file in old_files:
+            os.remove(old_file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        opens a saved cube, by default memory mapped read only so it opens instantly
+        and pages are only read when they are touched
+        """
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            meta = json.load(f)
+
+        # cubes saved before the arrays were versioned have a plain values.npy
+        values = np.load(
+            os.path.join(path, meta.get("values_file", "values.npy")),
+            mmap_mode="r" if mmap else None,
+        )
+
+        series = None
+        if "series" in meta:
+            series = pd.DataFrame(meta["series"]).set_index("seriesId")
+
+        return cls(values, meta["series_ids"], meta["vintages"], meta["periods"], series)
+
+
+# BUILDING AND SAVING A TOPIC'S CUBE FROM THE STORE
+def materialize_cube(topic, store_path=master_store.STORE_PATH, cubes_path=CUBES_PATH):
+    df = master_store.read_topic(topic, store_path=store_path)
+    cube = ForecastCube.from_long(df)
+    cube.save(os.path.join(cubes_path, topic))
+
+    return cube
+
+
+if __name__ == "__main__":
+    # rebuilding the cube for every topic in the store
+    for topic in master_store.list_topics():
+        cube = materialize_cube(topic)
+        print(f"{topic}: {cube.values.shape} (series, vintages, months)")
@@ -0,0 +1,75 @@
+"""
+The purpose of this package is to store functions that we will be referring to in our data gathering process.
+
+They are split into these modules:
+- fetch: grabbing data from the EIA API (and our local database)
+- transform: building master data and the things computed from it
+- plot: turning data into figures
+- sinks: csv, parquet and database files that fetched pages are streamed into
+
+`import functions as fns` stays fast, a module (and its dependencies) is only
+imported the first time one of its functions is used, e.g. fns.create_params_obj
+"""
+
+import importlib
+
+# which module each function lives in
+_LOCATIONS = {
+    "fetch": [
+        "STEO_URL",
+        "get_api_key",
+        "create_params_obj",
+        "make_session",
+        "HostRateLimiter",
+        "grab_steo_data",
+        "iter_steo_pages",
+        "batch_series",
+        "fetch_series_batched",
+        "ordered_map",
+        "iter_series_frames",
+        "series_to_dataframe",
+        "sync_series",
+        "query_steo_db",
+        "pop_visual",
+    ],
+    "transform": [
+        "concat_dfs",
+        "output_paths",
+        "rebuild_derived",
+        "append_new_vintages",
+        "recent_forecast",
+    ],
+    "plot": [
+        "gimme_lineplot",
+        "gimme_plot",
+        "save_static_figure",
+    ],
+    "sinks": [
+        "CsvSink",
+        "ParquetSink",
+        "DatabaseSink",
+        "sink_for_path",
+    ],
+}
+
+_MODULE_OF = {name: module for module, names in _LOCATIONS.items() for name in names}
+
+__all__ = sorted(_MODULE_OF)
+
+
+# LOADING A FUNCTION'S MODULE THE FIRST TIME THE FUNCTION IS ASKED FOR
+def __getattr__(name):
+    if name not in _MODULE_OF:
+        raise AttributeError(f"module 'functions' has no attribute '{name}'")
+
+    module = importlib.import_module(f"{__name__}.{_MODULE_OF[name]}")
+    value = getattr(module, name)
+
+    # caching it on the package so the next lookup is a plain attribute
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,784 @@
+"""
+The purpose of this file is to store the functions that grab data from the EIA API
+"""
+
+# packages that let us make several requests at the same time
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# we will need to access files from our system
+import os
+import json
+import datetime
+
+# heavy packages are only imported the first time they are used
+from functions.lazy import lazy_import
+
+# csv, parquet and database files that pages are streamed into
+from functions import sinks as output_sinks
+
+# we will need packages that allow us to make a GET request
+requests = lazy_import("requests")
+
+# importing packages that will allow us to transform our data
+pd = lazy_import("pandas")
+
+# release dates tell us when a new forecast vintage is available
+release_schedule = lazy_import("release_schedule")
+
+# decoding responses into typed columns without building the json tree first
+stream_decode = lazy_import("stream_decode")
+
+# timers and counters that tell us where a slow refresh spends its time
+instrumentation = lazy_import("instrumentation")
+
+
+# this is the base url for STEO
+STEO_URL = "https://api.eia.gov/v2/steo/data/"
+
+# how many pages series_to_dataframe stacks together at a time
+CHUNK_PAGES = 64
+
+
+# GRABBING API KEY FROM TEXT FILE
+def get_api_key(txt_file, key_loc):
+    """
+    Purpose is to go into a txt file and grab the EIA API Key needed to make data requests
+    """
+    with open(txt_file, "r") as f:
+        lines = f.readlines()
+        api_key = lines[key_loc]
+        print("successfully grabbed you API Key")
+
+        return api_key
+
+
+# TRANSLATING A PARAMS JSON OBJECT BEFORE MAKING A DATA REQUEST
+def create_params_obj(series_id, start_period):
+    """
+    Purpose is to create our own params object that we can pass in our
+    data request.
+    Given some constraints and vars, create a params json object.
+    series_id can also be a list of series IDs to request them together
+    """
+    # a single series id is just a batch of one
+    if isinstance(series_id, (list, tuple)):
+        series_ids = [str(series) for series in series_id]
+    else:
+        series_ids = [str(series_id)]
+
+    # setting up a variable for todays date
+    today = datetime.date.today()
+    year_month = today.strftime("%Y-%m")
+
+    # creating the json object that will make the request
+    params_object = {
+        "frequency": "monthly",  # usually we want monthly data from STEO dataset
+        "data": ["value"],
+        "facets": {"seriesId": series_ids},
+        "start": str(start_period),
+        "end": str(year_month),
+        "sort": [
+            {"column": "period", "direction": "desc"},
+            {"column": "seriesId", "direction": "asc"},
+        ],
+        "offset": 0,
+        "length": 5000,
+    }
+
+    return params_object
+
+
+# SETTING UP A POOLED HTTP SESSION THAT RETRIES FAILED REQUESTS
+def make_session(pool_size=8, retries=3, backoff=0.5):
+    """
+    Purpose is to create a requests session that keeps connections open between
+    requests and retries with backoff when the API hiccups (429s and 5xx errors)
+    """
+    # imported here so that importing this module stays fast
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # retrying only idempotent GETs, waiting backoff * 2 ** n seconds between tries
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+
+    # the pool has to be at least as big as the number of workers sharing it
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+# KEEPING US FROM HAMMERING ANY ONE HOST WITH TOO MANY REQUESTS
+class HostRateLimiter:
+    """
+    Purpose is to space out requests so that no host gets more than
+    max_per_second requests, no matter how many threads are asking
+    """
+
+    def __init__(self, max_per_second=5):
+        self.interval = 1.0 / max_per_second
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        # each host gets its own schedule of request slots
+        host = urlsplit(url).netloc
+
+        # reserving the next free slot while holding the lock, then sleeping outside of it
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# GRABBING DATA FROM EIA OPEN DATA
+def grab_steo_data(
+    params_object,
+    api_key,
+    session=None,
+    rate_limiter=None,
+    cache=None,
+    base_url=STEO_URL,
+    metrics=None,
+):
+    """
+    Purpose is to make a request to EIA Open Data API for STEO specific data.
+    Every series ID in the facets is sent in one request, and we keep paging
+    through the results until we have all of response.total.
+    If a ResponseCache is passed, pages we already have on disk are not requested again.
+    Responses are decoded as they stream in (see stream_decode.py), so period comes
+    back as datetime64, value as float and the id and text columns as categoricals.
+    metrics (an instrumentation.Metrics) gets the network/decode times and the
+    requests, bytes, retries and rows counts
+    """
+    pages = iter_steo_pages(
+        params_object=params_object,
+        api_key=api_key,
+        session=session,
+        rate_limiter=rate_limiter,
+        cache=cache,
+        base_url=base_url,
+        metrics=metrics,
+    )
+
+    # stacking the pages once they are all in
+    return stream_decode.concat_frames(pages)
+
+
+# GRABBING DATA FROM EIA OPEN DATA ONE PAGE AT A TIME
+def iter_steo_pages(
+    params_object,
+    api_key,
+    session=None,
+    rate_limiter=None,
+    cache=None,
+    base_url=STEO_URL,
+    metrics=None,
+):
+    """
+    Purpose is to make the same request as grab_steo_data, but hand back a typed
+    dataframe for every page as soon as it has been decoded, so only one page
+    has to be in memory at a time
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    # this is the base url for STEO
+    url = base_url
+
+    # frequency of data, either monthly, quarterly, or annually
+    freq = "&frequency=" + str(params_object["frequency"])
+
+    # data type
+    d_type = "&data[0]=" + str(params_object["data"][0])
+
+    # this ensures that we sort data by period
+    sort = "&sort[0][column]=period"
+
+    # placing our sort order in a descending format
+    direction = "&sort[0][direction]=desc"
+
+    # rows sharing a period need a fixed order too, or paging by offset can skip
+    # or repeat them when the API orders ties differently from one page to the next
+    direction += "&sort[1][column]=seriesId&sort[1][direction]=asc"
+
+    # length of the data that we are requesting, the max that we can request is 5_000
+    page_length = min(int(params_object["length"]), 5000)
+    length = f"&length={page_length}"
+
+    # essentially, if the facets params section of the object has something process it
+    if len(params_object["facets"]) > 0:
+        # one facet entry per series id, the API ORs them together
+        facet = "".join(
+            f"&facets[seriesId][]={series_id}"
+            for series_id in params_object["facets"]["seriesId"]
+        )
+        start = f"&start={params_object['start']}"
+
+        # concatenating all url segments
+        base_query = f"{url}?api_key={api_key}{freq}{d_type}{facet}{start}{sort}{direction}{length}"
+
+    else:
+        start = f"&start={params_object['start']}"
+
+        # concatenating all url segments to create a full url
+        base_query = f"{url}?api_key={api_key}{freq}{d_type}{start}{sort}{direction}{length}"
+
+        # letting the user know that the facets length was 0 aka that no features were selected
+        print(f"facets object length is {len(params_object['facets'])}!")
+
+    # offset is how many rows to skip, we bump it by a page until we have everything
+    offset = int(params_object["offset"])
+    total = None
+
+    while total is None or offset < total:
+        full_url = f"{base_query}&offset={offset}"
+
+        # let's check our full url
+        # print(full_url)
+
+        # rows are decoded straight into typed columns as the bytes come in
+        columns = stream_decode.ColumnBuffers()
+        page = stream_decode.PageDecoder(columns)
+
+        # checking if we already have this exact page saved from an earlier request
+        body = cache.get(full_url) if cache is not None else None
+
+        if body is None:
+            # waiting our turn if we are sharing the host with other threads
+            if rate_limiter is not None:
+                with metrics.stage("rate_limit_wait"):
+                    rate_limiter.wait(full_url)
+
+            # we know begin the request process, reusing pooled connections if we have a session
+            with metrics.stage("network"):
+                request = (session or requests).get(full_url, stream=True)
+                request.raise_for_status()
+
+            # urllib3 keeps a history of the retries it took to get this response
+            retries = getattr(request.raw, "retries", None)
+            metrics.count("requests")
+            metrics.count("retries", len(retries.history) if retries is not None else 0)
+
+            # only holding on to the raw bytes if the cache needs them, reading
+            # the body counts as network and parsing it as decode
+            chunks = []
+            for chunk in metrics.timed(
+                "network", request.iter_content(chunk_size=stream_decode.CHUNK_SIZE)
+            ):
+                with metrics.stage("decode"):
+                    page.feed(chunk)
+
+                metrics.count("bytes", len(chunk))
+                if cache is not None:
+                    chunks.append(chunk)
+
+            if cache is not None:
+                cache.put(full_url, b"".join(chunks))
+
+        else:
+            metrics.count("cache_hits")
+            with metrics.stage("decode"):
+                page.feed_all(body)
+
+        # everything in the response besides the rows, e.g. total
+        with metrics.stage("decode"):
+            data = page.close()
+
+        metrics.count("rows", page.rows)
+
+        # the API reports total as a string, and an empty page means we are done
+        total = int(data["response"].get("total", 0))
+        if page.rows == 0:
+            break
+
+        offset += page.rows
+
+        # period comes back as datetime64, value as float and the ids as categoricals
+        with metrics.stage("decode"):
+            dataframe = columns.to_frame()
+
+        yield dataframe
+
+
+# SPLITTING A LONG LIST OF SERIES IDS INTO BATCHES THAT FIT IN ONE PAGE
+def batch_series(series_list, start_period, page_length=5000, forecast_months=36):
+    """
+    Purpose is to pack as many series IDs as we can into each request while
+    keeping every batch under the API page limit.
+    Each series is assumed to have one row per month from start_period through
+    the end of the forecast horizon
+    """
+    # counting months from our start period to today, plus the forecast horizon
+    start = pd.Period(str(start_period), freq="M")
+    today = pd.Period(datetime.date.today(), freq="M")
+    rows_per_series = max((today - start).n + 1, 1) + forecast_months
+
+    # at least one series per batch even if a single series needs a few pages
+    batch_size = max(page_length // rows_per_series, 1)
+
+    return [
+        list(series_list[i : i + batch_size])
+        for i in range(0, len(series_list), batch_size)
+    ]
+
+
+# GIVEN A LIST OF SERIES IDS, GRAB THEM IN A FEW BATCHED REQUESTS
+def fetch_series_batched(
+    series_list,
+    start_date,
+    key,
+    page_length=5000,
+    max_workers=1,
+    max_per_second=5,
+    session=None,
+    cache=None,
+    base_url=STEO_URL,
+    metrics=None,
+):
+    """
+    Purpose is to request many series IDs with as few requests as possible.
+    Returns one dataframe with the series in the same order as series_list
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    pages = iter_series_frames(
+        series_list=series_list,
+        start_date=start_date,
+        key=key,
+        max_workers=max_workers,
+        max_per_second=max_per_second,
+        batched=True,
+        page_length=page_length,
+        session=session,
+        cache=cache,
+        base_url=base_url,
+        metrics=metrics,
+    )
+
+    frames = list(pages)
+    with metrics.stage("concat"):
+        batched_df = stream_decode.concat_frames(frames)
+
+    return batched_df
+
+
+# RUNNING A FUNCTION OVER A POOL OF THREADS, HANDING RESULTS BACK IN ORDER
+def ordered_map(function, items, max_workers):
+    """
+    Purpose is to work like pool.map, but only keep 2 * max_workers results in
+    flight (or waiting to be picked up) at a time instead of queueing every item
+    """
+    window = 2 * max_workers
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+
+        for item in items:
+            pending.append(pool.submit(function, item))
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+# GIVEN A LIST OF SERIES IDS, HAND BACK THEIR DATA A PAGE AT A TIME
+def iter_series_frames(
+    series_list,
+    start_date,
+    key,
+    max_workers=1,
+    max_per_second=5,
+    batched=False,
+    page_length=5000,
+    session=None,
+    cache=None,
+    base_url=STEO_URL,
+    metrics=None,
+):
+    """
+    Purpose is to yield typed dataframes for series_list in series_list order, each
+    series with its newest periods first. One request goes out per series, or per
+    batch of series if batched. With one worker every page of a single series is
+    handed back as soon as it is decoded (a batch is handed back whole, once it is
+    in series order), with more only a few requests are in flight at a time
+    """
+    if batched:
+        requests_to_make = batch_series(series_list, start_date, page_length=page_length)
+    else:
+        requests_to_make = list(series_list)
+
+    # every request shares one pooled session, and one rate limiter if we go concurrent
+    session = session or make_session(pool_size=max(max_workers, 1))
+    rate_limiter = None
+    if batched or max_workers > 1:
+        rate_limiter = HostRateLimiter(max_per_second=max_per_second)
+
+    order = {series: i for i, series in enumerate(series_list)}
+
+    def pages_of(series_ids):
+        params = create_params_obj(series_id=series_ids, start_period=start_date)
+        params["length"] = page_length
+
+        return iter_steo_pages(
+            params_object=params,
+            api_key=key,
+            session=session,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            base_url=base_url,
+            metrics=metrics,
+        )
+
+    def whole_response(series_ids):
+        return stream_decode.concat_frames(pages_of(series_ids))
+
+    if max_workers > 1:
+        # each worker reads its whole response, ordered_map keeps them in our order
+        pages = ordered_map(whole_response, requests_to_make, max_workers=max_workers)
+    elif batched:
+        # a batch's series are spread over its pages, so it can only be sorted whole
+        pages = (whole_response(series_ids) for series_ids in requests_to_make)
+    else:
+        pages = (page for series_ids in requests_to_make for page in pages_of(series_ids))
+
+    for page in pages:
+        if len(page) == 0:
+            continue
+
+        # a batch comes back sorted by period, putting its rows in series_list order
+        if batched:
+            page = page.sort_values(
+                by="seriesId", key=lambda col: col.astype(str).map(order), kind="stable"
+            )
+
+        yield page
+
+
+# GIVEN A LIST OF SERIES IDS, CREATE A PARAM OBJECT, GRAB DATA, AND ADD IT TO A DF
+def series_to_dataframe(
+    series_list,
+    start_date,
+    save_path,
+    key,
+    max_workers=1,
+    max_per_second=5,
+    batched=False,
+    cache=None,
+    base_url=STEO_URL,
+    metrics=None,
+    sinks=None,
+    return_frame=True,
+):
+    """
+    Purpose is to process a list of series IDs and make a data request.
+    Setting max_workers above 1 fetches the series concurrently, batched
+    packs many series IDs into each request, and cache is a ResponseCache
+    that keeps us from repeating identical requests. metrics (an
+    instrumentation.Metrics) times every stage from the requests to the csv.
+    Every page is written to save_path (.csv, .parquet or .sqlite) and to any
+    extra sinks (functions/sinks.py) as soon as it arrives. With return_frame=False
+    only one page is in memory at a time and the number of rows written is returned
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    # the forecast month is at the end of the file name, e.g. wind_data_2024_03.csv
+    forecast_period = pd.to_datetime(
+        os.path.splitext(save_path)[0][-7:], format="%Y_%m"
+    )
+
+    # where every page goes
+    all_sinks = [output_sinks.sink_for_path(save_path), *(sinks or [])]
+
+    # pages waiting to be stacked, and the stacks of them we have made so far
+    frames = []
+    chunks = []
+    rows = 0
+
+    try:
+        pages = iter_series_frames(
+            series_list=series_list,
+            start_date=start_date,
+            key=key,
+            max_workers=max_workers,
+            max_per_second=max_per_second,
+            batched=batched,
+            cache=cache,
+            base_url=base_url,
+            metrics=metrics,
+        )
+
+        for page in pages:
+            # creating a col documenting the forecast month
+            with metrics.stage("transform"):
+                page["forecast_period"] = forecast_period
+
+            # now we are going to save our data, a page at a time
+            for sink in all_sinks:
+                with metrics.stage(f"write_{sink.kind}"):
+                    sink.write(page)
+
+            rows += len(page)
+            if return_frame:
+                frames.append(page)
+
+            # thousands of small frames cost more memory than their data, so every
+            # CHUNK_PAGES pages are stacked into one frame
+            if len(frames) == CHUNK_PAGES:
+                with metrics.stage("concat"):
+                    chunks.append(stream_decode.concat_frames(frames))
+                frames = []
+
+    finally:
+        for sink in all_sinks:
+            sink.close()
+
+    if not return_frame:
+        return rows
+
+    # stacking every chunk once at the end, instead of once per series
+    with metrics.stage("concat"):
+        main_df = stream_decode.concat_frames([*chunks, *frames])
+
+    return main_df
+
+
+# ONLY GRAB THE SERIES THAT ARE MISSING THE NEWEST RELEASED VINTAGE
+def sync_series(
+    series_list,
+    start_date,
+    save_folder,
+    file_name,
+    key,
+    state_path="output/sync_state.json",
+    revision_window=24,
+    full_every=12,
+    today=None,
+    metrics=None,
+    accept=None,
+    vintage=None,
+    **fetch_kwargs,
+):
+    """
+    Purpose is to keep a topic file up to date without re-downloading everything.
+    We remember, per series ID, which forecast vintages we already have (in state_path).
+    Nothing is requested until release_schedule says a new vintage has come out, and
+    series we already have an older vintage for only request the last revision_window
+    months; older history is carried over from the previous vintage file. A revision
+    to older history would be missed that way, so every series gets its full range
+    pulled again once its last full pull is full_every months old.
+    accept, if given, is called with what was pulled before anything is saved, and
+    returning False leaves the file and the state as they were (so a release the
+    API is not serving yet is not remembered as pulled). vintage overrides the one
+    release_schedule says is out, for releases past the end of the schedule.
+    Returns the dataframe for the current vintage, or None if nothing has been released
+    or accept turned it down
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+    today = today or datetime.date.today()
+
+    # figuring out which vintage the latest release on the schedule covers
+    if vintage is None:
+        vintage = release_schedule.current_vintage(today)
+        if vintage is None:
+            print("no STEO release in the schedule has come out yet, nothing to sync")
+            return None
+
+        if release_schedule.next_release(today) is None:
+            print("release_schedule.py has run out of dates, please add the upcoming releases")
+
+    vintage_key = vintage.strftime("%Y-%m")
+    save_path = f"{save_folder}/{file_name}_{vintage.strftime('%Y_%m')}.csv"
+
+    # loading what we already have, series id -> {vintage: info about that pull}
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r") as f:
+            state = json.load(f)
+
+    # the state says we have this vintage but the file is gone, so we pull it again
+    if not os.path.exists(save_path):
+        lost = [s for s in series_list if vintage_key in state.get(s, {})]
+        if len(lost) > 0:
+            print(f"{save_path} is missing, pulling the {vintage_key} vintage again")
+        for series in lost:
+            state[series].pop(vintage_key)
+
+    missing = [s for s in series_list if vintage_key not in state.get(s, {})]
+
+    # if every series already has this vintage there is nothing new on the API
+    if len(missing) == 0:
+        upcoming = release_schedule.next_release(today)
+        if upcoming is not None:
+            print(f"already have the {vintage_key} vintage, next release is {upcoming[1]}")
+
+        return pd.read_csv(save_path, parse_dates=["period", "forecast_period"])
+
+    # series that we have an older vintage for only need the most recent months
+    this_month = pd.Period(vintage, freq="M")
+    window_start = (this_month - revision_window).strftime("%Y-%m")
+
+    def can_carry(series):
+        pulls = state.get(series, {})
+        if len(pulls) == 0:
+            return False
+
+        # the previous file has to still be there and reach back as far as we need
+        previous = pulls[max(pulls)]
+        if not os.path.exists(previous["path"]):
+            return False
+        if pd.Period(previous["start"], freq="M") > pd.Period(str(start_date), freq="M"):
+            return False
+
+        # pulls from before we kept track of full ones count as not full
+        full_pulls = [v for v, pull in pulls.items() if pull.get("full")]
+        if len(full_pulls) == 0:
+            return False
+
+        return (this_month - pd.Period(max(full_pulls), freq="M")).n < full_every
+
+    carried = [s for s in missing if can_carry(s)]
+    fresh = [s for s in missing if not can_carry(s)]
+
+    new_dfs = []
+    for group, group_start in [(fresh, start_date), (carried, window_start)]:
+        if len(group) > 0:
+            new_dfs.append(
+                fetch_series_batched(
+                    series_list=group,
+                    start_date=group_start,
+                    key=key,
+                    metrics=metrics,
+                    **fetch_kwargs,
+                )
+            )
+
+    # filling in the older history of carried series from the vintage before this one,
+    # reading each previous file once for all the series carried over from it
+    carried_from = {}
+    for series in carried:
+        carried_from.setdefault(state[series][max(state[series])]["path"], []).append(series)
+
+    for previous_path, from_file in carried_from.items():
+        with metrics.stage("read_csv"):
+            old_df = pd.read_csv(previous_path, parse_dates=["period"])
+        old_df = old_df[
+            (old_df["seriesId"].isin(from_file))
+            & (old_df["period"] < pd.Timestamp(window_start))
+            & (old_df["period"] >= pd.Timestamp(str(start_date)))
+        ]
+        new_dfs.append(old_df.drop(columns="forecast_period"))
+
+    main_df = pd.concat(new_dfs)
+
+    # lining up with series_to_dataframe: series_list order, newest periods first
+    order = {series: i for i, series in enumerate(series_list)}
+    main_df = main_df.sort_values(
+        by=["seriesId", "period"],
+        key=lambda col: col.astype(str).map(order) if col.name == "seriesId" else col,
+        ascending=[True, False],
+        kind="stable",
+    ).reset_index(drop=True)
+
+    main_df["value"] = main_df["value"].astype(float)
+    main_df["forecast_period"] = pd.Timestamp(vintage)
+
+    if accept is not None and not accept(main_df):
+        return None
+
+    # keeping whatever we already saved for this vintage from an earlier partial sync
+    if os.path.exists(save_path):
+        saved_df = pd.read_csv(save_path, parse_dates=["period", "forecast_period"])
+        main_df = pd.concat([saved_df[~saved_df["seriesId"].isin(missing)], main_df])
+
+    with metrics.stage("write_csv"):
+        main_df.to_csv(save_path, index=False)
+
+    # remembering what we have now so the next run can skip it
+    for series in missing:
+        state.setdefault(series, {})[vintage_key] = {
+            "path": save_path,
+            "start": str(start_date),
+            "full": series in fresh,
+        }
+
+    with open(state_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+    return main_df
+
+
+# GRABBING DATA FROM OUR LOCAL DATABASE INSTEAD OF THE CSV FILES
+def query_steo_db(
+    series_list=None, topic=None, start_date=None, end_date=None, latest=False
+):
+    """
+    Purpose is to read observations out of the sqlite database that
+    database/push_to_db.py builds, in the same format as series_to_dataframe
+    """
+    # imported here since the database layer lives in its own folder
+    from database import push_to_db
+
+    return push_to_db.query_observations(
+        series=series_list, topic=topic, start=start_date, end=end_date, latest=latest
+    )
+
+
+# POPULAR VISUAL FUNCTIONS THAT TAKES IN A SERIES LIST
+def pop_visual(
+    series_list, start_date, api_key, figure_name, incremental=False, metrics=None
+):
+    """
+    purpose of this function is to grab the necessary data, create the necessary
+    save paths and process it all together irrespective of what list is provided.
+    incremental only pulls what is missing from the newest released vintage
+    """
+    if incremental:
+        return sync_series(
+            series_list=series_list,
+            start_date=start_date,
+            save_folder="output/popular_visuals",
+            file_name=figure_name,
+            key=api_key,
+            metrics=metrics,
+        )
+
+    # creating a save date by grabbing todays date
+    save_date = datetime.date.today().strftime("%Y_%m")
+
+    # creating a save path using the the save date variable
+    save_path = f"output/popular_visuals/{figure_name}_{save_date}.csv"
+
+    # temporary dataframe that will be used to process and store requested data
+    pop_df = series_to_dataframe(
+        series_list=series_list,
+        start_date=start_date,
+        save_path=save_path,
+        key=api_key,
+        metrics=metrics,
+    )
+
+    # printing information on the processed data so that it can be checked for any errors
+    # print(pop_df.info())
+
+    # returning the df so that it can be further processed and used
+    return pop_df
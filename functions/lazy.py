@@ -0,0 +1,36 @@
+"""
+The purpose of this file is to let our modules name their heavy dependencies up top
+without paying to import them until they are actually used
+"""
+
+import importlib
+import sys
+import types
+
+
+# A STAND-IN MODULE THAT IMPORTS THE REAL ONE THE FIRST TIME IT IS USED
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # import_module is safe to call from several threads at once, the first one
+        # runs the import and the others wait for it to finish
+        module = importlib.import_module(self.__name__)
+        value = getattr(module, attr)
+
+        # __getattr__ only runs when normal lookup fails, so once the attribute sits in
+        # our own __dict__ the next lookup of it never comes back through here
+        self.__dict__[attr] = value
+
+        return value
+
+
+# IMPORTING A MODULE ONLY WHEN ONE OF ITS ATTRIBUTES IS FIRST USED
+def lazy_import(name):
+    """
+    Purpose is to return a module object for name that only imports the module the
+    first time something is looked up on it. Already imported modules are
+    returned as they are
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    return LazyModule(name)
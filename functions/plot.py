@@ -0,0 +1,179 @@
+"""
+The purpose of this file is to store the functions that turn our data into figures
+"""
+
+import logging
+
+# heavy packages are only imported the first time they are used
+from functions.lazy import lazy_import
+
+# shrinking plot data before it goes to the browser
+figure_reduction = lazy_import("figure_reduction")
+
+# turn on debug logging to see how much every figure sends to the browser
+logger = logging.getLogger(__name__)
+
+
+# GIVEN SOME PARAMS, PLOT THE DATA!
+def gimme_lineplot(dataframe, title, width=16, height=8):
+    # matplotlib and seaborn are only used here, so they are only imported here
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure()
+    fig.set_figwidth(width)
+    fig.set_figheight(height)
+
+    sns.lineplot(
+        data=dataframe, x="period", y="value", hue="seriesDescription", errorbar=None
+    )
+    plt.legend().set_title(None)
+    plt.title(str(title))
+    plt.xlabel("")
+    plt.ylabel(dataframe["unit"][0])
+    plt.xticks(rotation=90)
+
+    plt.show()
+
+
+# GIVEN WHAT USER SELECTS, RETURN THE TYPE OF GRAPH WITH NECESSARY PARAMETERS
+def gimme_plot(
+    dataframe,
+    y_ax,
+    hue_by,
+    topic_choice,
+    color_by,
+    x_ax="period",
+    plot_type="lineplot",
+    max_points=None,
+    n_vintages=None,
+):
+    """
+    purpose is to return a graph depending on what kind of graph is called.
+    max_points downsamples every trace to at most that many points and n_vintages
+    only keeps the first, latest and n_vintages evenly spaced forecast vintages,
+    both happen before the figure is built so the browser gets less data
+    """
+    # plotly is only used here, so it is only imported here
+    import plotly.express as px
+
+    # the dropdown hands us a single string when only one series is picked
+    if isinstance(topic_choice, str):
+        topic_choice = [topic_choice]
+
+    plot_df = dataframe[dataframe["seriesId"].isin(topic_choice)]
+
+    # thinning out the data before plotly turns it into json
+    if n_vintages is not None and "forecast_period" in plot_df.columns:
+        plot_df = figure_reduction.pick_vintages(plot_df, n_between=n_vintages)
+
+    if max_points is not None:
+        plot_df = figure_reduction.downsample_traces(
+            plot_df, max_points=max_points, x=x_ax, y=y_ax
+        )
+
+    # plotly has no hue, the hue column picks the color unless a color column was chosen
+    color = color_by or hue_by
+
+    if plot_type == "line":
+        fig = px.line(
+            plot_df,
+            x=x_ax,
+            y=y_ax,
+            color=color,
+            line_group=hue_by,
+        )
+
+    elif plot_type == "scatter":
+        fig = px.scatter(
+            plot_df,
+            x=x_ax,
+            y=y_ax,
+            color=color,
+        )
+
+    elif plot_type == "area":
+        fig = px.area(
+            plot_df,
+            x=x_ax,
+            y=y_ax,
+            color=color,
+        )
+
+    elif plot_type == "bar":
+        fig = px.bar(
+            plot_df,
+            x=x_ax,
+            y=y_ax,
+            color=color,
+            barmode="group",
+        )
+
+    elif plot_type == "stackedarea":
+        fig = px.area(
+            plot_df,
+            x=x_ax,
+            y=y_ax,
+            color=color,
+            line_group=hue_by,
+        )
+
+    # measuring means serializing the whole figure, so only when someone is listening
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s figure: %d rows, %d bytes to the browser",
+            plot_type,
+            len(plot_df),
+            figure_reduction.figure_payload_bytes(fig),
+        )
+
+    return fig
+
+
+# DRAWING A PRE-AGGREGATED VISUAL AND SAVING IT AS STATIC FILES
+def save_static_figure(payload, base_path, formats=("svg", "png"), width=12, height=6):
+    """
+    Purpose is to draw a compact visual payload (periods plus one list of values per
+    series, see render_visuals.py) without a screen and save it as base_path.svg,
+    base_path.png, ... Returns the paths it wrote.
+    The previous vintage, when there is one, is drawn dashed behind the latest one
+    """
+    # no screen in batch runs, so matplotlib draws straight to files
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    periods = np.array(payload["periods"], dtype="datetime64[D]")
+    values = [np.array(s["values"], dtype=float) for s in payload["series"]]
+    labels = [s["label"] for s in payload["series"]]
+
+    fig, ax = plt.subplots(figsize=(width, height))
+
+    if payload["kind"] == "stackedarea":
+        # missing months would punch holes in the stack, so they count as zero, and
+        # the default 10 colors repeat in stacks with more series than that
+        colors = plt.cm.tab20.colors if len(values) > 10 else None
+        ax.stackplot(periods, *[np.nan_to_num(v) for v in values], labels=labels, colors=colors)
+    else:
+        for series, latest in zip(payload["series"], values):
+            (line,) = ax.plot(periods, latest, label=series["label"])
+            if "previous" in series:
+                previous = np.array(series["previous"], dtype=float)
+                ax.plot(periods, previous, linestyle="--", alpha=0.5, color=line.get_color())
+
+    ax.set_title(payload["title"])
+    ax.set_ylabel(payload["unit"] or "")
+    ax.legend(loc="upper left", bbox_to_anchor=(1, 1), frameon=False)
+    fig.autofmt_xdate()
+
+    paths = []
+    for extension in formats:
+        path = f"{base_path}.{extension}"
+        fig.savefig(path, bbox_inches="tight")
+        paths.append(path)
+
+    plt.close(fig)
+
+    return paths
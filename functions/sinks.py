@@ -0,0 +1,119 @@
+"""
+The purpose of this file is to store the places fetched data can be streamed into.
+Every sink takes one page (a dataframe) at a time with write() and is finished
+with close(), so a whole topic never has to sit in memory before it is saved
+"""
+
+import os
+
+# heavy packages are only imported the first time they are used
+from functions.lazy import lazy_import
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+
+# APPENDING PAGES TO A CSV FILE
+class CsvSink:
+    """
+    Purpose is to write pages into one csv file, the header goes in with the first page
+    """
+
+    kind = "csv"
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.file = None
+
+    def write(self, df):
+        # keeping the file open between pages instead of reopening it for every one
+        if self.file is None:
+            self.file = open(self.path, "w", newline="")
+
+        df.to_csv(self.file, header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+# APPENDING PAGES TO A PARQUET FILE, ONE ROW GROUP PER PAGE
+class ParquetSink:
+    """
+    Purpose is to write pages into one parquet file. The first page decides the
+    schema, categorical columns are stored dictionary encoded
+    """
+
+    kind = "parquet"
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.writer = None
+
+    def write(self, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self.writer is None:
+            # pages have different numbers of categories, so we pin the dictionary index type
+            self.schema = pa.schema(
+                [
+                    pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+                    if pa.types.is_dictionary(f.type)
+                    else f
+                    for f in table.schema
+                ]
+            )
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+
+        self.writer.write_table(table.cast(self.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+# UPSERTING PAGES INTO THE SQLITE DATABASE
+class DatabaseSink:
+    """
+    Purpose is to push pages into the database push_to_db.py builds, each page
+    goes in as its own batch of upserts
+    """
+
+    kind = "db"
+
+    def __init__(self, topic=None, db_path=None):
+        # imported here since the database layer lives in its own folder
+        from database import push_to_db
+
+        self.push_to_db = push_to_db
+        self.topic = topic
+        self.rows = 0
+        self.conn = push_to_db.connect(db_path or push_to_db.DB_PATH)
+
+    def write(self, df):
+        self.rows += self.push_to_db.push_frame(self.conn, df, topic=self.topic)
+
+    def close(self):
+        self.conn.close()
+
+
+# PICKING A SINK FROM A FILE NAME
+def sink_for_path(path, topic=None):
+    """
+    Purpose is to return the sink that writes the kind of file path points at,
+    .csv, .parquet, or .sqlite for the database
+    """
+    extension = os.path.splitext(path)[1]
+
+    if extension == ".csv":
+        return CsvSink(path)
+    if extension == ".parquet":
+        return ParquetSink(path)
+    if extension in [".sqlite", ".db"]:
+        return DatabaseSink(topic=topic, db_path=path)
+
+    raise ValueError(f"no sink writes {extension} files, use .csv, .parquet or .sqlite")
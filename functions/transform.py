@@ -0,0 +1,219 @@
+"""
+The purpose of this file is to store the functions that build our master data and
+everything that is computed from it
+"""
+
+# we will need to access files from our system
+import os
+
+# heavy packages are only imported the first time they are used
+from functions.lazy import lazy_import
+
+# importing packages that will allow us to transform our data
+pd = lazy_import("pandas")
+
+# columnar parquet store that sits alongside the master csv files
+master_store = lazy_import("master_store")
+
+# forecast changes between releases, rebuilt every time a topic is ingested
+revisions = lazy_import("revisions")
+
+# dense (series x vintage x month) arrays of each topic
+forecast_cube = lazy_import("forecast_cube")
+
+# memory mapped snapshots that the dashboard workers share
+snapshots = lazy_import("snapshots")
+
+# every vintage's forecasts scored against the latest actuals
+backtest = lazy_import("backtest")
+
+# the keyword searchable list of series the dashboard picks from
+series_catalog = lazy_import("series_catalog")
+
+# series computed from formulas over other series, kept in the store as their own topic
+derived_series = lazy_import("derived_series")
+
+# the sqlite database the dashboard reads ahead of the store once it has been built
+push_to_db = lazy_import("database.push_to_db")
+
+# timers and counters that tell us where a slow refresh spends its time
+instrumentation = lazy_import("instrumentation")
+
+
+# MEANDER THROUGH SPECIFIC FOLDERS AND CONCAT DATA INTO ONE DATAFRAME
+def concat_dfs(folderpath, df_name, write_store=True, incremental=False, metrics=None):
+    """
+    Purpose of this function is to grab all files from a specific area, concatenate them and then outpout them
+    as a master df. With write_store the master data also goes into the parquet store,
+    under the topic in df_name (master_wind_data -> wind).
+    incremental only reads files that are new since the last run and appends them.
+    metrics (an instrumentation.Metrics) times reading, concatenating and writing
+
+    need to import os and pandas
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    if incremental:
+        return append_new_vintages(folderpath, df_name, metrics=metrics)
+
+    # creating any empty list where all datafiles will be stored
+    dfs = []
+
+    # grabbing all datafiles from the provided path
+    for filename in os.listdir(folderpath):
+        if filename.endswith("csv"):
+            file_path = os.path.join(folderpath, filename)
+
+            try:
+                # reading the csv file to make sure that it is good to go
+                with metrics.stage("read_csv"):
+                    df = pd.read_csv(file_path)
+
+                # adding to our master df
+                dfs.append(df)
+
+            except Exception as e:
+                print(f"error reading {filename}: {e}")
+                continue  # we must move forward king
+
+    # concetanating all of our dfs
+    with metrics.stage("concat"):
+        master_df = pd.concat(dfs, axis=0)
+
+        # resetting our index
+        master_df = master_df.reset_index()
+
+        # dropping the dumb 'index' column
+        master_df = master_df.drop(columns="index")
+
+    # setting our period column to a date type
+    with metrics.stage("transform"):
+        master_df["period"] = pd.to_datetime(master_df["period"])
+
+    metrics.count("master_rows", len(master_df))
+
+    # saving our file under 'master output'
+    with metrics.stage("write_csv"):
+        master_df.to_csv(f"master_output/{df_name}.csv", index=False)
+
+    # and into the columnar store, one partition per forecast period
+    if write_store:
+        topic = master_store.topic_from_name(df_name)
+        with metrics.stage("write_store"):
+            master_store.write_topic(master_df, topic)
+        with metrics.stage("rebuild_derived"):
+            rebuild_derived(topic)
+
+    # letting the homies know everythig is good to go
+    print("Master data has been successfully processed")
+
+    print(master_df.info())
+
+
+# WHERE EVERYTHING COMPUTED FROM A STORE LIVES
+def output_paths(store_path):
+    """
+    Purpose is to return the revisions, cubes, backtests, snapshots, catalog and
+    database paths that go with a store. They sit next to the store folder, so the
+    default store gets the default paths and a store anywhere else keeps its own
+    """
+    folder = os.path.dirname(os.path.normpath(store_path))
+
+    return {
+        "revisions_path": os.path.join(folder, "revisions"),
+        "cubes_path": os.path.join(folder, "cubes"),
+        "backtests_path": os.path.join(folder, "backtests"),
+        "snapshots_path": os.path.join(folder, "snapshots"),
+        "catalog_path": os.path.join(folder, "series_catalog.json"),
+        "db_path": os.path.join(folder, "steo.sqlite"),
+    }
+
+
+# REBUILDING EVERYTHING THAT IS COMPUTED FROM A TOPIC'S MASTER DATA
+def rebuild_derived(topic, store_path=None):
+    """
+    Purpose is to refresh a topic's revisions, cube, backtest and catalog rows, then
+    publish a new snapshot (and push it into the database, if there is one) so
+    running dashboards pick up the new data. The derived
+    series built from the topic are recomputed, and rebuilt the same way, too.
+    Everything is written next to store_path, see output_paths
+    """
+    store_path = store_path or master_store.STORE_PATH
+    paths = output_paths(store_path)
+
+    revisions.materialize_revisions(
+        topic, store_path=store_path, revisions_path=paths["revisions_path"]
+    )
+    forecast_cube.materialize_cube(topic, store_path=store_path, cubes_path=paths["cubes_path"])
+    backtest.materialize_backtest(
+        topic, store_path=store_path, backtests_path=paths["backtests_path"]
+    )
+    series_catalog.refresh_topic(
+        topic, store_path=store_path, catalog_path=paths["catalog_path"]
+    )
+    snapshots.publish_snapshot(
+        topic, store_path=store_path, snapshots_path=paths["snapshots_path"]
+    )
+
+    # the database is optional, but once it exists it has to keep up with the store
+    if os.path.exists(paths["db_path"]):
+        push_to_db.push_store(db_path=paths["db_path"], store_path=store_path, topics=[topic])
+
+    # only the formulas whose inputs changed are recomputed, usually none of them
+    if topic != derived_series.DERIVED_TOPIC:
+        if derived_series.refresh_derived(store_path=store_path):
+            rebuild_derived(derived_series.DERIVED_TOPIC, store_path=store_path)
+
+
+# ONLY ADD NEW MONTHLY FILES TO A MASTER FILE INSTEAD OF REBUILDING IT
+def append_new_vintages(folderpath, df_name, metrics=None):
+    """
+    Purpose is to update a master file with just the files that landed since last time.
+    The store keeps track of what it has ingested, brand new forecast periods are
+    appended to the master csv, and the csv is only rewritten if an old file changed
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+
+    topic = master_store.topic_from_name(df_name)
+    csv_path = f"master_output/{df_name}.csv"
+
+    with metrics.stage("write_store"):
+        new_df, replaced = master_store.ingest_folder(folderpath, topic)
+
+    metrics.count("master_rows", len(new_df))
+
+    if len(new_df) == 0:
+        return
+
+    with metrics.stage("write_csv"):
+        if replaced or not os.path.exists(csv_path):
+            # an already ingested forecast period changed, so the csv has to match the store again
+            master_df = master_store.read_topic(topic).drop(columns="topic")
+            master_df.to_csv(csv_path, index=False)
+        else:
+            new_df.to_csv(csv_path, mode="a", header=False, index=False)
+
+    # the revisions, cube and snapshot only need rebuilding when something new came in
+    with metrics.stage("rebuild_derived"):
+        rebuild_derived(topic)
+
+    print("Master data has been successfully processed")
+
+
+# GRAB A LIST OF PERIOD FORECASTS FROM THE 'FORECAST PERIOD' COLUMN
+def recent_forecast(df):
+    """
+    given a dataframe, only grab the most recent forecast data.
+    also works on a ForecastCube
+    """
+    # a cube already knows which vintage is the newest
+    if hasattr(df, "recent_forecast"):
+        return df.recent_forecast()
+
+    # variable storing the most recent forecast period
+    recent_period = df["forecast_period"].max()
+
+    # filter dataframe to only include data with most recent forecast
+    df_filtered = df[df["forecast_period"] == recent_period]
+
+    return df_filtered
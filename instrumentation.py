@@ -0,0 +1,283 @@
+"""
+The purpose of this file is to let us see where the time goes when a refresh is slow.
+A Metrics object is handed to the fetch/transform functions (metrics=...) and keeps:
+- per stage timers: network, rate_limit_wait, decode, concat, write_csv, ...
+- counters: requests, bytes, rows, retries, cache_hits
+record_run() wraps a whole run, can profile it with cProfile and/or tracemalloc,
+and hands the results to any number of sinks (log, json lines, prometheus text)
+"""
+
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+
+# where cProfile stats of profiled runs are saved
+PROFILES_PATH = "output/profiles"
+
+
+# TIMERS AND COUNTERS FOR ONE RUN, SAFE TO SHARE BETWEEN THREADS
+class Metrics:
+    """
+    Purpose is to collect how long each stage took and how much work was done.
+    Stages can nest, an outer stage's time includes its inner stages
+    """
+
+    def __init__(self, name="run"):
+        self.name = name
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds, calls=1):
+        with self._lock:
+            totals = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0})
+            totals["seconds"] += seconds
+            totals["calls"] += calls
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        """
+        Purpose is to time the code inside a with block as one call of stage
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def timed(self, stage, iterable):
+        """
+        Purpose is to time how long we wait on each item of an iterable, e.g. the
+        chunks of a streamed response, without timing what we do with them
+        """
+        iterator = iter(iterable)
+        seconds, calls = 0.0, 0
+
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started
+                    calls += 1
+
+                yield item
+        finally:
+            self.add_time(stage, seconds, calls=calls)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "run": self.name,
+                "stages": {stage: dict(totals) for stage, totals in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+
+# A METRICS OBJECT THAT IGNORES EVERYTHING, USED WHEN NOBODY ASKED FOR METRICS
+class NullMetrics(Metrics):
+    def add_time(self, stage, seconds, calls=1):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        yield
+
+    def timed(self, stage, iterable):
+        return iterable
+
+
+NO_METRICS = NullMetrics()
+
+
+# PRINTING (OR LOGGING) A SHORT SUMMARY OF A RUN
+class LogSink:
+    """
+    Purpose is to write a readable summary of a run, with print unless a
+    logging.Logger is passed
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def emit(self, snapshot):
+        lines = [f"{snapshot['run']}: {snapshot.get('duration_seconds', 0):.3f}s"]
+
+        # slowest stages first, that is what we are usually looking for
+        stages = sorted(
+            snapshot["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True
+        )
+        for stage, totals in stages:
+            lines.append(
+                f"  {stage:<18} {totals['seconds']:>9.3f}s  {totals['calls']:>7} calls"
+            )
+
+        for counter, n in sorted(snapshot["counters"].items()):
+            lines.append(f"  {counter:<18} {n:>10,}")
+
+        if "peak_memory_bytes" in snapshot:
+            lines.append(f"  {'peak_memory':<18} {snapshot['peak_memory_bytes'] / 1e6:>9.2f} MB")
+
+        if "profile_path" in snapshot:
+            lines.append(f"  cProfile stats saved to {snapshot['profile_path']}")
+
+        for line in lines:
+            if self.logger is None:
+                print(line)
+            else:
+                self.logger.info(line)
+
+
+# APPENDING EACH RUN AS ONE LINE OF JSON
+class JsonLinesSink:
+    """
+    Purpose is to keep a history of runs in a json lines file we can load with
+    pd.read_json(path, lines=True)
+    """
+
+    def __init__(self, path="output/metrics.jsonl"):
+        self.path = path
+
+    def emit(self, snapshot):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with open(self.path, "a") as f:
+            f.write(json.dumps(snapshot, sort_keys=True) + "\n")
+
+
+# WRITING THE LAST RUN IN PROMETHEUS' TEXT FORMAT
+class PrometheusSink:
+    """
+    Purpose is to write the last run's metrics where a node_exporter textfile
+    collector can pick them up. The file is replaced, never appended to
+    """
+
+    def __init__(self, path="output/metrics.prom", prefix="steo"):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, snapshot):
+        run = escape_label(snapshot["run"])
+        lines = []
+
+        # counts only go up, so they are counters named _total, the rest are gauges
+        def metric(name, help_text, samples, kind="gauge"):
+            if kind == "counter":
+                name = f"{name}_total"
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{self.prefix}_{name}{{{labels}}} {value}")
+
+        stages = sorted(snapshot["stages"].items())
+        metric(
+            "stage_seconds",
+            "Seconds spent in each stage of the last run.",
+            [(f'run="{run}",stage="{escape_label(s)}"', t["seconds"]) for s, t in stages],
+        )
+        metric(
+            "stage_calls",
+            "Times each stage ran in the last run.",
+            [(f'run="{run}",stage="{escape_label(s)}"', t["calls"]) for s, t in stages],
+            kind="counter",
+        )
+
+        for counter, n in sorted(snapshot["counters"].items()):
+            metric(
+                counter,
+                f"{counter} counted in the last run.",
+                [(f'run="{run}"', n)],
+                kind="counter",
+            )
+
+        for key in ["duration_seconds", "peak_memory_bytes", "finished_seconds"]:
+            if key in snapshot:
+                metric(f"run_{key}", f"{key} of the last run.", [(f'run="{run}"', snapshot[key])])
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # writing next to it and swapping it in so a scrape never sees half a file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+# ESCAPING A PROMETHEUS LABEL VALUE
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# TIMING (AND OPTIONALLY PROFILING) ONE WHOLE RUN
+@contextlib.contextmanager
+def record_run(name, sinks=(), profile=(), profiles_path=PROFILES_PATH):
+    """
+    Purpose is to hand out a Metrics object for the code inside the with block and
+    send what it collected to every sink once the block is done.
+    profile can hold "cprofile" (stats saved under profiles_path) and/or
+    "tracemalloc" (peak memory of the run)
+    """
+    if isinstance(profile, str):
+        profile = [profile]
+
+    metrics = Metrics(name)
+
+    profiler = cProfile.Profile() if "cprofile" in profile else None
+    tracing = "tracemalloc" in profile and not tracemalloc.is_tracing()
+
+    if tracing:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        duration = time.perf_counter() - started
+
+        if profiler is not None:
+            profiler.disable()
+
+        snapshot = metrics.snapshot()
+        snapshot["duration_seconds"] = duration
+        snapshot["finished_seconds"] = time.time()
+        snapshot["finished"] = datetime.datetime.now().isoformat(timespec="seconds")
+
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot["peak_memory_bytes"] = peak
+
+        if profiler is not None:
+            os.makedirs(profiles_path, exist_ok=True)
+            stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_name = "".join(c if c.isalnum() else "_" for c in name)
+            snapshot["profile_path"] = os.path.join(profiles_path, f"{safe_name}_{stamp}.prof")
+
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(snapshot["profile_path"])
+
+        for sink in sinks:
+            sink.emit(snapshot)
@@ -1,55 +1,71 @@
-<script>
 
 // setting up the dimensions and margins of our graph
-var margin = {top: 10, right: 30, bottom: 30, left: 60},
-width = 460 - margin.left - margin.right,
-height = 400 - margin.top - margin.bottom;
+const margin = {top: 10, right: 30, bottom: 30, left: 60},
+    width = 800 - margin.left - margin.right,
+    height = 400 - margin.top - margin.bottom;
 
-// appending the svg image to the body of the page
-var svg = d3.select("#my-chart")
+// the pre-aggregated payload render_visuals.py writes after every release,
+// so the page no longer has to download and parse a whole master csv.
+// output/ is not tracked, run `python render_visuals.py` from the repo root first
+const payloadPath = '../output/popular_visuals/rendered/solar.json';
+
+// appending the svg image to the chart div
+const svg = d3.select('#my-chart')
     .append('svg')
-    .attr('width', width + margin.left + margin.right)
-    .attr('height', height + margin.top + margin.bottom)
+        .attr('width', width + margin.left + margin.right)
+        .attr('height', height + margin.top + margin.bottom)
     .append('g')
-    .attr('transform',
-        'translate(' + margin.left + ',' + margin.top + ')');
-
-// reading our data
-d3.csv('master_solar_data.csv',
+        .attr('transform', `translate(${margin.left}, ${margin.top})`);
 
-// formatting our data so it can be read 
-function(data) {
-    return {date: d3.timeParse('%m/%d/%Y')(d.period), value : d.value }
-}, 
+// reading our payload, periods plus one list of values per series
+// (a 404 here means render_visuals.py has not been run yet)
+d3.json(payloadPath).then(payload => {
 
-// now we can use the dataset
-function(data) {
+    const parseDate = d3.timeParse('%Y-%m-%d');
+    const periods = payload.periods.map(parseDate);
 
-    // adding the x axis component, which is a data type 
-    var x = d3.scaleTime()
-        .domain(d3.extent(data, function (d) { return d.period; }))
+    // adding the x axis component, which is a date
+    const x = d3.scaleTime()
+        .domain(d3.extent(periods))
         .range([0, width]);
     svg.append('g')
-        .attr('transform', 'translate(0,' + height + ')')
+        .attr('transform', `translate(0, ${height})`)
         .call(d3.axisBottom(x));
-    
-    // adding the y axis component, which should be shown as an integer
-    var y = d3.scaleLinear()
-        .domain([0, d3.max(data, function (d) { return +d.value; })])
+
+    // adding the y axis component, from zero to the highest value of any series
+    const y = d3.scaleLinear()
+        .domain([0, d3.max(payload.series, s => d3.max(s.values))])
         .range([height, 0]);
     svg.append('g')
         .call(d3.axisLeft(y));
-    
-    // adding the line now
-    svg.append('path')
-        .datum(data)
-        .attr('fill', 'none')
-        .attr('stroke', 'steelblue')
-        .attr('stroke-width', 1.5)
-        .attr('d', d3.line()
-            .x(function(d) { return x(d.period) })
-            .y(function (d) { return y(d.value) })
-        )
-}))
-    
-</script>
+
+    // missing months are null in the payload, so the line just skips them
+    const line = d3.line()
+        .defined(d => d[1] !== null)
+        .x(d => x(d[0]))
+        .y(d => y(d[1]));
+
+    const color = d3.scaleOrdinal(d3.schemeCategory10);
+
+    // adding one line per series, the latest vintage solid and the one before it dashed
+    payload.series.forEach(s => {
+        if (s.previous) {
+            svg.append('path')
+                .datum(d3.zip(periods, s.previous))
+                .attr('fill', 'none')
+                .attr('stroke', color(s.id))
+                .attr('stroke-dasharray', '4 3')
+                .attr('opacity', 0.5)
+                .attr('d', line);
+        }
+
+        svg.append('path')
+            .datum(d3.zip(periods, s.values))
+            .attr('fill', 'none')
+            .attr('stroke', color(s.id))
+            .attr('stroke-width', 1.5)
+            .attr('d', line)
+            .append('title')
+                .text(s.label);
+    });
+});
@@ -0,0 +1,315 @@
+"""
+The purpose of this file is to store our master data in a columnar Parquet store
+partitioned by topic and forecast period, instead of one big CSV per topic
+"""
+
+# we will need to access files from our system
+import os
+import glob
+import shutil
+import json
+import hashlib
+
+# pyarrow reads and writes the parquet store
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# importing packages that will allow us to transform our data
+import pandas as pd
+
+
+# where the store lives unless told otherwise
+STORE_PATH = "master_output/store"
+
+# the column types we keep in the store, strings are dictionary encoded since
+# the same description and unit repeat on every row of a series
+STORE_SCHEMA = pa.schema(
+    [
+        ("period", pa.date32()),
+        ("seriesId", pa.dictionary(pa.int32(), pa.string())),
+        ("seriesDescription", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.float32()),
+        ("unit", pa.dictionary(pa.int32(), pa.string())),
+    ]
+)
+
+# topic and forecast period live in the folder names (topic=wind/forecast_period=2024-03-01)
+PARTITIONING = ds.partitioning(
+    pa.schema([("topic", pa.string()), ("forecast_period", pa.date32())]),
+    flavor="hive",
+)
+
+
+# TURNING A MASTER FILE NAME INTO A TOPIC NAME
+def topic_from_name(df_name):
+    """
+    Purpose is to go from a name like master_wind_data(.csv) to wind
+    """
+    name = os.path.basename(df_name).removesuffix(".csv")
+
+    return name.removeprefix("master_").removesuffix("_data")
+
+
+# CONVERTING A STEO DATAFRAME INTO AN ARROW TABLE WITH OUR STORE TYPES
+def to_store_table(df, topic):
+    """
+    Purpose is to cast a dataframe shaped like series_to_dataframe's output into
+    native dates, float32 values and dictionary encoded strings
+    """
+    df = df.copy()
+
+    # older master files mix date formats in forecast_period (1/1/2024 and 2024-01-01)
+    df["period"] = pd.to_datetime(df["period"], format="mixed").dt.date
+    df["forecast_period"] = pd.to_datetime(df["forecast_period"], format="mixed").dt.date
+    df["topic"] = topic
+
+    schema = STORE_SCHEMA.append(pa.field("topic", pa.string())).append(
+        pa.field("forecast_period", pa.date32())
+    )
+
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+# WRITING A TOPIC INTO THE STORE
+def write_topic(df, topic, store_path=STORE_PATH):
+    """
+    Purpose is to write a topic's data into the store. Any forecast period that is
+    in df replaces what the store had for that topic and forecast period
+    """
+    table = to_store_table(df, topic)
+
+    ds.write_dataset(
+        table,
+        store_path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template=f"{topic}-{{i}}.parquet",
+    )
+
+
+# READING DATA BACK OUT OF THE STORE
+def read_topic(
+    topic=None,
+    columns=None,
+    series=None,
+    start=None,
+    end=None,
+    forecast_periods=None,
+    store_path=STORE_PATH,
+):
+    """
+    Purpose is to load just the columns and rows we need from the store.
+    The filters are pushed down, so only matching partitions and row groups are read.
+    topic can be one topic name or a list of them, None reads every topic
+    """
+    dataset = ds.dataset(store_path, format="parquet", partitioning=PARTITIONING)
+
+    # building up one filter expression from whatever the caller asked for
+    filters = []
+    if topic is not None:
+        topics = [topic] if isinstance(topic, str) else list(topic)
+        filters.append(ds.field("topic").isin(topics))
+    if series is not None:
+        filters.append(ds.field("seriesId").isin(list(series)))
+    if start is not None:
+        filters.append(ds.field("period") >= pa.scalar(pd.Timestamp(start).date()))
+    if end is not None:
+        filters.append(ds.field("period") <= pa.scalar(pd.Timestamp(end).date()))
+    if forecast_periods is not None:
+        vintages = [pd.Timestamp(v).date() for v in forecast_periods]
+        filters.append(ds.field("forecast_period").isin(pa.array(vintages, pa.date32())))
+
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+
+    table = dataset.to_table(columns=columns, filter=expression)
+
+    # the partition columns come back as plain strings, dictionary encoding them keeps memory down
+    if "topic" in table.column_names:
+        i = table.column_names.index("topic")
+        table = table.set_column(i, "topic", pc.dictionary_encode(table["topic"]))
+
+    # dates come back as datetime64 so the rest of our code can compare them with timestamps
+    df = table.to_pandas(date_as_object=False)
+
+    return df
+
+
+# LISTING THE TOPICS WE HAVE IN THE STORE
+def list_topics(store_path=STORE_PATH):
+    return sorted(
+        os.path.basename(path).removeprefix("topic=")
+        for path in glob.glob(os.path.join(store_path, "topic=*"))
+    )
+
+
+# LISTING THE FORECAST VINTAGES A TOPIC HAS IN THE STORE, OLDEST FIRST
+def list_vintages(topic, store_path=STORE_PATH):
+    folders = glob.glob(os.path.join(store_path, f"topic={topic}", "forecast_period=*"))
+
+    return sorted(
+        pd.Timestamp(os.path.basename(path).removeprefix("forecast_period="))
+        for path in folders
+    )
+
+
+# HASHING A FILE SO WE CAN TELL IF ITS CONTENTS CHANGED
+def file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+# ADDING ONLY NEW OR CHANGED MONTHLY FILES FROM A FOLDER INTO THE STORE
+def ingest_folder(folderpath, topic, store_path=STORE_PATH):
+    """
+    Purpose is to keep a topic up to date without re-reading its whole history.
+    A manifest (path, size, mtime, hash) of every file we ingested lives next to the
+    store; only files that are new or whose contents changed get read, and only the
+    forecast periods they touch get rewritten, deduped on (seriesId, period, forecast_period).
+    A changed file first takes out the (seriesId, forecast_period) pairs it had before,
+    so rows it no longer has do not linger.
+    Returns the rows of the touched forecast periods, and whether any of those
+    forecast periods were already in the store before this run
+    """
+    manifest_path = os.path.join(store_path, "_manifest.json")
+
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+
+    # finding the files we have not seen, checking size and mtime first so we only hash suspects
+    new_files = []
+    for filename in sorted(os.listdir(folderpath)):
+        if not filename.endswith("csv"):
+            continue
+
+        file_path = os.path.join(folderpath, filename)
+        info = os.stat(file_path)
+        seen = manifest.get(file_path)
+
+        if seen and seen["size"] == info.st_size and seen["mtime"] == info.st_mtime:
+            continue
+
+        digest = file_hash(file_path)
+        if seen and seen["sha256"] == digest:
+            # touched but not changed, just remember the new mtime
+            seen["mtime"] = info.st_mtime
+            continue
+
+        new_files.append((file_path, info, digest))
+
+    if len(new_files) == 0:
+        print(f"nothing new to ingest for topic '{topic}'")
+        return pd.DataFrame(), False
+
+    dfs = []
+    for file_path, _, _ in new_files:
+        try:
+            dfs.append(pd.read_csv(file_path).assign(_source=file_path))
+        except Exception as e:
+            print(f"error reading {file_path}: {e}")
+            new_files = [f for f in new_files if f[0] != file_path]
+
+    if len(dfs) == 0:
+        print(f"none of the new files for topic '{topic}' could be read")
+        return pd.DataFrame(), False
+
+    new_df = pd.concat(dfs, axis=0)
+    new_df["period"] = pd.to_datetime(new_df["period"], format="mixed")
+    new_df["forecast_period"] = pd.to_datetime(new_df["forecast_period"], format="mixed")
+
+    # a file owns the (seriesId, forecast_period) pairs it had last time, so a changed
+    # file takes those out of the store before its new rows go in (files from before
+    # we remembered that give up the pairs they have now)
+    owned = []
+    for file_path, _, _ in new_files:
+        seen = manifest.get(file_path)
+        if seen is None:
+            continue
+
+        pairs = seen.get("pairs")
+        if pairs is None:
+            rows = new_df[new_df["_source"] == file_path]
+            pairs = rows[["seriesId", "forecast_period"]].drop_duplicates().values.tolist()
+        owned += [(str(series), pd.Timestamp(vintage)) for series, vintage in pairs]
+    owned = set(owned)
+
+    # pulling in whatever the store already has for the forecast periods we are touching
+    vintages = {pd.Timestamp(v) for v in new_df["forecast_period"].unique()}
+    vintages = sorted(vintages | {vintage for _, vintage in owned})
+    existing_df = pd.DataFrame()
+    if topic in list_topics(store_path):
+        existing_df = read_topic(topic, forecast_periods=vintages, store_path=store_path)
+        existing_df = existing_df.drop(columns="topic").astype(
+            {"seriesId": str, "seriesDescription": str, "unit": str, "value": float}
+        )
+
+    replaced = len(existing_df) > 0
+
+    if len(owned) > 0 and replaced:
+        keys = pd.MultiIndex.from_arrays([existing_df["seriesId"], existing_df["forecast_period"]])
+        existing_df = existing_df[~keys.isin(list(owned))]
+
+    # newer files win when the same observation shows up twice
+    touched_df = pd.concat([existing_df, new_df.drop(columns="_source")], axis=0)
+    touched_df = touched_df.drop_duplicates(
+        subset=["seriesId", "period", "forecast_period"], keep="last"
+    )
+    touched_df = touched_df.reset_index(drop=True)
+
+    write_topic(touched_df, topic, store_path=store_path)
+
+    # a forecast period that only a changed file had is left with nothing to write
+    emptied = set(vintages) - set(touched_df["forecast_period"].unique())
+    for vintage in emptied:
+        shutil.rmtree(
+            os.path.join(store_path, f"topic={topic}", f"forecast_period={vintage.date()}"),
+            ignore_errors=True,
+        )
+
+    # remembering the files so we skip them next time
+    for file_path, info, digest in new_files:
+        rows = new_df[new_df["_source"] == file_path]
+        pairs = rows[["seriesId", "forecast_period"]].drop_duplicates()
+        manifest[file_path] = {
+            "topic": topic,
+            "size": info.st_size,
+            "mtime": info.st_mtime,
+            "sha256": digest,
+            "pairs": [
+                [str(series), vintage.date().isoformat()] for series, vintage in pairs.values
+            ],
+        }
+
+    os.makedirs(store_path, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"ingested {len(new_files)} file(s), {len(touched_df)} rows for topic '{topic}'")
+
+    return touched_df, replaced
+
+
+# MOVING THE CURRENT MASTER CSV FILES INTO THE STORE
+def migrate_master_csvs(master_folder="master_output", store_path=STORE_PATH):
+    """
+    Purpose is to do a one-time conversion of every master_*.csv into the store
+    """
+    for csv_path in sorted(glob.glob(os.path.join(master_folder, "master_*.csv"))):
+        topic = topic_from_name(csv_path)
+
+        write_topic(pd.read_csv(csv_path), topic, store_path=store_path)
+
+        print(f"{csv_path} has been written to {store_path} as topic '{topic}'")
+
+
+if __name__ == "__main__":
+    migrate_master_csvs()
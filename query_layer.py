@@ -0,0 +1,240 @@
+"""
+The purpose of this file is to answer the dashboard's data requests quickly.
+The master data is sorted and indexed once, and each filtered result is kept
+around so the same selection is never filtered twice
+"""
+
+import threading
+from collections import OrderedDict
+
+# importing packages that will allow us to transform our data
+import pandas as pd
+
+from compact_frames import from_month_ordinal
+
+
+# A SORTED, INDEXED VIEW OF A MASTER DATAFRAME WITH MEMOIZED FILTERS
+class SeriesQuery:
+    """
+    Purpose is to hold a master dataframe indexed by (seriesId, forecast_period, period)
+    so that picking series, a vintage and a date range is an index slice instead of
+    boolean masks over every row. Given a ForecastCube it slices the cube's arrays
+    instead, so only the selected block is ever read. The last max_entries results
+    are memoized
+    """
+
+    def __init__(self, df, max_entries=128):
+        self.max_entries = max_entries
+        self.results = OrderedDict()
+        self.result_sizes = {}
+        self.results_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        # a ForecastCube stays memory mapped, each selection only reads its own block
+        if hasattr(df, "vintage_positions"):
+            self.cube = df
+            self.frame = None
+            self.frame_bytes = 0
+
+            self.latest_vintage = pd.Timestamp(from_month_ordinal(df.vintages[-1:])[0])
+            self.series_ids = pd.Index(df.series_ids)
+            self.period_min = pd.Timestamp(from_month_ordinal(df.periods[:1])[0])
+            self.period_max = pd.Timestamp(from_month_ordinal(df.periods[-1:])[0])
+            return
+
+        self.cube = None
+
+        # a CompactFrame hands us its rows in the long format
+        if hasattr(df, "to_long"):
+            df = df.to_long()
+
+        frame = df.copy()
+        frame["period"] = pd.to_datetime(frame["period"], format="mixed")
+        frame["forecast_period"] = pd.to_datetime(frame["forecast_period"], format="mixed")
+
+        # sorting once up front means every slice afterwards is a binary search
+        self.frame = frame.set_index(
+            ["seriesId", "forecast_period", "period"], drop=False
+        ).sort_index()
+
+        # the most recent release is the same for every callback, so we only find it once
+        self.latest_vintage = frame["forecast_period"].max()
+        self.series_ids = self.frame.index.get_level_values(0).unique()
+        self.period_min = frame["period"].min()
+        self.period_max = frame["period"].max()
+
+        # a discontinued series has no rows in the newest vintage to slice
+        self.latest_series_ids = set(
+            frame.loc[frame["forecast_period"] == self.latest_vintage, "seriesId"]
+        )
+
+        # measured once, the memoized results are added and taken off as they come and go
+        self.frame_bytes = int(self.frame.memory_usage(deep=True).sum())
+
+    def select(self, series, vintage_mode="comparison", start_date=None, end_date=None):
+        """
+        returns the rows for the given series between start_date and end_date, either
+        for every vintage ("comparison") or just the most recent one ("no comparison")
+        """
+        # the dropdown hands us a single string when only one series is picked
+        if isinstance(series, str):
+            series = [series]
+
+        key = (tuple(sorted(series or [])), vintage_mode, str(start_date), str(end_date))
+
+        if key in self.results:
+            # moving it to the back so it is the last thing to be evicted
+            self.results.move_to_end(key)
+            self.hits += 1
+            return self.results[key]
+
+        self.misses += 1
+
+        # skipping ids that are not in this topic so the slice does not raise
+        wanted = [s for s in key[0] if s in self.series_ids]
+        vintages = self.latest_vintage if vintage_mode == "no comparison" else slice(None)
+        if vintage_mode == "no comparison" and self.cube is None:
+            wanted = [s for s in wanted if s in self.latest_series_ids]
+        periods = slice(
+            pd.Timestamp(start_date) if start_date else None,
+            pd.Timestamp(end_date) if end_date else None,
+        )
+
+        if self.cube is not None:
+            result = self.cube_slice(wanted, vintage_mode, periods)
+        elif len(wanted) == 0:
+            result = self.frame.iloc[0:0].reset_index(drop=True)
+        else:
+            result = self.frame.loc[pd.IndexSlice[wanted, vintages, periods], :]
+            result = result.reset_index(drop=True)
+
+        self.results[key] = result
+        self.result_sizes[key] = int(result.memory_usage(deep=True).sum())
+        self.results_bytes += self.result_sizes[key]
+        if len(self.results) > self.max_entries:
+            old_key, _ = self.results.popitem(last=False)
+            self.results_bytes -= self.result_sizes.pop(old_key)
+
+        return result
+
+    def cube_slice(self, wanted, vintage_mode, periods):
+        """
+        reads just the wanted series, vintages and months off the cube and turns that
+        block into rows laid out like the indexed frame's
+        """
+        vintages = self.cube.vintages[-1:] if vintage_mode == "no comparison" else None
+        result = self.cube.to_long(
+            series=wanted, vintages=vintages, start=periods.start, end=periods.stop
+        )
+
+        # the cube works in whole months, a date part way through one is trimmed here
+        if periods.start is not None:
+            result = result[result["period"] >= periods.start]
+        if periods.stop is not None:
+            result = result[result["period"] <= periods.stop]
+
+        columns = ["period", "seriesId", "seriesDescription", "value", "unit", "forecast_period"]
+        result = result[[c for c in columns if c in result.columns]]
+
+        return result.sort_values(["seriesId", "forecast_period", "period"], ignore_index=True)
+
+    def memory_bytes(self):
+        """
+        returns how much memory the indexed frame and the memoized results are holding,
+        kept up to date as results are memoized so it is cheap to ask often
+        """
+        return self.frame_bytes + self.results_bytes
+
+
+# HOW MUCH MEMORY A CACHED DATASET IS USING
+def memory_bytes(value):
+    if hasattr(value, "memory_bytes"):
+        return value.memory_bytes()
+
+    return int(value.memory_usage(deep=True).sum())
+
+
+# A SHARED, SIZE BOUNDED CACHE OF DATASETS THAT ARE LOADED ON FIRST USE
+class DatasetCache:
+    """
+    Purpose is to load datasets (a topic's SeriesQuery, its revisions, ...) only when
+    someone first asks for them, and to drop the least recently used ones once the
+    cache holds more than max_bytes. loader(key) builds the dataset for a key
+    """
+
+    def __init__(self, loader, max_bytes=512 * 1024**2):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+        # one lock per key being loaded, so a slow topic only holds up its own requests
+        self.loading = {}
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                return self._hit(key)
+
+            key_lock = self.loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # another request may have loaded it while we waited for the key's lock
+            with self.lock:
+                if key in self.entries:
+                    return self._hit(key)
+
+            try:
+                value = self.loader(key)
+                size = memory_bytes(value)
+            finally:
+                with self.lock:
+                    self.loading.pop(key, None)
+
+            with self.lock:
+                self.entries[key] = value
+                self.sizes[key] = size
+                self._evict(keep=key)
+
+            return value
+
+    def _hit(self, key):
+        """
+        called with the lock held. Datasets memoize what they are asked for, so
+        the ones that can say how big they are now are measured again
+        """
+        self.entries.move_to_end(key)
+        value = self.entries[key]
+
+        if hasattr(value, "memory_bytes"):
+            self.sizes[key] = value.memory_bytes()
+            self._evict(keep=key)
+
+        return value
+
+    def _evict(self, keep):
+        # evicting the oldest datasets, but never the one being handed out
+        total = sum(self.sizes.values())
+        for old_key in list(self.entries):
+            if total <= self.max_bytes:
+                break
+            if old_key != keep:
+                del self.entries[old_key]
+                total -= self.sizes.pop(old_key)
+
+    def clear(self):
+        """
+        drops every dataset, each one is loaded again the next time it is asked for
+        """
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+
+    def loaded(self):
+        """
+        returns the keys currently in memory and how many bytes each is using
+        """
+        with self.lock:
+            return {key: self.sizes[key] for key in self.entries}
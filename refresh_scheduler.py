@@ -0,0 +1,484 @@
+"""
+The purpose of this file is to keep the store up to date without anyone running it.
+It is a long running process that sleeps until the next STEO release in
+release_schedule.py, pulls that vintage once the API actually serves it (retrying
+with jittered backoff, the data often lands a while after the scheduled time), runs
+the same ingest the backfill does (store, derived data, visuals) and then tells the
+running dashboards to reload. Once the schedule runs out it keeps going, polling
+from the first Tuesday of every month until that month's release shows up.
+--dry-run replays the schedule on a fake clock against a fake API and only prints
+what it would do, so the whole loop can be checked offline in a few seconds
+
+run from the repo root:
+    python refresh_scheduler.py --key-file api_key.txt
+    python refresh_scheduler.py --dry-run --start 2025-01-01
+"""
+
+# we will need to access files from our system
+import os
+import datetime
+import random
+import time
+from zoneinfo import ZoneInfo
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+# importing our functions python script
+import functions as fns
+
+import master_store
+import release_schedule
+import snapshots
+import instrumentation
+import render_visuals
+from database import pull_data
+
+
+# STEO data goes up around noon eastern on the release date
+RELEASE_TIME = datetime.time(12, 0)
+RELEASE_TIMEZONE = ZoneInfo("America/New_York")
+
+# how far back every topic is pulled, same as the backfill's api jobs
+FETCH_START = "2000-01"
+
+# where the incremental pulls keep their files and their record of what was pulled
+SYNC_FOLDER = "output/refresh"
+
+# the first retry waits about this long (seconds), every retry after it twice as long
+RETRY_DELAY = 15 * 60
+
+# longest wait between two retries (seconds)
+MAX_RETRY_DELAY = 2 * 60 * 60
+
+# a release that has not shown up on the API this long after it was due is skipped
+GIVE_UP_AFTER = datetime.timedelta(days=3)
+
+# past the schedule we only know a release lands early in the month, so we keep
+# polling a lot longer (but stop before the next month's guess)
+GUESSED_GIVE_UP_AFTER = datetime.timedelta(days=21)
+
+# longest single sleep (seconds), so a suspended machine or a changed clock is noticed
+MAX_NAP = 60 * 60
+
+
+# THE REAL CLOCK
+class SystemClock:
+    """
+    Purpose is to tell the time and wait, the scheduler never calls time directly
+    """
+
+    def now(self):
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+# A CLOCK THAT JUMPS AHEAD INSTEAD OF WAITING
+class FakeClock:
+    """
+    Purpose is to let a dry run go through months of releases at once. sleep moves
+    the time forward and keeps a tally of how long we would have waited
+    """
+
+    def __init__(self, start):
+        self.current = start
+        self.slept = 0.0
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += datetime.timedelta(seconds=seconds)
+        self.slept += seconds
+
+
+# WHEN EVERY RELEASE ON THE SCHEDULE GOES UP, WORKED OUT ONCE
+def release_times(release_dates=None):
+    """
+    Purpose is to return [(release time in utc, vintage month)] sorted by time
+    """
+    release_dates = release_dates or release_schedule.release_dates
+
+    return sorted(
+        (
+            datetime.datetime.combine(date, RELEASE_TIME, tzinfo=RELEASE_TIMEZONE).astimezone(
+                datetime.timezone.utc
+            ),
+            vintage,
+        )
+        for vintage, date in release_dates.items()
+    )
+
+
+# WHEN A RELEASE PAST THE END OF THE SCHEDULE COULD GO UP AT THE EARLIEST
+def guessed_release_time(vintage):
+    """
+    Purpose is to return the first Tuesday of the vintage's month at the usual
+    release time. No release on the schedule has come out before it
+    """
+    tuesday = release_schedule.guessed_release_date(vintage)
+
+    return datetime.datetime.combine(tuesday, RELEASE_TIME, tzinfo=RELEASE_TIMEZONE).astimezone(
+        datetime.timezone.utc
+    )
+
+
+# EVERY MONTH AFTER THE SCHEDULE, WITH A GUESS AT WHEN ITS RELEASE GOES UP
+def guessed_release_times(after):
+    """
+    Purpose is to yield (guessed release time in utc, vintage month) for every month
+    after the vintage month after, without end
+    """
+    vintage = after
+    while True:
+        vintage = next_month(vintage)
+        yield guessed_release_time(vintage), vintage
+
+
+# THE FIRST OF THE MONTH AFTER A VINTAGE MONTH
+def next_month(vintage):
+    return (pd.Timestamp(vintage) + pd.offsets.MonthBegin(1)).date()
+
+
+# PULLING A TOPIC'S SERIES AS THE API SERVES THEM RIGHT NOW
+def fetch_topic(topic, series_list, vintage, key, accept=None):
+    """
+    Purpose is to pull vintage of a topic with fns.sync_series, which only requests
+    the recent months of series an earlier refresh already pulled. accept is handed
+    to sync_series, so a pull it turns down is not remembered
+    """
+    os.makedirs(SYNC_FOLDER, exist_ok=True)
+
+    return fns.sync_series(
+        series_list=series_list,
+        start_date=FETCH_START,
+        save_folder=SYNC_FOLDER,
+        file_name=topic,
+        key=key,
+        state_path=f"{SYNC_FOLDER}/sync_state.json",
+        accept=accept,
+        vintage=datetime.date(vintage.year, vintage.month, 1),
+    )
+
+
+# TELLING A NEW RELEASE APART FROM THE API STILL SERVING THE LAST ONE
+def is_new_release(df, topic, store_path=master_store.STORE_PATH):
+    """
+    Purpose is to compare what the API served with the newest vintage of the topic
+    in the store. The API does not say which release it serves, but every release
+    revises the forecasts, so the same numbers mean the old release is still up
+    """
+    vintages = master_store.list_vintages(topic, store_path=store_path)
+    if not vintages or df.empty:
+        return not df.empty
+
+    old = master_store.read_topic(
+        topic,
+        columns=["seriesId", "period", "value"],
+        forecast_periods=vintages[-1:],
+        store_path=store_path,
+    )
+    key = ["seriesId", "period"]
+    old = old.assign(seriesId=old["seriesId"].astype(str))
+    new = df.assign(seriesId=df["seriesId"].astype(str), period=pd.to_datetime(df["period"]))
+
+    # a forecast reaching further out is new no matter what the overlap says
+    if new["period"].max() > old["period"].max():
+        return True
+
+    both = old[key + ["value"]].merge(new[key + ["value"]], on=key, suffixes=("_old", "_new"))
+    if both.empty:
+        return True
+
+    # the store keeps float32, so values only have to match that closely
+    return not np.allclose(
+        both["value_old"].to_numpy(float),
+        both["value_new"].to_numpy(float),
+        rtol=1e-6,
+        equal_nan=True,
+    )
+
+
+# AN API THAT PUTS A RELEASE OUT A WHILE AFTER IT IS DUE, FOR DRY RUNS
+class FakeApi:
+    """
+    Purpose is to stand in for fetch_topic offline. Until lag has passed since a
+    release was due it serves the newest vintage in the store, after that the same
+    numbers nudged up a little, which is what a new release looks like to us
+    """
+
+    def __init__(self, clock, store_path=master_store.STORE_PATH, lag=datetime.timedelta(hours=1)):
+        self.clock = clock
+        self.store_path = store_path
+        self.lag = lag
+        self.due = {vintage: released_at for released_at, vintage in release_times()}
+
+    def __call__(self, topic, series_list, vintage, key, accept=None):
+        vintages = master_store.list_vintages(topic, store_path=self.store_path)
+        df = master_store.read_topic(
+            topic, series=series_list, forecast_periods=vintages[-1:], store_path=self.store_path
+        ).drop(columns="topic")
+
+        # months past the schedule come out a few days after our first guess
+        due = self.due.get(vintage) or guessed_release_time(vintage) + datetime.timedelta(days=6)
+        if self.clock.now() >= due + self.lag:
+            df["value"] = df["value"].astype(float) * 1.01
+
+        df["forecast_period"] = pd.Timestamp(vintage)
+
+        if accept is not None and not accept(df):
+            return None
+
+        return df
+
+
+# SLEEPING UNTIL EACH RELEASE AND INGESTING IT ONCE IT IS ON THE API
+class RefreshScheduler:
+    """
+    Purpose is to run the refresh loop. clock and fetch are swapped out for dry runs,
+    and dry_run leaves the store, the outputs and the dashboards alone
+    """
+
+    def __init__(
+        self,
+        key=None,
+        store_path=master_store.STORE_PATH,
+        clock=None,
+        fetch=fetch_topic,
+        dry_run=False,
+        retry_delay=RETRY_DELAY,
+        max_retry_delay=MAX_RETRY_DELAY,
+        give_up_after=GIVE_UP_AFTER,
+        seed=None,
+        sinks=(),
+    ):
+        self.key = key
+        self.store_path = store_path
+        self.clock = clock or SystemClock()
+        self.fetch = fetch
+        self.dry_run = dry_run
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.give_up_after = give_up_after
+        self.rng = random.Random(seed)
+        self.sinks = sinks
+
+        # parsing the schedule once, it does not change while we run
+        self.releases = release_times()
+
+    def run(self, max_releases=None, until=None):
+        """
+        waits for and ingests every release from now on (or the next max_releases of
+        them, or the ones due by until), guessing at release dates once the schedule
+        runs out. Returns the vintages that were ingested
+        """
+        last_scheduled = self.releases[-1][1]
+        warned = False
+
+        ingested = []
+        for released_at, vintage in self.pending():
+            if until is not None and released_at > until:
+                return ingested
+
+            guessed = vintage > last_scheduled
+            if guessed and not warned:
+                print("release_schedule.py has run out of dates, please add the upcoming releases")
+                warned = True
+
+            self.wait_until(released_at, vintage)
+
+            give_up_after = GUESSED_GIVE_UP_AFTER if guessed else self.give_up_after
+            if self.refresh(vintage, released_at, give_up_after):
+                ingested.append(vintage)
+
+            if max_releases is not None and len(ingested) >= max_releases:
+                return ingested
+
+    def timeline(self):
+        # the releases on the schedule, then a guess for every month after them
+        yield from self.releases
+        yield from guessed_release_times(self.releases[-1][1])
+
+    def pending(self):
+        """
+        yields the releases still to come, starting with the latest one that is out if
+        the store does not have it yet (the API only serves the newest release, so
+        older ones can not be caught up on here)
+        """
+        now = self.clock.now()
+        latest = None
+        for released_at, vintage in self.timeline():
+            if released_at <= now:
+                latest = (released_at, vintage)
+                continue
+
+            if latest is not None and not self.have_vintage(latest[1]):
+                yield latest
+            latest = None
+
+            yield released_at, vintage
+
+    def have_vintage(self, vintage):
+        vintage = pd.Timestamp(vintage)
+
+        return any(
+            vintage in master_store.list_vintages(topic, store_path=self.store_path)
+            for topic in pull_data.topic_series(self.store_path)
+        )
+
+    def wait_until(self, when, vintage):
+        remaining = (when - self.clock.now()).total_seconds()
+        if remaining > 0:
+            print(f"{vintage:%Y-%m}: due {when:%Y-%m-%d %H:%M} utc, {remaining / 3600:,.1f}h away")
+
+        # napping in pieces, each one checks the clock again
+        while remaining > 0:
+            self.clock.sleep(min(remaining, MAX_NAP))
+            remaining = (when - self.clock.now()).total_seconds()
+
+    def retry_wait(self, attempt):
+        """
+        seconds to wait before retry number attempt, doubling every time, with half of
+        it random so several machines do not hit the API in step
+        """
+        delay = min(self.max_retry_delay, self.retry_delay * 2**attempt)
+
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def refresh(self, vintage, released_at, give_up_after=None):
+        """
+        tries to ingest vintage until the API serves it, or gives up give_up_after
+        later. Returns whether it was ingested
+        """
+        give_up_after = give_up_after or self.give_up_after
+        deadline = max(released_at, self.clock.now()) + give_up_after
+
+        attempt = 0
+        while True:
+            try:
+                frames = self.pull(vintage)
+            except Exception as e:
+                # the API being down is retried the same way as the release being late
+                print(f"{vintage:%Y-%m}: pulling failed, {e}")
+                frames = None
+
+            if frames is not None:
+                self.ingest(vintage, frames)
+                return True
+
+            if self.clock.now() >= deadline:
+                print(f"{vintage:%Y-%m}: not on the API after {attempt + 1} tries, skipping it")
+                return False
+
+            delay = self.retry_wait(attempt)
+            attempt += 1
+            print(f"{vintage:%Y-%m}: not on the API yet, trying again in {delay / 60:.0f} min")
+            self.clock.sleep(delay)
+
+    def pull(self, vintage):
+        """
+        returns {topic: dataframe} of vintage, or None while the API still serves the
+        release before it
+        """
+        frames = {}
+        for topic, series_list in pull_data.topic_series(self.store_path).items():
+            # one topic is enough to tell, so a late release costs one topic's requests
+            accept = None
+            if len(frames) == 0:
+                accept = lambda df, topic=topic: is_new_release(df, topic, self.store_path)
+
+            frames[topic] = self.fetch(topic, series_list, vintage, self.key, accept=accept)
+            if frames[topic] is None:
+                return None
+
+        return frames
+
+    def ingest(self, vintage, frames):
+        """
+        writes every topic's new vintage into the store, rebuilds what is derived
+        from them and signals the dashboards, the same steps as the backfill
+        """
+        rows = sum(len(df) for df in frames.values())
+
+        if self.dry_run:
+            print(
+                f"{vintage:%Y-%m}: would write {rows:,} rows across {len(frames)} topic(s), "
+                f"rebuild them, render the visuals and signal the dashboards"
+            )
+            return
+
+        with instrumentation.record_run(f"refresh {vintage:%Y-%m}", sinks=self.sinks) as metrics:
+            for topic, df in frames.items():
+                with metrics.stage("write_store"):
+                    master_store.write_topic(df, topic, store_path=self.store_path)
+                metrics.count("rows", len(df))
+
+            for topic in frames:
+                with metrics.stage("rebuild_derived"):
+                    fns.rebuild_derived(topic, store_path=self.store_path)
+
+            with metrics.stage("render_visuals"):
+                render_visuals.render_all(
+                    store_path=self.store_path, api_key=self.key, metrics=metrics
+                )
+
+        snapshots.signal_reload(vintage, frames)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="refresh the store every STEO release")
+    parser.add_argument("--key-file", help="txt file holding the EIA API key")
+    parser.add_argument("--key-line", type=int, default=0)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="fake clock and API, nothing is written"
+    )
+    parser.add_argument("--start", help="date the dry run's clock starts at, defaults to now")
+    parser.add_argument("--max-releases", type=int, default=None)
+    parser.add_argument(
+        "--guessed-months",
+        type=int,
+        default=2,
+        help="months past the schedule a dry run goes through, unless --max-releases",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seeds the retry jitter")
+    parser.add_argument("--metrics-jsonl", help="append every refresh's metrics here")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        start = datetime.datetime.now(datetime.timezone.utc)
+        if args.start:
+            start = datetime.datetime.fromisoformat(args.start)
+            start = start.replace(tzinfo=datetime.timezone.utc)
+
+        clock = FakeClock(start)
+        scheduler = RefreshScheduler(
+            clock=clock, fetch=FakeApi(clock), dry_run=True, seed=args.seed
+        )
+        # the real loop never ends, the dry run stops a few guessed months past the schedule
+        until = None
+        if args.max_releases is None:
+            until = max(scheduler.releases[-1][0], clock.now())
+            until += datetime.timedelta(days=31 * args.guessed_months)
+
+        ingested = scheduler.run(max_releases=args.max_releases, until=until)
+        print(
+            f"dry run: {len(ingested)} release(s) ingested, {clock.slept / 86400:,.1f} days "
+            f"of waiting skipped, clock ended at {clock.now():%Y-%m-%d %H:%M} utc"
+        )
+
+    else:
+        if not args.key_file:
+            parser.error("--key-file is needed unless it is a --dry-run")
+
+        key = fns.get_api_key(args.key_file, args.key_line).strip()
+
+        sinks = [instrumentation.LogSink()]
+        if args.metrics_jsonl:
+            sinks.append(instrumentation.JsonLinesSink(args.metrics_jsonl))
+
+        RefreshScheduler(key=key, seed=args.seed, sinks=sinks).run(max_releases=args.max_releases)
@@ -1,5 +1,7 @@
 # purpose of this file is to store the release schedule for the STEO outlooks
 
+import datetime
+
 # storing release schedule as a dictionary
 
 releases = {
@@ -29,4 +31,63 @@ releases = {
     'December 2025': '12/09/2025',    
 }
 
-print(releases.info())
+# parsing the release schedule into dates once, keyed by the vintage month each release covers
+release_dates = {
+    datetime.datetime.strptime(month, '%B %Y').date(): datetime.datetime.strptime(date, '%m/%d/%Y').date()
+    for month, date in releases.items()
+}
+
+
+# WHEN A RELEASE PAST THE END OF THE SCHEDULE COULD COME OUT AT THE EARLIEST
+def guessed_release_date(vintage):
+    """
+    Purpose is to return the first Tuesday of the vintage's month. No release on
+    the schedule has come out before it
+    """
+    first = datetime.date(vintage.year, vintage.month, 1)
+
+    return first + datetime.timedelta(days=(1 - first.weekday()) % 7)
+
+
+# THE DAY A VINTAGE COMES OUT, FROM THE SCHEDULE OR GUESSED ONCE IT RUNS OUT
+def release_date(vintage):
+    return release_dates.get(vintage) or guessed_release_date(vintage)
+
+
+# GRABBING THE MOST RECENT STEO VINTAGE THAT HAS BEEN RELEASED
+def current_vintage(today=None, guess=False):
+    """
+    Purpose is to return the vintage month (first of the month) of the most recent
+    STEO release on or before today, or None if nothing in the schedule has come out yet.
+    With guess, months past the end of the schedule count as released from their
+    guessed_release_date on, so the answer keeps moving after the schedule runs out
+    """
+    today = today or datetime.date.today()
+
+    released = [vintage for vintage, date in release_dates.items() if date <= today]
+    if not released:
+        return None
+
+    vintage = max(released)
+    if guess and vintage == max(release_dates):
+        # stepping a month at a time past the last scheduled release
+        while True:
+            following = (vintage.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+            if guessed_release_date(following) > today:
+                break
+            vintage = following
+
+    return vintage
+
+
+# GRABBING THE NEXT STEO RELEASE THAT HAS NOT COME OUT YET
+def next_release(today=None):
+    """
+    Purpose is to return (vintage month, release date) of the next upcoming release,
+    or None if the schedule has run out and needs updating
+    """
+    today = today or datetime.date.today()
+
+    upcoming = [(vintage, date) for vintage, date in release_dates.items() if date > today]
+
+    return min(upcoming) if upcoming else None
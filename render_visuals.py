@@ -0,0 +1,337 @@
+"""
+The purpose of this file is to render our popular visuals ahead of time, after each
+release is ingested, instead of every time someone opens them.
+Every visual in VISUALS is boiled down to a compact json payload (the latest vintage,
+and the one before it, as one list of values per series) that the D3 pages load,
+and drawn to static svg/png files. The drawing runs in parallel, and a visual whose
+payload has not changed since the last render is skipped
+"""
+
+# we will need to access files from our system
+import glob
+import hashlib
+import json
+import os
+
+# drawing the figures across several processes
+from concurrent.futures import ProcessPoolExecutor
+
+# importing packages that will allow us to transform our data
+import pandas as pd
+
+# importing our functions python script
+import functions as fns
+
+# topic visuals are read straight from the store
+import master_store
+
+# timers and counters that tell us where a slow refresh spends its time
+import instrumentation
+
+
+# where pop_visual saves the data of each visual
+VISUALS_PATH = "output/popular_visuals"
+
+# where the payloads, figures and manifest are written
+RENDERS_PATH = "output/popular_visuals/rendered"
+
+# bumped whenever the payload or the drawing changes, so everything renders again
+RENDER_VERSION = 1
+
+# how far back the csv visuals are pulled, whatever part of it they show
+FETCH_START = "2000-01"
+
+# decimals kept in the payloads, STEO values do not carry more than this
+DECIMALS = 4
+
+# what every visual is drawn from:
+# - series: the seriesIds it shows (None is every series in the data)
+# - file: the pop_visual figure_name whose csv files hold the data, defaults to name
+# - topic: read the data from the master store instead of a csv
+# - kind: "line" or "stackedarea"
+# - start: the first period shown
+VISUALS = [
+    {
+        "name": "power_sector_gen_cap",
+        "title": "U.S. Electric Power Sector Generating Capacity",
+        "series": [
+            "BAEPCGW_US",
+            "CLEPCGW_US",
+            "GEEPCGW_US",
+            "HPEPCGW_US",
+            "HVEPCGW_US",
+            "NGEPCGW_US",
+            "NUEPCGW_US",
+            "OGEPCGW_US",
+            "OTEPCGW_US",
+            "OWEPCGW_US",
+            "PAEPCGW_US",
+            "SOEPCGWX_US",
+            "SPEPCGWX_US",
+            "STEPCGW_US",
+            "WNEPCGW_US",
+            "WWEPCGW_US",
+        ],
+        "kind": "stackedarea",
+        "start": "2019-01",
+    },
+    {
+        "name": "power_sector_gen_cap_notable",
+        "file": "power_sector_gen_cap",
+        "title": "Generating Capacity With The Most Notable Changes",
+        "series": ["BAEPCGW_US", "NGEPCGW_US", "SPEPCGWX_US", "WNEPCGW_US", "CLEPCGW_US"],
+        "kind": "line",
+        "start": "2019-01",
+    },
+    {
+        "name": "world_data_1",
+        "title": "World Liquid Fuels Production and Consumption",
+        "series": ["PAPR_WORLD", "PATC_WORLD"],
+        "kind": "line",
+        "start": "2000-01",
+    },
+    {
+        "name": "solar",
+        "topic": "solar",
+        "title": "Utility-Scale Solar Generation by Region",
+        "series": None,
+        "kind": "line",
+        "start": "2015-01",
+    },
+]
+
+
+# LOADING THE LONG DATA A VISUAL IS DRAWN FROM
+def load_visual_data(visual, visuals_path=VISUALS_PATH, store_path=master_store.STORE_PATH):
+    """
+    Purpose is to return the visual's data in the usual long format, or None when
+    nothing has been pulled for it yet. csv visuals use the newest vintage file
+    """
+    if visual.get("topic") is not None:
+        return master_store.read_topic(
+            visual["topic"],
+            columns=["period", "seriesId", "seriesDescription", "value", "unit", "forecast_period"],
+            series=visual.get("series"),
+            start=visual.get("start"),
+            store_path=store_path,
+        )
+
+    # pop_visual names its files {figure_name}_{YYYY_MM}.csv, so the newest sorts last
+    name = visual.get("file", visual["name"])
+    pattern = f"{name}_[0-9][0-9][0-9][0-9]_[0-9][0-9].csv"
+    paths = sorted(glob.glob(os.path.join(visuals_path, pattern)))
+    if not paths:
+        return None
+
+    df = pd.read_csv(paths[-1], parse_dates=["period", "forecast_period"])
+    if visual.get("series") is not None:
+        df = df[df["seriesId"].isin(visual["series"])]
+    if visual.get("start") is not None:
+        df = df[df["period"] >= pd.Timestamp(visual["start"])]
+
+    return df
+
+
+# BOILING A VISUAL'S DATA DOWN TO WHAT THE FIGURE ACTUALLY SHOWS
+def build_payload(visual, df):
+    """
+    Purpose is to turn the long data into {periods, series: [{id, label, values}]}
+    for the latest vintage, with the previous vintage's values next to them when the
+    data has one. Everything is lined up on the same periods so D3 just zips lists
+    """
+    df = df.assign(
+        period=pd.to_datetime(df["period"]),
+        forecast_period=pd.to_datetime(df["forecast_period"]),
+        seriesId=df["seriesId"].astype(str),
+    )
+
+    vintages = sorted(df["forecast_period"].unique())
+    latest = vintages[-1]
+    previous = vintages[-2] if len(vintages) > 1 else None
+    df = df[df["forecast_period"].isin(vintages[-2:])]
+
+    # one column per (vintage, series), one row per period, in a single pivot
+    wide = df.pivot_table(
+        index="period", columns=["forecast_period", "seriesId"], values="value", aggfunc="last"
+    ).round(DECIMALS)
+
+    # keeping the configured order of the series, the rest sorted by id
+    order = visual.get("series") or []
+    in_data = set(df.loc[df["forecast_period"] == latest, "seriesId"])
+    series_ids = [s for s in order if s in in_data] + sorted(in_data - set(order))
+
+    labels = df.drop_duplicates("seriesId", keep="last").set_index("seriesId")
+    labels = labels["seriesDescription"]
+    units = df["unit"].dropna().astype(str).unique()
+
+    def column(vintage, series_id):
+        if (vintage, series_id) not in wide.columns:
+            return None
+        values = wide[(vintage, series_id)]
+        return [None if pd.isna(v) else float(v) for v in values]
+
+    series = []
+    for series_id in series_ids:
+        entry = {"id": series_id, "label": str(labels[series_id])}
+        entry["values"] = column(latest, series_id)
+
+        before = column(previous, series_id)
+        if before is not None:
+            entry["previous"] = before
+
+        series.append(entry)
+
+    return {
+        "name": visual["name"],
+        "title": visual["title"],
+        "kind": visual.get("kind", "line"),
+        "unit": ", ".join(units) if len(units) else None,
+        "vintage": pd.Timestamp(latest).date().isoformat(),
+        "previous_vintage": (
+            None if previous is None else pd.Timestamp(previous).date().isoformat()
+        ),
+        "periods": [p.date().isoformat() for p in wide.index],
+        "series": series,
+    }
+
+
+# THE SERIES EVERY CSV HAS TO HOLD FOR THE VISUALS DRAWN FROM IT
+def csv_series(visuals):
+    files = {}
+    for visual in visuals:
+        if visual.get("topic") is None:
+            series_list = files.setdefault(visual.get("file", visual["name"]), [])
+            series_list.extend(s for s in visual["series"] if s not in series_list)
+
+    return files
+
+
+# HASHING EVERYTHING A RENDER DEPENDS ON
+def payload_hash(payload):
+    content = json.dumps({"version": RENDER_VERSION, "payload": payload}, sort_keys=True)
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+# WRITING A FILE ALL AT ONCE SO A PAGE NEVER LOADS HALF OF IT
+def write_json(obj, path, **kwargs):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f, **kwargs)
+    os.replace(tmp_path, path)
+
+
+# RENDERING EVERY CONFIGURED VISUAL WHOSE DATA CHANGED
+def render_all(
+    visuals=VISUALS,
+    renders_path=RENDERS_PATH,
+    visuals_path=VISUALS_PATH,
+    store_path=master_store.STORE_PATH,
+    api_key=None,
+    formats=("svg", "png"),
+    max_workers=None,
+    force=False,
+    metrics=None,
+):
+    """
+    Purpose is to write {name}.json and the static figures of every visual, plus a
+    manifest.json listing them with their content hash. With api_key the csv visuals
+    first pull whatever vintage has been released since (pop_visual incremental).
+    Visuals whose hash is already in the manifest are skipped unless force.
+    Returns the names that were rendered
+    """
+    metrics = metrics or instrumentation.NO_METRICS
+    os.makedirs(renders_path, exist_ok=True)
+
+    manifest_path = os.path.join(renders_path, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    # several visuals can share one csv, so every file is pulled once with all their series
+    if api_key is not None:
+        for name, series_list in csv_series(visuals).items():
+            with metrics.stage("fetch"):
+                fns.pop_visual(
+                    series_list=series_list,
+                    start_date=FETCH_START,
+                    api_key=api_key,
+                    figure_name=name,
+                    incremental=True,
+                    metrics=metrics,
+                )
+
+    todo = []
+    for visual in visuals:
+        with metrics.stage("load"):
+            df = load_visual_data(visual, visuals_path=visuals_path, store_path=store_path)
+        if df is None or df.empty:
+            print(f"{visual['name']}: no data yet, skipping")
+            continue
+
+        with metrics.stage("aggregate"):
+            payload = build_payload(visual, df)
+        content_hash = payload_hash(payload)
+
+        base_path = os.path.join(renders_path, visual["name"])
+        files = [f"{visual['name']}.json"] + [f"{visual['name']}.{e}" for e in formats]
+        up_to_date = manifest.get(visual["name"], {}).get("hash") == content_hash and all(
+            os.path.exists(os.path.join(renders_path, f)) for f in files
+        )
+        if up_to_date and not force:
+            metrics.count("visuals_skipped")
+            continue
+
+        # the payload is small, so it is written here and only the drawing is farmed out
+        write_json(payload, f"{base_path}.json", separators=(",", ":"))
+        todo.append((visual["name"], payload, base_path, content_hash, files))
+
+    # matplotlib is not thread safe, so every figure is drawn in its own process
+    with metrics.stage("render"):
+        if len(todo) > 1 and max_workers != 1:
+            workers = min(len(todo), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(fns.save_static_figure, payload, base_path, formats)
+                    for _, payload, base_path, _, _ in todo
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for _, payload, base_path, _, _ in todo:
+                fns.save_static_figure(payload, base_path, formats)
+
+    for name, payload, _, content_hash, files in todo:
+        manifest[name] = {
+            "hash": content_hash,
+            "title": payload["title"],
+            "vintage": payload["vintage"],
+            "files": files,
+        }
+        metrics.count("visuals_rendered")
+        print(f"{name}: rendered {', '.join(files)}")
+
+    write_json(manifest, manifest_path, indent=2, sort_keys=True)
+
+    return [name for name, *_ in todo]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="render the popular visuals")
+    parser.add_argument(
+        "--key-file", help="txt file holding the EIA API key, pulls new vintages first"
+    )
+    parser.add_argument("--key-line", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="render even if nothing changed")
+    args = parser.parse_args()
+
+    key = None
+    if args.key_file:
+        key = fns.get_api_key(args.key_file, args.key_line).strip()
+
+    with instrumentation.record_run("render", sinks=[instrumentation.LogSink()]) as metrics:
+        render_all(api_key=key, max_workers=args.workers, force=args.force, metrics=metrics)
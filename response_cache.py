@@ -0,0 +1,227 @@
+"""
+The purpose of this file is to keep a copy of EIA API responses on disk so that
+re-running a notebook cell or restarting a dashboard does not repeat identical requests
+"""
+
+# sqlite gives us a single cache file that many threads can safely share
+import sqlite3
+import threading
+import time
+import datetime
+import hashlib
+import logging
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# release dates tell us when every cached response has gone stale
+import release_schedule
+
+
+# warns once when the release schedule has run out and vintages are being guessed
+logger = logging.getLogger(__name__)
+
+# where the cache lives unless told otherwise
+DEFAULT_CACHE_PATH = "output/.steo_response_cache.sqlite"
+
+
+# TURNING A REQUEST URL INTO A CACHE KEY
+def normalize_query(url):
+    """
+    Purpose is to make the same request always map to the same key: the api key is
+    stripped out (so it never lands on disk) and the query params are sorted
+    """
+    parts = urlsplit(url)
+
+    params = [(k, v) for k, v in parse_qsl(parts.query) if k != "api_key"]
+    query = urlencode(sorted(params))
+
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+
+
+# A SIZE BOUNDED, EXPIRING CACHE OF RAW RESPONSE BODIES
+class ResponseCache:
+    """
+    Purpose is to store raw response bodies keyed on the normalized query.
+    Entries expire after ttl seconds, or as soon as a new STEO release comes out,
+    and the least recently used entries are dropped once we go over max_bytes.
+    The API can keep serving the old release for a while after the scheduled date,
+    so a body is only tagged with the new release once it differs from the old one,
+    and nothing new is cached in the first release_days days of a release
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl=7 * 24 * 3600,
+        max_bytes=256 * 1024**2,
+        release_days=1,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.release_days = release_days
+
+        # counters so we can see how much the cache is saving us
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.warned_schedule = False
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                vintage TEXT,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self.conn.commit()
+
+    def _key(self, url):
+        query = normalize_query(url)
+        return hashlib.sha256(query.encode()).hexdigest(), query
+
+    def _current_vintage(self, today):
+        # the release that should be up by now, guessed once the schedule runs out
+        vintage = release_schedule.current_vintage(today, guess=True)
+
+        if release_schedule.next_release(today) is None and not self.warned_schedule:
+            logger.warning(
+                "release_schedule.py has run out of dates, guessing %s is the current "
+                "release, please add the upcoming releases",
+                vintage,
+            )
+            self.warned_schedule = True
+
+        return vintage
+
+    def _vintage(self):
+        vintage = self._current_vintage(datetime.date.today())
+        return vintage.isoformat() if vintage else None
+
+    def _just_released(self):
+        # in the first days of a release we cannot tell which one the API is serving
+        today = datetime.date.today()
+        vintage = self._current_vintage(today)
+        if vintage is None:
+            return False
+
+        released = release_schedule.release_date(vintage)
+        return (today - released).days < self.release_days
+
+    def get(self, url):
+        """
+        returns the cached body for url, or None if we do not have a fresh copy
+        """
+        key, _ = self._key(url)
+        now = time.time()
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, vintage, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            # an expired entry is as good as no entry, so we drop it on the way out
+            if row is not None and now - row[2] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.conn.commit()
+                row = None
+
+            # an entry from an older release is a miss too, but put compares against it
+            if row is not None and row[1] != self._vintage():
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self.conn.commit()
+
+            self.hits += 1
+            self.bytes_saved += len(row[0])
+
+            return row[0]
+
+    def put(self, url, body):
+        """
+        stores a response body for url and evicts old entries if we are over budget.
+        The body is tagged with the release it came from: the current one if it
+        changed since the last release, the old one if the API has not moved on yet
+        """
+        key, query = self._key(url)
+        now = time.time()
+        vintage = self._vintage()
+
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, vintage FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and row[1] != vintage:
+                # every release revises the forecasts, so the same bytes are the old release
+                if bytes(row[0]) == bytes(body):
+                    vintage = row[1]
+            elif row is None and self._just_released():
+                # nothing to compare with, so we wait until the new release is surely up
+                return
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, body, len(body), vintage, now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # dropping least recently used entries until we are back under max_bytes
+        total = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def stats(self):
+        """
+        returns the hit/miss counters along with how big the cache currently is
+        """
+        with self.lock:
+            entries, size = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "entries": entries,
+            "size_bytes": size,
+        }
@@ -0,0 +1,111 @@
+"""
+The purpose of this file is to track how STEO forecasts change between releases.
+For every series and target period we compare each forecast vintage with the one
+before it and with the first vintage we have
+"""
+
+# we will need to access files from our system
+import os
+
+# importing packages that will allow us to transform our data
+import numpy as np
+import pandas as pd
+
+# the revisions are built from the master data in the store
+import master_store
+
+
+# where the revision tables live unless told otherwise
+REVISIONS_PATH = "master_output/revisions"
+
+
+# COMPUTING VINTAGE OVER VINTAGE CHANGES FOR EVERY SERIES AND TARGET PERIOD
+def compute_revisions(df):
+    """
+    Purpose is to take a long master dataframe (period, seriesId, value, forecast_period)
+    and return one row per (seriesId, period, forecast_period) with the change vs the
+    previous vintage (mom_*) and vs the first vintage (vs_first_*), absolute and percent.
+    Everything is done with grouped shifts, no pivots or per-vintage loops
+    """
+    rev = df[["seriesId", "period", "forecast_period", "value"]].copy()
+    rev["period"] = pd.to_datetime(rev["period"], format="mixed")
+    rev["forecast_period"] = pd.to_datetime(rev["forecast_period"], format="mixed")
+
+    # within a target period the vintages have to be in release order for the shifts to work
+    rev = rev.sort_values(["seriesId", "period", "forecast_period"], kind="stable")
+    rev = rev.reset_index(drop=True)
+
+    grouped = rev.groupby(["seriesId", "period"], sort=False, observed=True)
+
+    # the vintage right before this one, and the very first one we have
+    rev["prev_forecast_period"] = grouped["forecast_period"].shift(1)
+    prev_value = grouped["value"].shift(1)
+    rev["first_forecast_period"] = grouped["forecast_period"].transform("first")
+    first_value = grouped["value"].transform("first")
+
+    rev["mom_change"] = rev["value"] - prev_value
+    rev["vs_first_change"] = rev["value"] - first_value
+
+    # percent changes are left empty when the base is zero
+    rev["mom_pct"] = rev["mom_change"] / prev_value.abs().replace(0, np.nan) * 100
+    rev["vs_first_pct"] = (
+        rev["vs_first_change"] / first_value.abs().replace(0, np.nan) * 100
+    )
+
+    return rev
+
+
+# COMPUTING AND SAVING A TOPIC'S REVISIONS ONCE PER INGEST
+def materialize_revisions(
+    topic, store_path=master_store.STORE_PATH, revisions_path=REVISIONS_PATH
+):
+    """
+    Purpose is to compute a topic's revisions from the store and save them, so the
+    dashboard can just read them instead of pivoting on every callback
+    """
+    df = master_store.read_topic(
+        topic,
+        columns=["seriesId", "period", "forecast_period", "value"],
+        store_path=store_path,
+    )
+
+    rev = compute_revisions(df)
+
+    # same compact types the store uses
+    rev["seriesId"] = rev["seriesId"].astype("category")
+    float_cols = ["value", "mom_change", "vs_first_change", "mom_pct", "vs_first_pct"]
+    rev[float_cols] = rev[float_cols].astype("float32")
+
+    os.makedirs(revisions_path, exist_ok=True)
+    rev.to_parquet(os.path.join(revisions_path, f"{topic}.parquet"), index=False)
+
+    return rev
+
+
+# READING A TOPIC'S SAVED REVISIONS
+def read_revisions(
+    topic, series=None, start=None, end=None, columns=None, revisions_path=REVISIONS_PATH
+):
+    """
+    Purpose is to load saved revisions, only the series and periods asked for
+    """
+    filters = []
+    if series is not None:
+        filters.append(("seriesId", "in", list(series)))
+    if start is not None:
+        filters.append(("period", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("period", "<=", pd.Timestamp(end)))
+
+    return pd.read_parquet(
+        os.path.join(revisions_path, f"{topic}.parquet"),
+        columns=columns,
+        filters=filters or None,
+    )
+
+
+if __name__ == "__main__":
+    # rebuilding the revisions for every topic in the store
+    for topic in master_store.list_topics():
+        rev = materialize_revisions(topic)
+        print(f"{topic}: {len(rev)} revision rows")
@@ -0,0 +1,406 @@
+"""
+The purpose of this file is to keep a small catalog of every STEO series we know about,
+so we can find series by keyword without loading any observations.
+Each series has its id, description, unit, the topics it is in, and the range of
+vintages and periods we hold for it. The catalog is built from the master store
+(and optionally the EIA facet list of every STEO series) and saved as json
+"""
+
+# we will need to access files from our system and search sorted lists
+import bisect
+import datetime
+import itertools
+import json
+import os
+import re
+
+# the posting lists are kept in one flat array
+import numpy as np
+
+# the catalog is built from the master data in the store
+import master_store
+
+# requests is only needed for the facet list, so it is imported the first time it is used
+from functions.lazy import lazy_import
+
+requests = lazy_import("requests")
+
+
+# where the catalog is saved unless told otherwise
+CATALOG_PATH = "master_output/series_catalog.json"
+
+# every series id the API knows about, with its name
+FACET_URL = "https://api.eia.gov/v2/steo/facet/seriesId/"
+
+# what we split ids, descriptions and units into for searching
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# the range fields each row of the catalog carries
+RANGE_FIELDS = ["first_vintage", "last_vintage", "first_period", "last_period"]
+
+
+# SPLITTING TEXT INTO LOWER CASE SEARCH TOKENS
+def tokenize(text):
+    return TOKEN.findall(str(text).lower()) if text else []
+
+
+# ASKING THE API FOR EVERY STEO SERIES ID AND ITS NAME
+def fetch_facets(api_key, session=None, base_url=FACET_URL):
+    """
+    Purpose is to return {seriesId: name} for every series the STEO route has,
+    including ones we have never pulled into the master data
+    """
+    session = session or requests
+    response = session.get(base_url, params={"api_key": api_key}, timeout=60)
+    response.raise_for_status()
+
+    return {
+        facet["id"]: facet.get("name") for facet in response.json()["response"]["facets"]
+    }
+
+
+# ONE CATALOG ROW PER (SERIES, TOPIC) FROM THE STORE
+def store_rows(topic=None, store_path=master_store.STORE_PATH):
+    """
+    Purpose is to summarize what the store holds for every series of a topic
+    (every topic when topic is None). Only the small columns are read, values never are
+    """
+    df = master_store.read_topic(
+        topic,
+        columns=["seriesId", "seriesDescription", "unit", "topic", "period", "forecast_period"],
+        store_path=store_path,
+    )
+    if df.empty:
+        return []
+
+    # the latest vintage's description and unit win when EIA renamed a series
+    df = df.sort_values("forecast_period", kind="stable")
+    summary = df.groupby(["seriesId", "topic"], observed=True, sort=True).agg(
+        description=("seriesDescription", "last"),
+        unit=("unit", "last"),
+        first_vintage=("forecast_period", "min"),
+        last_vintage=("forecast_period", "max"),
+        n_vintages=("forecast_period", "nunique"),
+        first_period=("period", "min"),
+        last_period=("period", "max"),
+    )
+
+    rows = []
+    for (series_id, row_topic), row in summary.iterrows():
+        rows.append(
+            {
+                "seriesId": str(series_id),
+                "topic": str(row_topic),
+                "description": str(row["description"]),
+                "unit": str(row["unit"]),
+                "n_vintages": int(row["n_vintages"]),
+                **{field: row[field].date().isoformat() for field in RANGE_FIELDS},
+            }
+        )
+
+    return rows
+
+
+# BUILDING THE WHOLE CATALOG AND SAVING IT
+def build_catalog(
+    facets=None, store_path=master_store.STORE_PATH, catalog_path=CATALOG_PATH
+):
+    """
+    Purpose is to rebuild the catalog from the store. facets ({seriesId: name} from
+    fetch_facets) adds the series we have not pulled yet, when it is None the ones
+    already in the saved catalog are kept
+    """
+    rows = store_rows(store_path=store_path)
+
+    if facets is None:
+        facets = {
+            row["seriesId"]: row["description"]
+            for row in read_rows(catalog_path)
+            if row["topic"] is None
+        }
+
+    in_store = {row["seriesId"] for row in rows}
+    for series_id, name in sorted(facets.items()):
+        if series_id not in in_store:
+            rows.append(facet_row(series_id, name))
+
+    save_rows(rows, catalog_path)
+
+    return SeriesCatalog(rows)
+
+
+# REFRESHING ONE TOPIC'S ROWS AFTER IT WAS INGESTED
+def refresh_topic(topic, store_path=master_store.STORE_PATH, catalog_path=CATALOG_PATH):
+    """
+    Purpose is to swap a topic's rows for fresh ones from the store, so an ingest only
+    reads the topic that changed. Builds the whole catalog if there is none yet
+    """
+    if not os.path.exists(catalog_path):
+        return build_catalog(store_path=store_path, catalog_path=catalog_path)
+
+    fresh = store_rows(topic, store_path=store_path)
+    fresh_ids = {row["seriesId"] for row in fresh}
+
+    # the series now in the store no longer need their facet only row
+    rows = [
+        row
+        for row in read_rows(catalog_path)
+        if row["topic"] != topic and not (row["topic"] is None and row["seriesId"] in fresh_ids)
+    ]
+    rows.extend(fresh)
+
+    save_rows(rows, catalog_path)
+
+    return SeriesCatalog(rows)
+
+
+# A ROW FOR A SERIES THE API HAS BUT THE STORE DOES NOT
+def facet_row(series_id, name):
+    return {
+        "seriesId": series_id,
+        "topic": None,
+        "description": name,
+        "unit": None,
+        "n_vintages": 0,
+        **{field: None for field in RANGE_FIELDS},
+    }
+
+
+# READING THE SAVED ROWS, NOTHING IF THERE IS NO CATALOG YET
+def read_rows(catalog_path=CATALOG_PATH):
+    if not os.path.exists(catalog_path):
+        return []
+
+    with open(catalog_path) as f:
+        return json.load(f)["rows"]
+
+
+# SAVING THE ROWS, SWAPPING THE FILE IN SO READERS NEVER SEE HALF OF IT
+def save_rows(rows, catalog_path=CATALOG_PATH):
+    folder = os.path.dirname(catalog_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    catalog = {
+        "built": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": sorted(rows, key=lambda row: (row["seriesId"], row["topic"] or "")),
+    }
+
+    tmp_path = f"{catalog_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(catalog, f, indent=1)
+    os.replace(tmp_path, catalog_path)
+
+
+# catalogs already loaded, keyed by path and remembered with the file's mtime
+_loaded = {}
+
+
+# LOADING THE SAVED CATALOG, BUILDING IT FROM THE STORE THE FIRST TIME
+def load_catalog(catalog_path=CATALOG_PATH, store_path=master_store.STORE_PATH):
+    """
+    Purpose is to return the catalog at catalog_path. It is only read again when the
+    file changed, so this is cheap enough to call in every dashboard callback
+    """
+    if not os.path.exists(catalog_path):
+        build_catalog(store_path=store_path, catalog_path=catalog_path)
+
+    mtime = os.stat(catalog_path).st_mtime_ns
+    cached = _loaded.get(catalog_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    catalog = SeriesCatalog(read_rows(catalog_path))
+    _loaded[catalog_path] = (mtime, catalog)
+
+    return catalog
+
+
+# THE SERIES, AN INVERTED INDEX OF THEIR TOKENS, AND A SORTED TOKEN LIST FOR PREFIXES
+class SeriesCatalog:
+    """
+    Purpose is to look series up by keyword. Every word of a query has to match the
+    start of a token of the series' id, description, unit or topics
+    """
+
+    # how many prefixes we remember the matches of, typing a query asks for every prefix
+    MAX_CACHED_PREFIXES = 4096
+
+    def __init__(self, rows):
+        # merging the (series, topic) rows into one entry per series
+        entries = {}
+        for row in rows:
+            entry = entries.get(row["seriesId"])
+            if entry is None:
+                entry = entries[row["seriesId"]] = {
+                    "seriesId": row["seriesId"],
+                    "description": row["description"],
+                    "unit": row["unit"],
+                    "topics": [],
+                    "n_vintages": 0,
+                    **{field: None for field in RANGE_FIELDS},
+                }
+            if row["topic"] is None:
+                continue
+
+            entry["topics"].append(row["topic"])
+            entry["description"] = row["description"] or entry["description"]
+            entry["unit"] = row["unit"] or entry["unit"]
+            entry["n_vintages"] = max(entry["n_vintages"], row["n_vintages"])
+            for field, pick in [
+                ("first_vintage", min),
+                ("last_vintage", max),
+                ("first_period", min),
+                ("last_period", max),
+            ]:
+                values = [v for v in (entry[field], row[field]) if v is not None]
+                entry[field] = pick(values) if values else None
+
+        # sorted by lower case id, so the ids starting with a query sit next to each other
+        self.entries = sorted(entries.values(), key=lambda entry: entry["seriesId"].lower())
+        self.ids = [entry["seriesId"].lower() for entry in self.entries]
+        self.positions = {entry["seriesId"]: i for i, entry in enumerate(self.entries)}
+
+        # token -> positions of the entries that have it
+        postings = {}
+        by_topic = {}
+        for i, entry in enumerate(self.entries):
+            for token in set(self.entry_tokens(entry)):
+                postings.setdefault(token, []).append(i)
+            for topic in entry["topics"]:
+                by_topic.setdefault(topic, []).append(i)
+
+        # tokens in order, so every token starting with a prefix sits in one slice, and
+        # their postings laid end to end in that same order (offsets[k] is where token k starts)
+        self.tokens = sorted(postings)
+        self.offsets = np.zeros(len(self.tokens) + 1, dtype=np.int64)
+        np.cumsum([len(postings[token]) for token in self.tokens], out=self.offsets[1:])
+        self.postings = np.fromiter(
+            itertools.chain.from_iterable(postings[token] for token in self.tokens),
+            dtype=np.int32,
+            count=int(self.offsets[-1]),
+        )
+
+        # matches are bitsets (bit i set for entry i) in python ints, so the intersections
+        # of a search run in C over whole words
+        self.by_topic = {topic: to_bits(p, len(self.entries)) for topic, p in by_topic.items()}
+        self.all_bits = (1 << len(self.entries)) - 1
+        self._prefix_hits = {}
+
+    @staticmethod
+    def entry_tokens(entry):
+        tokens = tokenize(entry["description"]) + tokenize(entry["unit"])
+        for topic in entry["topics"]:
+            tokens += tokenize(topic)
+
+        # the whole id too, so typing an id straight through keeps matching
+        series_id = entry["seriesId"].lower()
+        return tokens + tokenize(series_id) + [series_id]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, series_id):
+        return series_id in self.positions
+
+    def get(self, series_id):
+        i = self.positions.get(series_id)
+        return None if i is None else self.entries[i]
+
+    def topic_series(self, topic):
+        return [self.entries[i] for i in from_bits(self.by_topic.get(topic, 0))]
+
+    def topic_range(self, topic):
+        """
+        Purpose is to return the (first, last) period any series of topic covers,
+        as iso dates, or (None, None) when the topic is not in the catalog
+        """
+        entries = self.topic_series(topic)
+        if not entries:
+            return None, None
+
+        return (
+            min(entry["first_period"] for entry in entries),
+            max(entry["last_period"] for entry in entries),
+        )
+
+    def prefix_hits(self, prefix):
+        """
+        Purpose is to return the bitset of every entry with a token starting with prefix
+        """
+        hits = self._prefix_hits.get(prefix)
+        if hits is not None:
+            return hits
+
+        # tokens are only a-z and 0-9, so "{" sorts after everything starting with prefix
+        start = bisect.bisect_left(self.tokens, prefix)
+        stop = bisect.bisect_left(self.tokens, prefix + "{", lo=start)
+
+        # the postings of every one of those tokens are one run of the flat array
+        run = self.postings[self.offsets[start] : self.offsets[stop]]
+        hits = to_bits(run, len(self.entries))
+
+        if len(self._prefix_hits) >= self.MAX_CACHED_PREFIXES:
+            self._prefix_hits.clear()
+        self._prefix_hits[prefix] = hits
+
+        return hits
+
+    def search(self, query, topic=None, limit=50):
+        """
+        Purpose is to return up to limit entries matching every word of query, only the
+        ones in topic when it is given. Ids starting with the query come first (an exact
+        id match is always the first of them), then everything else in id order
+        """
+        matches = self.all_bits if topic is None else self.by_topic.get(topic, 0)
+
+        # starting from the rarest word keeps the rest of the intersections cheap
+        for word in sorted(tokenize(query), key=lambda w: self.prefix_hits(w).bit_count()):
+            matches &= self.prefix_hits(word)
+            if not matches:
+                return []
+
+        # the ids starting with the query are one run of positions
+        query_id = str(query).strip().lower()
+        start = bisect.bisect_left(self.ids, query_id)
+        stop = bisect.bisect_left(self.ids, query_id + "\U0010ffff", lo=start)
+        id_run = ((1 << stop) - 1) ^ ((1 << start) - 1) if query_id else 0
+
+        best = from_bits(matches & id_run, limit)
+        best += from_bits(matches & ~id_run, limit - len(best))
+
+        return [self.entries[i] for i in best]
+
+
+# TURNING POSITIONS INTO A BITSET
+def to_bits(positions, size):
+    mask = np.zeros(size, dtype=bool)
+    mask[positions] = True
+
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+# THE POSITIONS OF THE LOWEST limit SET BITS, IN ORDER
+def from_bits(bits, limit=None):
+    positions = []
+    while bits and (limit is None or len(positions) < limit):
+        lowest = bits & -bits
+        positions.append(lowest.bit_length() - 1)
+        bits ^= lowest
+
+    return positions
+
+
+if __name__ == "__main__":
+    import sys
+
+    # rebuilding the catalog from the store. Given the api key file (key on the first
+    # line) the facet list is pulled too, otherwise the facet only series we had are kept
+    facets = None
+    if len(sys.argv) > 1:
+        import functions as fns
+
+        facets = fetch_facets(fns.get_api_key(sys.argv[1], 0).strip())
+
+    catalog = build_catalog(facets=facets)
+    print(f"{len(catalog)} series in {len(catalog.by_topic)} topics saved to {CATALOG_PATH}")
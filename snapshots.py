@@ -0,0 +1,234 @@
+"""
+The purpose of this file is to publish each topic as a read-only Arrow IPC snapshot
+that every dashboard worker memory maps. The operating system's page cache holds one
+copy of the data no matter how many workers there are, and when a new snapshot is
+published the workers swap over to it on their next request
+"""
+
+# we will need to access files from our system
+import os
+import glob
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# arrow ipc files can be memory mapped and read without copying
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# importing packages that will allow us to transform our data
+import pandas as pd
+
+import master_store
+
+
+# where snapshots live unless told otherwise
+SNAPSHOTS_PATH = "master_output/snapshots"
+
+# rewritten by the refresh scheduler every time it ingests a release
+RELOAD_FILE = "reload.json"
+
+
+# THE FILE THAT POINTS AT A TOPIC'S CURRENT SNAPSHOT
+def pointer_path(topic, snapshots_path=SNAPSHOTS_PATH):
+    return os.path.join(snapshots_path, f"{topic}.current.json")
+
+
+def has_snapshot(topic, snapshots_path=SNAPSHOTS_PATH):
+    return os.path.exists(pointer_path(topic, snapshots_path))
+
+
+# WRITING A NEW SNAPSHOT OF A TOPIC AND SWITCHING READERS OVER TO IT
+def publish_snapshot(
+    topic, store_path=master_store.STORE_PATH, snapshots_path=SNAPSHOTS_PATH, keep=2
+):
+    """
+    Purpose is to write a topic from the store into a new arrow ipc file, then point
+    readers at it by atomically replacing the topic's pointer file. Files that readers
+    may still have mapped are kept around (the newest keep of them)
+    """
+    os.makedirs(snapshots_path, exist_ok=True)
+
+    table = master_store.read_topic(topic, store_path=store_path).drop(columns="topic")
+
+    # sorted so each series' rows sit next to each other in the file
+    table = table.sort_values(["seriesId", "forecast_period", "period"], kind="stable")
+    table = pa.Table.from_pandas(table, preserve_index=False)
+
+    # nanosecond timestamps padded to the same width sort in publish order
+    version = f"{time.time_ns():020d}"
+    snapshot_file = os.path.join(snapshots_path, f"{topic}-{version}.arrow")
+
+    # uncompressed so readers can map the columns straight off the page cache
+    tmp_file = f"{snapshot_file}.tmp"
+    with pa.OSFile(tmp_file, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, snapshot_file)
+
+    # swapping the pointer is the moment readers see the new data
+    pointer = pointer_path(topic, snapshots_path)
+    with open(f"{pointer}.tmp", "w") as f:
+        json.dump({"file": os.path.basename(snapshot_file), "version": version}, f)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    # cleaning up old snapshots, oldest first
+    old_files = sorted(glob.glob(os.path.join(snapshots_path, f"{topic}-*.arrow")))
+    for old_file in old_files[:-keep]:
+        os.remove(old_file)
+
+    print(f"published {topic} snapshot {version} ({table.num_rows} rows)")
+
+    return snapshot_file
+
+
+# TELLING RUNNING DASHBOARDS THAT A NEW RELEASE IS IN
+def signal_reload(vintage, topics, snapshots_path=SNAPSHOTS_PATH):
+    """
+    Purpose is to replace the reload file that dashboards check on every request,
+    so they drop whatever they loaded before the release and list the topics again
+    """
+    os.makedirs(snapshots_path, exist_ok=True)
+
+    path = os.path.join(snapshots_path, RELOAD_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"vintage": vintage.isoformat(), "topics": sorted(topics)}, f)
+    os.replace(f"{path}.tmp", path)
+
+    print(f"signaled dashboards to reload for the {vintage:%Y-%m} release")
+
+
+# WHICH RELOAD A DASHBOARD HAS SEEN, NONE IF THERE NEVER WAS ONE
+def reload_version(snapshots_path=SNAPSHOTS_PATH):
+    # a stat is all it takes, so this is cheap enough to call on every request
+    path = os.path.join(snapshots_path, RELOAD_FILE)
+
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+# A TOPIC'S CURRENT SNAPSHOT, MEMORY MAPPED AND SWAPPED WHEN A NEW ONE IS PUBLISHED
+class SharedTopic:
+    """
+    Purpose is to answer the dashboard's queries straight off a memory mapped snapshot.
+    Only the filtered rows are turned into a pandas dataframe, so each worker holds
+    almost nothing of its own. Every call checks the pointer file and swaps to a newly
+    published snapshot if there is one
+    """
+
+    def __init__(self, topic, snapshots_path=SNAPSHOTS_PATH, max_entries=32):
+        self.topic = topic
+        self.snapshots_path = snapshots_path
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.pointer_mtime = None
+        self.version = None
+        self.table = None
+        self.results = OrderedDict()
+        self.result_sizes = {}
+        self.results_bytes = 0
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        opens the current snapshot if the pointer changed since we last looked
+        """
+        pointer = pointer_path(self.topic, self.snapshots_path)
+        mtime = os.stat(pointer).st_mtime_ns
+
+        if mtime == self.pointer_mtime:
+            return
+
+        with self.lock:
+            with open(pointer, "r") as f:
+                current = json.load(f)
+
+            if current["version"] == self.version:
+                self.pointer_mtime = mtime
+                return
+
+            # mapping the file, the table's buffers point straight into the page cache
+            source = pa.memory_map(os.path.join(self.snapshots_path, current["file"]), "r")
+            table = pa.ipc.open_file(source).read_all()
+
+            # swapping everything in one go, old results belonged to the old snapshot
+            self.table = table
+            self.latest_vintage = pc.max(table["forecast_period"])
+            self.series_ids = [str(s) for s in pc.unique(table["seriesId"]).to_pylist()]
+            self.period_min = pc.min(table["period"]).as_py()
+            self.period_max = pc.max(table["period"]).as_py()
+            self.results = OrderedDict()
+            self.result_sizes = {}
+            self.results_bytes = 0
+            self.version = current["version"]
+            self.pointer_mtime = mtime
+
+    def select(self, series, vintage_mode="comparison", start_date=None, end_date=None):
+        """
+        same as SeriesQuery.select, returns the rows for the given series and dates,
+        every vintage ("comparison") or just the most recent one ("no comparison")
+        """
+        self.refresh()
+
+        if isinstance(series, str):
+            series = [series]
+
+        key = (tuple(sorted(series or [])), vintage_mode, str(start_date), str(end_date))
+
+        # callbacks run on several threads, the memo and its byte count move together
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+
+            # taking the snapshot we filter as one piece, a refresh can swap it after
+            table = self.table
+            latest_vintage = self.latest_vintage
+            version = self.version
+
+        mask = pc.is_in(table["seriesId"], value_set=pa.array(list(key[0]), pa.string()))
+        if vintage_mode == "no comparison":
+            mask = pc.and_(mask, pc.equal(table["forecast_period"], latest_vintage))
+        if start_date:
+            start = pa.scalar(pd.Timestamp(start_date), table.schema.field("period").type)
+            mask = pc.and_(mask, pc.greater_equal(table["period"], start))
+        if end_date:
+            end = pa.scalar(pd.Timestamp(end_date), table.schema.field("period").type)
+            mask = pc.and_(mask, pc.less_equal(table["period"], end))
+
+        # only the rows that survive the filter get copied into pandas
+        result = table.filter(mask).to_pandas()
+
+        size = int(result.memory_usage(deep=True).sum())
+
+        with self.lock:
+            # not memoizing a result from a snapshot that was swapped out while we filtered
+            if version != self.version:
+                return result
+
+            # another thread may have filled the same key while we were filtering
+            if key in self.results:
+                self.results_bytes -= self.result_sizes.pop(key, 0)
+            self.results[key] = result
+            self.result_sizes[key] = size
+            self.results_bytes += size
+            if len(self.results) > self.max_entries:
+                old_key, _ = self.results.popitem(last=False)
+                self.results_bytes -= self.result_sizes.pop(old_key, 0)
+
+        return result
+
+    def memory_bytes(self):
+        """
+        what this worker holds privately, the mapped snapshot lives in the page cache.
+        Kept up to date as results are memoized so it is cheap to ask often
+        """
+        return self.results_bytes
+
+
+if __name__ == "__main__":
+    # publishing a fresh snapshot of every topic in the store
+    for topic in master_store.list_topics():
+        publish_snapshot(topic)
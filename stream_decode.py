@@ -0,0 +1,263 @@
+"""
+The purpose of this file is to turn EIA API responses into a dataframe without
+building the whole json tree first. Rows are decoded one at a time, as the bytes
+come in, straight into typed column buffers:
+- period becomes datetime64 (every distinct period string is only parsed once)
+- value becomes float64
+- every other column (seriesId, seriesDescription, unit, ...) becomes a categorical
+"""
+
+import codecs
+import json
+import re
+from array import array
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# how many bytes we read from a response at a time
+CHUNK_SIZE = 64 * 1024
+
+# where the rows start, "data": [ inside of "response"
+DATA_ARRAY = re.compile(r'"data"\s*:\s*\[')
+
+# whitespace and commas between two rows
+ROW_SEPARATOR = re.compile(r"[\s,]*")
+
+
+# TYPED COLUMNS THAT ROWS ARE APPENDED TO, SHARED BY EVERY PAGE OF A REQUEST
+class ColumnBuffers:
+    """
+    Purpose is to hold decoded rows column by column. Strings are stored as int32
+    codes into a list of distinct values and values as float64, so a row costs a
+    few bytes per column instead of a python dict
+    """
+
+    def __init__(self):
+        self.rows = 0
+
+        # columns in the order they first showed up, like pd.DataFrame(list of dicts)
+        self.names = []
+
+        # column name -> array of codes, and column name -> {string: code}
+        self.codes = {}
+        self.lookups = {}
+
+        # value is the only numeric column the STEO endpoint hands back
+        self.values = array("d")
+
+    def add(self, rows):
+        """
+        Purpose is to append a batch of decoded rows. A column we have not seen
+        before gets filled with missing codes for the rows that came before it
+        """
+        # picking up new columns in the order they show up
+        known = set(self.names)
+        if not known.issuperset(set().union(*rows)):
+            for row in rows:
+                for name in row:
+                    if name not in known:
+                        known.add(name)
+                        self.names.append(name)
+
+                        if name != "value":
+                            self.codes[name] = array("i", [-1]) * self.rows
+                            # None (null) is always code -1
+                            self.lookups[name] = {None: -1}
+
+        for name, codes in self.codes.items():
+            lookup = self.lookups[name]
+
+            # every string gets a code the first time we see it, and keeps it after
+            codes.extend(
+                [lookup.setdefault(row.get(name), len(lookup) - 1) for row in rows]
+            )
+
+        # the API sends value as a string, null when there is no number
+        nan = float("nan")
+        self.values.extend(
+            [nan if row.get("value") is None else float(row["value"]) for row in rows]
+        )
+
+        self.rows += len(rows)
+
+    def to_frame(self):
+        """
+        Purpose is to hand the buffers over to pandas as numpy arrays, without
+        another copy of the numeric columns. No rows can be added after this
+        """
+        data = {}
+        for name in self.names:
+            if name == "value":
+                data[name] = np.frombuffer(self.values, dtype=np.float64)
+                continue
+
+            codes = np.frombuffer(self.codes[name], dtype=np.int32)
+            categories = [item for item in self.lookups[name] if item is not None]
+
+            if name == "period":
+                # parsing each distinct period once, then spreading them out by code
+                dates = pd.to_datetime(pd.Series(categories, dtype=object)).to_numpy()
+                period = np.full(self.rows, np.datetime64("NaT"), dtype=dates.dtype)
+                period[codes >= 0] = dates[codes[codes >= 0]]
+                data[name] = period
+            else:
+                data[name] = pd.Categorical.from_codes(codes, categories=categories)
+
+        return pd.DataFrame(data, copy=False)
+
+
+# DECODING ONE RESPONSE PAGE AS ITS BYTES ARRIVE
+class PageDecoder:
+    """
+    Purpose is to decode one page of an API response incrementally. feed() takes
+    chunks of bytes in order, every complete row found so far goes into columns,
+    and close() returns everything in the response except its rows (total, etc.)
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.rows = 0
+
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "head"
+
+        # the text around the rows, put back together in close()
+        self._head = ""
+        self._tail = []
+
+    def feed(self, chunk):
+        self._buffer += self._text.decode(chunk)
+        self._consume()
+
+    def feed_all(self, body):
+        """
+        Purpose is to decode a body we already have (e.g. from the cache) in chunks,
+        so we never hold more than one chunk of it as text
+        """
+        view = memoryview(body)
+        for start in range(0, len(view), CHUNK_SIZE):
+            self.feed(view[start : start + CHUNK_SIZE])
+
+    def _consume(self):
+        if self._state == "head":
+            match = DATA_ARRAY.search(self._buffer)
+            if match is None:
+                return
+
+            # keeping "... "data": [" and starting on the rows right after it
+            self._head = self._buffer[: match.end()]
+            self._buffer = self._buffer[match.end() :]
+            self._state = "rows"
+
+        if self._state == "rows":
+            buffer = self._buffer
+            position = ROW_SEPARATOR.match(buffer).end()
+
+            # the quick way: every complete row in the buffer decoded in one go,
+            # stopping before the ] that closes the data array if it is in there
+            stop = buffer.find("]", position)
+            last = buffer.rfind("}", position, len(buffer) if stop == -1 else stop)
+            rows = None
+            if last > position:
+                try:
+                    rows = json.loads(f"[{buffer[position : last + 1]}]")
+                    position = last + 1
+                except json.JSONDecodeError:
+                    # the last } was inside a string or a row was cut off, going row by row
+                    rows = None
+
+            if rows is None:
+                rows = []
+                while True:
+                    position = ROW_SEPARATOR.match(buffer, position).end()
+                    if position == len(buffer) or buffer[position] == "]":
+                        break
+
+                    # a row cut off at the end of a chunk fails to decode, we wait for the rest of it
+                    try:
+                        row, position = self._decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        break
+
+                    rows.append(row)
+
+            if len(rows) > 0:
+                self.columns.add(rows)
+                self.rows += len(rows)
+
+            position = ROW_SEPARATOR.match(buffer, position).end()
+            if position < len(buffer) and buffer[position] == "]":
+                self._state = "tail"
+
+            self._buffer = buffer[position:]
+
+        if self._state == "tail":
+            self._tail.append(self._buffer)
+            self._buffer = ""
+
+    def close(self):
+        self._buffer += self._text.decode(b"", final=True)
+        self._consume()
+
+        # no data array at all, e.g. an error message, so there are no rows to keep apart
+        if self._state == "head":
+            return json.loads(self._buffer)
+
+        if self._state != "tail":
+            raise ValueError("response ended before its data array did")
+
+        # the response with an empty data array where the rows were
+        meta = json.loads(self._head + "".join(self._tail))
+        if meta.get("response", {}).get("data") != []:
+            raise ValueError("found a data array outside of response")
+
+        return meta
+
+
+# DECODING A FEW WHOLE RESPONSE BODIES INTO ONE DATAFRAME
+def decode_pages(bodies):
+    """
+    Purpose is to decode response bodies (bytes) we already have into one dataframe
+    """
+    columns = ColumnBuffers()
+    for body in bodies:
+        page = PageDecoder(columns)
+        page.feed_all(body)
+        page.close()
+
+    return columns.to_frame()
+
+
+# STACKING DECODED PAGES WITHOUT LOSING THE CATEGORICALS
+def concat_frames(frames):
+    """
+    Purpose is to pd.concat pages decoded separately. Their categoricals have
+    different categories, which pd.concat would turn into plain objects, so those
+    columns are stacked with union_categoricals instead
+    """
+    frames = list(frames)
+    if len(frames) == 0:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    # pages with different columns are left to pd.concat to line up
+    names = list(frames[0].columns)
+    if any(list(df.columns) != names for df in frames):
+        return pd.concat(frames, ignore_index=True)
+
+    data = {}
+    for name in names:
+        columns = [df[name] for df in frames]
+
+        if all(isinstance(col.dtype, pd.CategoricalDtype) for col in columns):
+            data[name] = union_categoricals(columns, ignore_order=True)
+        else:
+            data[name] = pd.concat(columns, ignore_index=True)
+
+    return pd.DataFrame(data)
@@ -0,0 +1,62 @@
+"""
+The purpose of this file is to check that refresh_derived keeps the derived topic in
+the store in step with the definitions
+
+run from the repo root: python -m pytest tests
+"""
+
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+import master_store
+from derived_series import DERIVED_TOPIC, refresh_derived
+
+
+# TWO INPUT SERIES IN TWO VINTAGES, WRITTEN INTO A THROWAWAY STORE
+def input_store(tmp_path):
+    store_path = str(tmp_path / "store")
+    df = pd.DataFrame(
+        {
+            "period": pd.to_datetime(["2024-01-01"] * 4),
+            "seriesId": ["X", "Y", "X", "Y"],
+            "seriesDescription": ["x", "y", "x", "y"],
+            "value": [1.0, 2.0, 3.0, 4.0],
+            "unit": "u",
+            "forecast_period": pd.to_datetime(
+                ["2024-01-01", "2024-01-01", "2024-02-01", "2024-02-01"]
+            ),
+        }
+    )
+    master_store.write_topic(df, "inputs", store_path=store_path)
+
+    return store_path
+
+
+def test_removing_a_definition_removes_its_rows(tmp_path):
+    store_path = input_store(tmp_path)
+    definitions = {"SUM_XY": {"formula": "X + Y"}, "DIFF_XY": {"formula": "Y - X"}}
+
+    refresh_derived(definitions, store_path=store_path)
+    derived = master_store.read_topic(DERIVED_TOPIC, store_path=store_path)
+    assert set(derived["seriesId"].astype(str)) == {"SUM_XY", "DIFF_XY"}
+
+    # dropping one formula keeps the other's rows
+    refresh_derived({"SUM_XY": definitions["SUM_XY"]}, store_path=store_path)
+    derived = master_store.read_topic(DERIVED_TOPIC, store_path=store_path)
+    assert set(derived["seriesId"].astype(str)) == {"SUM_XY"}
+    assert sorted(derived["value"]) == [3.0, 7.0]
+
+
+def test_removing_every_definition_empties_the_derived_topic(tmp_path):
+    store_path = input_store(tmp_path)
+
+    refresh_derived({"SUM_XY": {"formula": "X + Y"}}, store_path=store_path)
+    refresh_derived({}, store_path=store_path)
+
+    topic_path = os.path.join(store_path, f"topic={DERIVED_TOPIC}")
+    assert not os.path.exists(topic_path) or os.listdir(topic_path) == []
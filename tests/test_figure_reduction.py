@@ -0,0 +1,38 @@
+"""
+The purpose of this file is to check that downsampling keeps the shape of our traces
+
+run from the repo root: python -m pytest tests
+"""
+
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+
+from figure_reduction import downsample_traces
+
+
+def test_downsampling_keeps_a_gap_between_the_runs_either_side_of_it():
+    n = 1000
+    df = pd.DataFrame(
+        {
+            "period": pd.date_range("2000-01-01", periods=n, freq="D"),
+            "value": np.sin(np.arange(n) / 20),
+            "seriesId": "A",
+            "forecast_period": "2024-01-01",
+        }
+    )
+    df.loc[400:449, "value"] = np.nan
+
+    result = downsample_traces(df, max_points=100)
+
+    # one missing row is left where the gap was, so the line is not drawn across it
+    gap = result[result["value"].isna()]
+    assert len(gap) == 1
+    assert pd.Timestamp("2001-02-04") <= gap["period"].iloc[0] <= pd.Timestamp("2001-03-25")
+    assert result["period"].is_monotonic_increasing
+    assert len(result) <= 101
@@ -0,0 +1,47 @@
+"""
+The purpose of this file is to check SeriesQuery's slices against plain pandas filters
+
+run from the repo root: python -m pytest tests
+"""
+
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pandas as pd
+
+from query_layer import SeriesQuery
+
+
+# TWO SERIES, ONE OF THEM DISCONTINUED BEFORE THE NEWEST VINTAGE
+def two_vintages():
+    return pd.DataFrame(
+        {
+            "period": ["2024-01-01", "2024-02-01", "2024-02-01"],
+            "seriesId": ["A", "A", "B"],
+            "seriesDescription": ["a", "a", "b"],
+            "value": [1.0, 2.0, 3.0],
+            "unit": "u",
+            "forecast_period": ["2024-01-01", "2024-01-01", "2024-02-01"],
+        }
+    )
+
+
+def test_no_comparison_for_a_series_missing_from_the_newest_vintage_is_empty():
+    query = SeriesQuery(two_vintages())
+
+    result = query.select(["A"], "no comparison")
+
+    assert result.empty
+    assert list(result.columns) == list(two_vintages().columns)
+
+
+def test_no_comparison_keeps_the_series_that_are_in_the_newest_vintage():
+    query = SeriesQuery(two_vintages())
+
+    result = query.select(["A", "B"], "no comparison")
+
+    assert result["seriesId"].tolist() == ["B"]
+    assert len(query.select(["A", "B"], "comparison")) == 3
@@ -0,0 +1,34 @@
+"""
+The purpose of this file is to check which STEO vintage we think is out on a given day
+
+run from the repo root: python -m pytest tests
+"""
+
+import datetime
+import os
+import sys
+
+# letting us import our modules from the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import release_schedule
+
+
+def test_current_vintage_follows_the_schedule():
+    assert release_schedule.current_vintage(datetime.date(2025, 12, 8)) == datetime.date(2025, 11, 1)
+    assert release_schedule.current_vintage(datetime.date(2025, 12, 9)) == datetime.date(2025, 12, 1)
+
+
+def test_current_vintage_keeps_moving_after_the_schedule_runs_out_when_guessing():
+    last = max(release_schedule.release_dates)
+    after = datetime.date(last.year + 1, 3, 20)
+
+    # without guessing we are stuck on the last scheduled release
+    assert release_schedule.current_vintage(after) == last
+    assert release_schedule.current_vintage(after, guess=True) == datetime.date(after.year, 3, 1)
+
+    # the month's guessed release (its first Tuesday) has not come out on the day before
+    tuesday = release_schedule.guessed_release_date(datetime.date(after.year, 3, 1))
+    assert tuesday.weekday() == 1 and tuesday.day <= 7
+    day_before = tuesday - datetime.timedelta(days=1)
+    assert release_schedule.current_vintage(day_before, guess=True) == datetime.date(after.year, 2, 1)